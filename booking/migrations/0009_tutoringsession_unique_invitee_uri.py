@@ -0,0 +1,54 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:37
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def remove_duplicate_sessions(apps, schema_editor):
+    """
+    Keeps one session per invitee URI: a paid one if there is one, otherwise
+    one with a payment, otherwise the first one created.
+
+    No payment loses its session: the payment of a removed duplicate moves
+    to the kept session if that has none. A duplicate with yet another
+    payment is kept under a marked invitee URI.
+    """
+    TutoringSession = apps.get_model('booking', 'TutoringSession')
+    duplicated = TutoringSession.objects.values('invitee_uri').annotate(
+        sessions=Count('pk')).filter(sessions__gt=1)
+    for row in duplicated:
+        uri = row['invitee_uri']
+        kept, *duplicates = TutoringSession.objects.filter(
+            invitee_uri=uri).order_by(
+                '-payment_complete', F('payment').asc(nulls_last=True), 'pk')
+        for session in duplicates:
+            if session.payment_id is None:
+                session.delete()
+            elif kept.payment_id in (None, session.payment_id):
+                kept.payment_id = session.payment_id
+                kept.payment_complete |= session.payment_complete
+                kept.save(update_fields=['payment', 'payment_complete'])
+                session.delete()
+            else:
+                suffix = f'#duplicate-{session.pk}'
+                session.invitee_uri = uri[:200 - len(suffix)] + suffix
+                session.save(update_fields=['invitee_uri'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_tutoringsession_subject'),
+        ('tutor_market', '0030_tutor_calendly_refresh_backoff'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_sessions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tutoringsession',
+            constraint=models.UniqueConstraint(fields=('invitee_uri',), name='unique_session_invitee_uri'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_tutoringsession_unique_invitee_uri'),
+        ('tutor_market', '0032_tutor_calendly_sync_cursor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tutoringsession',
+            index=models.Index(fields=['tutor', 'student', 'start_time'], name='session_tutor_student_start'),
+        ),
+        migrations.AddIndex(
+            model_name='tutoringsession',
+            index=models.Index(fields=['student', 'start_time'], name='session_student_start'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_tutoringsession_upcoming_indexes'),
+        ('tutor_market', '0033_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['stripe_id'], name='payment_stripe_id'),
+        ),
+        migrations.AddIndex(
+            model_name='tutoringsession',
+            index=models.Index(fields=['student', 'payment_complete'], name='session_student_paid'),
+        ),
+        migrations.AddIndex(
+            model_name='tutoringsession',
+            index=models.Index(fields=['tutor', 'session_status', 'start_time'], name='session_tutor_status_start'),
+        ),
+    ]
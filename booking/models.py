@@ -1,5 +1,107 @@
 from datetime import timedelta
 from django.db import models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+class TutoringSessionManager(models.Manager):
+    """
+    Manager of the tutoring sessions.
+    """
+
+    @staticmethod
+    def calendly_fields(event, invitee) -> dict:
+        """
+        Returns the session fields given by Calendly.
+
+        Args:
+            event (dict): The Calendly scheduled event resource.
+            invitee (dict): The Calendly invitee resource.
+
+        Returns:
+            dict: The field values, without the invitee URI and status.
+        """
+        questions_and_answers = ''
+        if invitee.get('questions_and_answers'):
+            questions_and_answers = invitee['questions_and_answers'][0][
+                'answer']
+
+        return {
+            # Calendly json fields
+            'start_time': parse_datetime(event['start_time']),
+            'end_time': parse_datetime(event['end_time']),
+            'created_at': parse_datetime(event['created_at']),
+            'location_url': (event.get('location') or {}).get(
+                'join_url') or '',
+            'session_name': event['name'],
+            'event_uri': event['uri'],
+            'cancel_url': invitee['cancel_url'],
+            'reschedule_url': invitee['reschedule_url'],
+            'invitee_email': invitee['email'],
+            'invitee_notes': questions_and_answers,
+        }
+
+    def upsert_from_calendly(self, event, invitee, tutor, student,
+                             status=None):
+        """
+        Creates or updates the session of a Calendly invitee.
+
+        Sessions are identified by the invitee's URI, so the booking form and
+        the Calendly webhooks (see calendly/webhooks.py) can deliver the same
+        booking any number of times and in any order.
+
+        Args:
+            event (dict): The Calendly scheduled event resource.
+            invitee (dict): The Calendly invitee resource.
+            tutor (Tutor): The tutor of a new session. Only optional if the
+                session exists.
+            student (User): The student of a new session.
+            status (str): The session status to set. New sessions are
+                pending if no status is given.
+
+        Returns:
+            tuple: The session and whether it was created.
+        """
+        defaults = self.calendly_fields(event, invitee)
+        create_defaults = {**defaults, 'session_status': status or 'pending'}
+        if tutor is not None:
+            create_defaults.update(
+                tutor=tutor, student=student, price=tutor.hourly_rate,
+                subject=tutor.subjects.first())
+        if status:
+            defaults['session_status'] = status
+        return self.update_or_create(
+            invitee_uri=invitee['uri'], defaults=defaults,
+            create_defaults=create_defaults)
+
+    def upcoming_for(self, tutor=None, student=None, limit: int = None,
+                     now=None):
+        """
+        Returns the scheduled sessions that have not started yet, soonest
+        first, with what the lesson lists show preloaded.
+
+        The filters on tutor, student and start time are served by the
+        composite indexes of TutoringSession.
+
+        Args:
+            tutor (Tutor): Only sessions with this tutor, if given.
+            student (User): Only sessions of this student, if given.
+            limit (int): The maximum number of sessions, None for all.
+            now (datetime): The current time, defaults to timezone.now().
+
+        Returns:
+            QuerySet: The sessions.
+        """
+        sessions = self.filter(
+            start_time__gte=now or timezone.now(),
+            session_status='scheduled')
+        if tutor is not None:
+            sessions = sessions.filter(tutor=tutor)
+        if student is not None:
+            sessions = sessions.filter(student=student)
+        sessions = sessions.select_related(
+            'tutor__user', 'student', 'subject').order_by('start_time', 'pk')
+        return sessions if limit is None else sessions[:limit]
 
 
 class TutoringSession(models.Model):
@@ -50,6 +152,31 @@ class TutoringSession(models.Model):
         max_length=20, choices=STATUS_CHOICES, default="pending"
     )
 
+    objects = TutoringSessionManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["invitee_uri"], name="unique_session_invitee_uri"),
+        ]
+        indexes = [
+            # Upcoming sessions, see TutoringSessionManager.upcoming_for
+            models.Index(
+                fields=["tutor", "student", "start_time"],
+                name="session_tutor_student_start"),
+            models.Index(
+                fields=["student", "start_time"],
+                name="session_student_start"),
+            # Unpaid sessions of a student, e.g. on the payment page
+            models.Index(
+                fields=["student", "payment_complete"],
+                name="session_student_paid"),
+            # Sessions of a tutor by status, e.g. on the tutor dashboard
+            models.Index(
+                fields=["tutor", "session_status", "start_time"],
+                name="session_tutor_status_start"),
+        ]
+
     def duration(self) -> timedelta:
         """
         Calculate the duration of the tutoring session.
@@ -83,3 +210,9 @@ class Payment(models.Model):
     client_secret = models.CharField(max_length=200, default="")
     currency = models.CharField(max_length=3, default="eur")
     stripe_id = models.CharField(max_length=200, default="")
+
+    class Meta:
+        indexes = [
+            # Looked up by the Stripe webhook
+            models.Index(fields=["stripe_id"], name="payment_stripe_id"),
+        ]
@@ -0,0 +1,64 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.test import TestCase
+from django.utils import timezone
+
+from booking.models import Payment, TutoringSession
+from tutor_market.models import Subject
+from tutor_market.testing import IndexTestMixin
+
+SESSIONS_PER_PAIR = 5
+
+
+class BookingIndexTestCases(IndexTestMixin, TestCase):
+    """
+    Test cases asserting that the hot booking queries use their indexes on
+    a seeded dataset of 5000 sessions and payments.
+    """
+
+    @classmethod
+    def seed(cls):
+        subject = Subject.objects.create(name='Math')
+        now = timezone.now()
+        statuses = ['pending', 'scheduled', 'completed', 'cancelled']
+        TutoringSession.objects.bulk_create(
+            TutoringSession(
+                tutor=tutor, student=student, price=Decimal('40.00'),
+                subject=subject, payment_complete=i % 2 == 0,
+                start_time=now + timedelta(days=i - 2),
+                end_time=now + timedelta(days=i - 2, hours=1),
+                created_at=now, location_url='https://example.com/join',
+                session_name='Math',
+                event_uri=f'event-{tutor.pk}-{student.pk}-{i}',
+                invitee_uri=f'invitee-{tutor.pk}-{student.pk}-{i}',
+                cancel_url='https://example.com/cancel',
+                reschedule_url='https://example.com/reschedule',
+                invitee_email='student@example.com',
+                session_status=statuses[i % len(statuses)])
+            for tutor in cls.tutors for student in cls.students
+            for i in range(SESSIONS_PER_PAIR))
+        Payment.objects.bulk_create(
+            Payment(user=student, amount=Decimal('40.00'),
+                    stripe_id=f'pi_{student.pk}_{i}')
+            for student in cls.students for i in range(100))
+
+    def test_unpaid_sessions_of_a_student(self):
+        self.assertUsesIndex(TutoringSession.objects.filter(
+            student=self.students[0], payment_complete=False),
+            'session_student_paid')
+
+    def test_sessions_of_a_tutor_by_status(self):
+        self.assertUsesIndex(TutoringSession.objects.filter(
+            tutor=self.tutors[0], session_status='pending'
+        ).order_by('start_time'), 'session_tutor_status_start')
+
+    def test_upcoming_sessions(self):
+        self.assertUsesIndex(TutoringSession.objects.upcoming_for(
+            self.tutors[0], self.students[0], limit=3),
+            'session_tutor_student_start')
+        self.assertUsesIndex(TutoringSession.objects.upcoming_for(
+            student=self.students[0]), 'session_student_start')
+
+    def test_payment_by_stripe_id(self):
+        self.assertUsesIndex(
+            Payment.objects.filter(stripe_id='pi_1_1'), 'payment_stripe_id')
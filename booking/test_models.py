@@ -0,0 +1,78 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from booking.models import TutoringSession
+from tutor_market.models import Subject, Tutor
+
+
+class UpcomingSessionsTestCases(TestCase):
+    """Test cases for TutoringSessionManager.upcoming_for."""
+
+    def setUp(self):
+        """Create two tutors, two students and sessions between them."""
+        self.subject = Subject.objects.create(name='Math')
+        self.tutor, self.other_tutor = [
+            Tutor.objects.create(
+                user=User.objects.create_user(
+                    username=f'tutor_{i}', password='test_password'),
+                display_name=f'Tutor {i}',
+                hourly_rate=Decimal('40.00'),
+                description='Experienced tutor.',
+            )
+            for i in range(2)
+        ]
+        self.student, self.other_student = [
+            User.objects.create_user(
+                username=f'student_{i}', password='test_password')
+            for i in range(2)
+        ]
+        self.now = timezone.now()
+
+    def session(self, hours, tutor=None, student=None, status='scheduled'):
+        start_time = self.now + timedelta(hours=hours)
+        return TutoringSession.objects.create(
+            tutor=tutor or self.tutor, student=student or self.student,
+            price=Decimal('40.00'), subject=self.subject,
+            start_time=start_time, end_time=start_time + timedelta(hours=1),
+            created_at=self.now, location_url='https://example.com/join',
+            session_name='Math', event_uri=f'event-{hours}',
+            invitee_uri=f'invitee-{hours}-{status}-{tutor}-{student}',
+            cancel_url='https://example.com/cancel',
+            reschedule_url='https://example.com/reschedule',
+            invitee_email='student@example.com', session_status=status)
+
+    def test_only_future_scheduled_sessions_soonest_first(self):
+        later = self.session(48)
+        sooner = self.session(24)
+        self.session(-24)
+        self.session(12, status='cancelled')
+        self.session(6, status='pending')
+        self.session(3, tutor=self.other_tutor)
+        self.session(3, student=self.other_student)
+
+        upcoming = TutoringSession.objects.upcoming_for(
+            self.tutor, self.student, now=self.now)
+        self.assertEqual(list(upcoming), [sooner, later])
+        self.assertEqual(list(TutoringSession.objects.upcoming_for(
+            self.tutor, self.student, limit=1, now=self.now)), [sooner])
+
+    def test_tutor_or_student_only(self):
+        mine = self.session(3)
+        other_students = self.session(4, student=self.other_student)
+        other_tutors = self.session(5, tutor=self.other_tutor)
+        self.assertEqual(
+            list(TutoringSession.objects.upcoming_for(self.tutor)),
+            [mine, other_students])
+        self.assertEqual(
+            list(TutoringSession.objects.upcoming_for(student=self.student)),
+            [mine, other_tutors])
+
+    def test_lesson_list_data_is_preloaded(self):
+        self.session(3)
+        with self.assertNumQueries(1):
+            for session in TutoringSession.objects.upcoming_for(
+                    self.tutor, self.student):
+                session.tutor.user, session.student, session.subject.name
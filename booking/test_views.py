@@ -1,12 +1,18 @@
+import json
+import time
 from datetime import timedelta, timezone
+from unittest import mock
 from django.utils import timezone
 from decimal import Decimal
+from django.contrib.messages import get_messages
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth.models import User
 from booking.models import Payment, TutoringSession
+from calendly.testing import FakeCalendlyServerMixin, QuietHandler
 from gipfel_tutor import settings
 from tutor_market.models import Subject, Tutor
+from tutor_market.testing import create_tutor
 
 
 class ScheduleSuccessViewTestCases(TestCase):
@@ -373,3 +379,106 @@ class PaymentDetailViewTestCases(TestCase):
         response = self.client.get(
             reverse('payment_success', kwargs={'pk': self.payment.pk}))
         self.assertEqual(response.context['payment'], self.payment)
+
+
+class FakeCalendlyApiHandler(QuietHandler):
+    """
+    Serves an event at /event and an invitee at /invitee after the
+    server's latency. Other paths are not found.
+    """
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        resources = {
+            '/event': {'resource': {
+                'start_time': '2030-05-01T10:00:00Z',
+                'end_time': '2030-05-01T11:00:00Z',
+                'created_at': '2030-04-01T10:00:00Z',
+                'location': {'join_url': 'https://example.com/join'},
+                'name': 'Math Tutoring Session',
+                'uri': 'https://api.calendly.com/scheduled_events/1',
+            }},
+            '/invitee': {'resource': {
+                'uri': 'https://api.calendly.com/invitees/1',
+                'cancel_url': 'https://example.com/cancel',
+                'reschedule_url': 'https://example.com/reschedule',
+                'email': 'student@example.com',
+                'questions_and_answers': [],
+            }},
+        }
+        status = 200 if self.path in resources else 404
+        body = json.dumps(resources.get(self.path, {})).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FetchCalendlyDataViewTestCases(FakeCalendlyServerMixin, TestCase):
+    """
+    Test cases for fetching the Calendly data of a booking, against a
+    local Calendly stub that answers after a fixed latency.
+    """
+    handler_class = FakeCalendlyApiHandler
+    calendly_settings = ('CALENDLY_API_URL',)
+    latency = 0.3
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server.latency = cls.latency
+        # Requests abandoned at the deadline can't be answered
+        cls.server.handle_error = lambda request, client_address: None
+
+    def setUp(self):
+        """Create a tutor and log in a student."""
+        self.tutor = create_tutor(
+            'tutor', [Subject.objects.create(name='Mathematics')],
+            hourly_rate=Decimal('50.00'), calendly_access_token='access')
+        User.objects.create_user(username='student', password='test_password')
+        self.client.login(username='student', password='test_password')
+        self.url = reverse('fetch_calendly_data', kwargs={'pk': self.tutor.pk})
+
+    def _book(self, invitee_path='/invitee'):
+        start = time.perf_counter()
+        response = self.client.post(self.url, {
+            'event_uri': f'{self.base_url}/event',
+            'invitee_uri': f'{self.base_url}{invitee_path}',
+        })
+        return response, time.perf_counter() - start
+
+    def test_resources_are_fetched_concurrently(self):
+        response, elapsed = self._book()
+        session = TutoringSession.objects.get()
+        self.assertRedirects(
+            response, reverse('schedule_success', kwargs={'pk': session.pk}))
+        self.assertEqual(session.invitee_email, 'student@example.com')
+        # Both round-trips overlap: the booking takes one latency, not two
+        self.assertGreaterEqual(elapsed, self.latency)
+        self.assertLess(elapsed, 1.6 * self.latency)
+
+    def test_partial_failures_abort_the_booking(self):
+        response, _ = self._book(invitee_path='/missing')
+        self.assertRedirects(
+            response, reverse('tutor_detail', kwargs={'pk': self.tutor.pk}),
+            fetch_redirect_response=False)
+        self.assertFalse(TutoringSession.objects.exists())
+        messages = list(get_messages(response.wsgi_request))
+        self.assertEqual(len(messages), 1)
+
+    def test_foreign_uris_are_not_fetched(self):
+        response = self.client.post(self.url, {
+            'event_uri': 'http://example.com/event',
+            'invitee_uri': f'{self.base_url}/invitee',
+        })
+        self.assertRedirects(
+            response, reverse('tutor_detail', kwargs={'pk': self.tutor.pk}),
+            fetch_redirect_response=False)
+        self.assertFalse(TutoringSession.objects.exists())
+
+    def test_shared_deadline(self):
+        with mock.patch('booking.views.CALENDLY_FETCH_DEADLINE', 0.1):
+            response, elapsed = self._book()
+        self.assertFalse(TutoringSession.objects.exists())
+        self.assertLess(elapsed, self.latency)
@@ -13,10 +13,17 @@ from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from booking.forms import CalendlyUriForm, CancelForm, PaymentForm
 from booking.models import Payment, TutoringSession
+from calendly.client import calendly_client
+from calendly.resources import fetch_resources
 from gipfel_tutor import settings
 from tutor_market.models import Tutor
 import stripe
-from datetime import datetime
+from datetime import datetime, timedelta
+
+# Seconds a booking waits for the event and invitee data from Calendly.
+CALENDLY_FETCH_DEADLINE = 8
+# Stored Calendly resources younger than this are used without a request.
+CALENDLY_RESOURCE_MAX_AGE = timedelta(minutes=5)
 
 
 @require_POST
@@ -54,44 +61,45 @@ def cache_payment_data(request):
         return HttpResponse(content=e, status=400)
 
 
-def _get_json_from_calendly_uri(uri, tutor, request):
+def _get_calendly_resources(uris, tutor):
     """
-    Retrieves JSON data from the specified Calendly URI.
+    Retrieves the documents of several Calendly resources.
+
+    The tutor's copies stored within CALENDLY_RESOURCE_MAX_AGE, e.g. by the
+    webhook, are used without a request. The others are requested
+    concurrently with one deadline, so a booking waits for the slowest
+    resource instead of the sum of all round-trips. URIs outside the
+    Calendly API are not requested.
 
     Args:
-        uri (str): The Calendly URI to retrieve JSON data from.
+        uris (list): The Calendly URIs to retrieve the documents of.
         tutor (Tutor): The tutor object associated with the Calendly access
             token.
-        request (HttpRequest): The HTTP request object (optional).
 
     Returns:
-        Response: The response object containing the JSON data.
+        list: The document of each resource, or None if any of them could
+        not be retrieved.
 
     Raises:
         None
 
     """
-    calendly_access_token = tutor.calendly_access_token
-    headers = {'Authorization': f'Bearer {calendly_access_token}'}
-    response = requests.get(uri, headers=headers)
-    if response.status_code == 200:
-        return response
-    else:
-        if request:
-            messages.warning(
-                request, f'''An error occurred while loading the event data.
-                {response}'''
-            )
-        return response
+    resources = fetch_resources(
+        uris, tutor, CALENDLY_FETCH_DEADLINE,
+        max_age=CALENDLY_RESOURCE_MAX_AGE)
+    if any(isinstance(resource, Exception) for resource in resources):
+        return None
+    return resources
 
 
 def _write_calendly_data_to_db(event_data, invitee_data, tutor, student, request):  # noqa
     """
-    Writes Calendly data to the database and creates a new tutoring session.
+    Writes Calendly data to the database and creates a new tutoring session
+    unless the invitee's session exists already.
 
     Args:
-        event_data (dict): The event data received from Calendly.
-        invitee_data (dict): The invitee data received from Calendly.
+        event_data (dict): The Calendly scheduled event resource.
+        invitee_data (dict): The Calendly invitee resource.
         tutor (Tutor): The tutor object associated with the session.
         student (Student): The student object associated with the session.
         request (HttpRequest): The HTTP request object.
@@ -100,41 +108,17 @@ def _write_calendly_data_to_db(event_data, invitee_data, tutor, student, request
         TutoringSession: The created tutoring session object.
 
     Raises:
-        KeyError: If the join URL is not found in the event data.
+        None
 
     """
-    questions_and_answers = ''
-    if invitee_data['resource']['questions_and_answers']:
-        i_data = invitee_data['resource']['questions_and_answers'][0]['answer']
-        questions_and_answers = i_data
-
-    join_url = ''
-    try:
-        join_url = event_data['resource']['location']['join_url']
-    except KeyError:
+    event = event_data
+    if not (event.get('location') or {}).get('join_url'):
         messages.warning(
             request, 'Ask your tutor to provide a join link for the session.')
 
-    session = TutoringSession.objects.create(
-        tutor=tutor,
-        student=student,
-        price=tutor.hourly_rate,
-        subject=tutor.subjects.first(),
-
-        # Calendly json fields
-        start_time=event_data['resource']['start_time'],
-        end_time=event_data['resource']['end_time'],
-        created_at=event_data['resource']['created_at'],
-        location_url=join_url,
-        session_name=event_data['resource']['name'],
-        event_uri=event_data['resource']['uri'],
-        invitee_uri=invitee_data['resource']['uri'],
-        cancel_url=invitee_data['resource']['cancel_url'],
-        reschedule_url=invitee_data['resource']['reschedule_url'],
-        invitee_email=invitee_data['resource']['email'],
-        invitee_notes=questions_and_answers
-    )
-    session.save()
+    # The Calendly webhook may have stored the session already
+    session, _ = TutoringSession.objects.upsert_from_calendly(
+        event, invitee_data, tutor, student)
     messages.success(request, 'Session created successfully.')
     return session
 
@@ -168,19 +152,12 @@ def fetch_calendly_data_view(request: HttpRequest, pk: int) -> HttpResponse:
     invitee_uri = form.cleaned_data['invitee_uri']
 
     # get the data from the uris using the calendly api2
-    event_data_response = _get_json_from_calendly_uri(
-        event_uri, tutor, request)
-    invitee_data_response = _get_json_from_calendly_uri(
-        invitee_uri, tutor, request)
-
-    if (event_data_response.status_code != 200 or
-            invitee_data_response.status_code != 200):
+    resources = _get_calendly_resources([event_uri, invitee_uri], tutor)
+    if resources is None:
         messages.warning(request, '''Something went wrong while fetching the
                          data from Calendly.''')
         return redirect('tutor_detail', pk=pk)
-
-    event_data = event_data_response.json()
-    invitee_data = invitee_data_response.json()
+    event_data, invitee_data = resources
 
     session = _write_calendly_data_to_db(
         event_data, invitee_data, tutor, student, request)
@@ -240,11 +217,14 @@ def cancel_session_view(request, pk):
         calendly_access_token = tutor.calendly_access_token
         headers = {'Authorization': f'Bearer {calendly_access_token}'}
 
-        response = requests.request("POST", url, json=payload, headers=headers)
-
-        import json  # Ensure this import is at the top of your file
-
-        response_data = json.loads(response.text)
+        try:
+            response = calendly_client.post(
+                url, json=payload, headers=headers)
+            response_data = json.loads(response.text)
+        except (requests.RequestException, ValueError):
+            messages.warning(request, '''Calendly could not be reached, please
+                             try again later.''')
+            return redirect('dashboard', pk=request.user.pk)
 
         if response.status_code == 201:
             messages.success(request, 'Session cancelled successfully.')
@@ -1,3 +1,5 @@
 from django.contrib import admin
 
-# Register your models here.
+from calendly.models import CalendlyResource
+
+admin.site.register(CalendlyResource)
@@ -0,0 +1,292 @@
+"""
+Shared HTTP client for Calendly's API and OAuth endpoints.
+
+All Calendly requests go through `calendly_client`, which keeps connections
+alive in a pool per host, applies connect and read timeouts, retries failed
+requests a bounded number of times with jittered backoff and stops calling a
+host for a while once it keeps failing (circuit breaker).
+
+Only idempotent requests are retried after Calendly received them. POSTs are
+retried only when the connection could not be established, since e.g. a
+repeated token refresh would rotate the refresh token twice.
+
+GET responses are cached following their Cache-Control and ETag headers,
+see calendly/http_cache.py, and requests are rate limited per access token,
+see calendly/ratelimit.py.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from django.db import connections
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from calendly.http_cache import ResponseCache
+from calendly.ratelimit import RateLimiter, retry_after
+
+# Seconds to wait for a connection and for a response.
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+# Retries after the first attempt.
+MAX_RETRIES = 2
+# Upper bound of the first retry delay in seconds, doubled per retry.
+RETRY_BACKOFF = 0.25
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+# Consecutive failures after which a host is not called for the cooldown.
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30
+POOL_SIZE = 10
+
+
+class CalendlyUnavailable(requests.ConnectionError):
+    """
+    Raised without a request while the circuit breaker of a host is open.
+
+    Derives from requests.ConnectionError, so callers handling
+    requests.RequestException handle it as well.
+    """
+
+
+def _not_sent(error: requests.RequestException) -> bool:
+    """
+    Returns whether a request failed before a connection was established,
+    i.e. certainly did not reach the server.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, (ConnectTimeoutError, NewConnectionError))
+
+
+class CircuitBreaker:
+    """
+    Counts consecutive failures of a host and opens after `threshold` of
+    them. While open, requests fail fast; after `cooldown` seconds a single
+    trial request is let through and closes the breaker again on success.
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Returns whether a request may be sent.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                # Half open: let this request through, keep the others out
+                # until it completes.
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class CalendlyClient:
+    """
+    A pooled, retrying HTTP client with a circuit breaker per host.
+
+    Attributes:
+        session (requests.Session): The session holding the connection pools.
+        max_retries (int): The number of retries after the first attempt.
+        breakers (dict): The circuit breakers keyed by host.
+        cache (ResponseCache): The cache of GET responses, if any.
+        limiter (RateLimiter): The rate limiter of the requests, if any.
+    """
+
+    def __init__(self, max_retries: int = MAX_RETRIES,
+                 breaker_threshold: int = BREAKER_THRESHOLD,
+                 breaker_cooldown: float = BREAKER_COOLDOWN,
+                 pool_size: int = POOL_SIZE, cache: ResponseCache = None,
+                 limiter: RateLimiter = None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.max_retries = max_retries
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.breakers = {}
+        self.cache = cache
+        self.limiter = limiter
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix='calendly')
+
+    def _breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(
+                    self.breaker_threshold, self.breaker_cooldown)
+            return self.breakers[host]
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a request to Calendly.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL.
+            **kwargs: Passed on to requests.Session.request.
+
+        Returns:
+            requests.Response: The response; error responses are returned
+            like successful ones.
+
+        Raises:
+            CalendlyUnavailable: If the host's circuit breaker is open.
+            CalendlyRateLimited: If the rate limit leaves no room in time.
+            requests.RequestException: If the last attempt failed.
+        """
+        method = method.upper()
+        kwargs.setdefault('timeout', (CONNECT_TIMEOUT, READ_TIMEOUT))
+        breaker = self._breaker(url)
+        idempotent = method in IDEMPOTENT_METHODS
+        bucket = None
+        if self.limiter is not None:
+            bucket = self.limiter.key(url, kwargs.get('headers'))
+
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                raise CalendlyUnavailable(
+                    f'{urlsplit(url).netloc} is failing, not calling it for '
+                    f'{self.breaker_cooldown} seconds.')
+            if bucket is not None:
+                self.limiter.acquire(bucket)
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as error:
+                breaker.record_failure()
+                if last_attempt or not (idempotent or _not_sent(error)):
+                    raise
+            else:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if response.status_code == 429 and bucket is not None:
+                    # Holds back this and every other worker's requests
+                    self.limiter.block(bucket, retry_after(response))
+                if (last_attempt or not idempotent
+                        or response.status_code not in RETRY_STATUSES):
+                    return response
+                response.close()
+            time.sleep(random.uniform(0, RETRY_BACKOFF * 2 ** attempt))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a GET request to Calendly, answered from the cache if possible.
+
+        Requests that carry their own If-None-Match header, i.e. manage
+        their own copy, bypass the cache.
+        """
+        headers = kwargs.get('headers') or {}
+        if self.cache is None or 'If-None-Match' in headers:
+            return self.request('GET', url, **kwargs)
+
+        key = self.cache.key(url, kwargs.get('params'), headers)
+        entry = self.cache.get(key)
+        if entry is not None and entry['expires'] > time.time():
+            self.cache.count('hits')
+            return self.cache.response(entry)
+        if entry is not None and 'ETag' in entry['headers']:
+            kwargs['headers'] = {**headers,
+                                 'If-None-Match': entry['headers']['ETag']}
+
+        response = self.request('GET', url, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.cache.count('revalidations')
+            response.close()
+            return self.cache.response(
+                self.cache.refresh(key, entry, response))
+        self.cache.count('misses')
+        self.cache.store(key, response)
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def _pooled_get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a GET request in a pool thread. The database connections the
+        cache and the rate limiter opened in the thread are closed
+        afterwards.
+        """
+        try:
+            return self.get(url, **kwargs)
+        finally:
+            connections.close_all()
+
+    def get_many(self, urls, deadline: float, url_headers: dict = None,
+                 **kwargs) -> list:
+        """
+        Sends GET requests for several URLs concurrently.
+
+        The requests run in the client's thread pool and share one deadline:
+        each read waits at most `deadline` seconds and the results are
+        collected until the deadline has passed.
+
+        Args:
+            urls (list): The URLs.
+            deadline (float): Seconds to wait for all responses.
+            url_headers (dict): Extra headers per URL.
+            **kwargs: Passed on to request.
+
+        Returns:
+            list: A requests.Response or the exception raised for each URL,
+            in order: usually a requests.RequestException, but e.g. a
+            database error of the cache is returned too. Requests that
+            missed the deadline are requests.Timeout errors.
+        """
+        kwargs.setdefault('timeout', (min(CONNECT_TIMEOUT, deadline),
+                                      deadline))
+        url_headers = url_headers or {}
+        futures = [
+            self._executor.submit(self._pooled_get, url, **{
+                **kwargs,
+                'headers': {**kwargs.get('headers', {}),
+                            **url_headers.get(url, {})},
+            })
+            for url in urls
+        ]
+        wait(futures, timeout=deadline)
+
+        results = []
+        for url, future in zip(urls, futures):
+            if not future.done():
+                future.cancel()
+                results.append(requests.Timeout(
+                    f'No response from {url} within {deadline} seconds.'))
+            elif future.exception() is not None:
+                results.append(future.exception())
+            else:
+                results.append(future.result())
+        return results
+
+
+calendly_client = CalendlyClient(cache=ResponseCache(),
+                                 limiter=RateLimiter())
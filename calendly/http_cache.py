@@ -0,0 +1,194 @@
+"""
+HTTP response cache for Calendly GET requests.
+
+Scheduled events and invitees rarely change once created, so `CalendlyClient`
+keeps their responses in the Django cache and follows the response headers:
+`Cache-Control: max-age` responses are served without a request until they
+expire, responses with an `ETag` are revalidated with `If-None-Match` and
+reused when Calendly answers 304 Not Modified, and `no-store` responses are
+never kept. Entries are keyed by URL and Authorization header, since
+responses differ per token.
+
+Each process tracks the entries it stored in least recently used order and
+deletes the oldest ones beyond `max_entries`; the backend's own culling
+bounds the total across processes.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from django.core.cache import caches
+from requests.structures import CaseInsensitiveDict
+
+KEY_PREFIX = 'calendly:http:'
+MAX_ENTRIES = 1000
+# Responses with larger bodies are not cached.
+MAX_ENTRY_SIZE = 256 * 1024
+# Seconds an entry that can be revalidated is kept after it went stale.
+REVALIDATION_TIMEOUT = 24 * 60 * 60
+STORED_HEADERS = ('Content-Type', 'Cache-Control', 'ETag', 'Last-Modified')
+
+
+def cache_control(headers) -> dict:
+    """
+    Returns the Cache-Control directives of response headers by lowercase
+    name, with '' as the value of directives without one.
+    """
+    directives = {}
+    for directive in headers.get('Cache-Control', '').split(','):
+        name, _, value = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+
+def freshness(headers):
+    """
+    Returns for how many seconds a response may be used without
+    revalidation, or None if it must not be stored.
+    """
+    directives = cache_control(headers)
+    if 'no-store' in directives:
+        return None
+    if 'no-cache' in directives:
+        return 0
+    try:
+        return max(int(directives.get('max-age', 0)), 0)
+    except ValueError:
+        return 0
+
+
+class ResponseCache:
+    """
+    A size-bounded LRU cache of Calendly responses in a Django cache.
+
+    Attributes:
+        alias (str): The Django cache used for the entries.
+        max_entries (int): The number of entries a process keeps.
+        max_entry_size (int): The largest body in bytes that is cached.
+        counters (dict): The number of hits, revalidations (304s answered
+            from the cache), misses and evictions.
+    """
+
+    def __init__(self, alias: str = 'default', max_entries: int = MAX_ENTRIES,
+                 max_entry_size: int = MAX_ENTRY_SIZE):
+        self.alias = alias
+        self.max_entries = max_entries
+        self.max_entry_size = max_entry_size
+        self.counters = {'hits': 0, 'revalidations': 0, 'misses': 0,
+                         'evictions': 0}
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def stats(self) -> dict:
+        """
+        Returns a copy of the counters with the hit ratio, counting
+        revalidations as hits.
+        """
+        with self._lock:
+            stats = dict(self.counters)
+        lookups = stats['hits'] + stats['revalidations'] + stats['misses']
+        stats['hit_ratio'] = (
+            (stats['hits'] + stats['revalidations']) / lookups
+            if lookups else 0.0)
+        return stats
+
+    def key(self, url: str, params=None, headers=None) -> str:
+        """
+        Returns the cache key of a GET request.
+        """
+        url = requests.Request('GET', url, params=params).prepare().url
+        authorization = (headers or {}).get('Authorization', '')
+        digest = hashlib.sha256(
+            f'{url}\n{authorization}'.encode()).hexdigest()
+        return KEY_PREFIX + digest
+
+    def get(self, key: str):
+        """
+        Returns the entry stored under a key, or None.
+        """
+        entry = self.backend.get(key)
+        with self._lock:
+            if entry is None:
+                self._keys.pop(key, None)
+            elif key in self._keys:
+                self._keys.move_to_end(key)
+        return entry
+
+    def store(self, key: str, response: requests.Response):
+        """
+        Stores a 200 response if its headers allow it and returns the entry,
+        or None.
+        """
+        max_age = freshness(response.headers)
+        etag = response.headers.get('ETag')
+        if (response.status_code != 200 or max_age is None
+                or (max_age == 0 and not etag)
+                or len(response.content) > self.max_entry_size):
+            return None
+        entry = {
+            'url': response.url,
+            'status': response.status_code,
+            'headers': {name: response.headers[name]
+                        for name in STORED_HEADERS
+                        if name in response.headers},
+            'content': response.content,
+            'expires': time.time() + max_age,
+        }
+        self.save(key, entry)
+        return entry
+
+    def refresh(self, key: str, entry: dict, response: requests.Response):
+        """
+        Renews an entry after a 304 response and returns it.
+        """
+        max_age = freshness(response.headers)
+        if max_age is None:
+            self.backend.delete(key)
+            return entry
+        for name in STORED_HEADERS:
+            if name in response.headers:
+                entry['headers'][name] = response.headers[name]
+        entry['expires'] = time.time() + max_age
+        self.save(key, entry)
+        return entry
+
+    def save(self, key: str, entry: dict):
+        timeout = max(entry['expires'] - time.time(), 0)
+        if 'ETag' in entry['headers']:
+            timeout += REVALIDATION_TIMEOUT
+        self.backend.set(key, entry, timeout)
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            evicted = []
+            while len(self._keys) > self.max_entries:
+                evicted.append(self._keys.popitem(last=False)[0])
+            self.counters['evictions'] += len(evicted)
+        if evicted:
+            self.backend.delete_many(evicted)
+
+    @staticmethod
+    def response(entry: dict) -> requests.Response:
+        """
+        Returns a response built from an entry.
+        """
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = 'OK'
+        response.url = entry['url']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = requests.utils.get_encoding_from_headers(
+            response.headers)
+        response._content = entry['content']
+        return response
@@ -0,0 +1,124 @@
+"""
+Per-tutor lease around Calendly token refreshes.
+
+Calendly rotates the refresh token on every refresh, so two workers
+refreshing the same tutor at once waste a request and the loser's refresh
+token is no longer valid. Refreshes run inside `tutor_token_lock`, which
+re-reads the tutor's tokens once the lease is held; a caller that finds them
+already rotated reuses them instead of refreshing again.
+
+The lease is an entry in the shared cache that expires on its own, so no
+database row or transaction stays locked while the refresh request runs,
+and callers only wait briefly for it.
+"""
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import caches
+
+from tutor_market.models import Tutor
+
+TOKEN_FIELDS = ('calendly_access_token', 'calendly_refresh_token',
+                'calendly_token_expires_at')
+# Seconds after which the cache lock expires if its holder died.
+LOCK_TIMEOUT = 30
+# Seconds between attempts to take the cache lock.
+LOCK_POLL_INTERVAL = 0.05
+# Seconds a token refresh lease is held at most. Longer than a refresh
+# request with its retries and rate limit waits.
+LEASE_TIMEOUT = 60
+# Seconds a caller waits for another caller's token refresh.
+LEASE_WAIT = 10
+
+
+class LockTimeout(TimeoutError):
+    """Raised when a cache lock can't be taken in time."""
+
+
+def acquire_cache_lock(key: str, timeout: float = LOCK_TIMEOUT,
+                       wait: float = None, alias: str = 'default'):
+    """
+    Takes a lock stored in the cache, waiting while another caller holds it.
+
+    Args:
+        key (str): The cache key of the lock.
+        timeout (float): The seconds after which the lock expires.
+        wait (float): The seconds to wait for the lock, defaults to
+            `timeout`, after which a dead holder's lock has expired.
+        alias (str): The Django cache holding the lock.
+
+    Returns:
+        str: The owner token to release the lock with, or None if the lock
+        was not taken in time.
+    """
+    cache = caches[alias]
+    owner = uuid.uuid4().hex
+    deadline = time.monotonic() + (timeout if wait is None else wait)
+    while not cache.add(key, owner, timeout):
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(LOCK_POLL_INTERVAL)
+    return owner
+
+
+def release_cache_lock(key: str, owner: str, alias: str = 'default'):
+    """
+    Releases a lock taken by acquire_cache_lock, unless it expired and was
+    taken by another caller since.
+    """
+    cache = caches[alias]
+    if cache.get(key) == owner:
+        cache.delete(key)
+
+
+@contextmanager
+def cache_lock(key: str, timeout: float = LOCK_TIMEOUT,
+               alias: str = 'default', wait: float = None):
+    """
+    Holds a lock stored in the cache `alias`, waiting up to `wait` seconds
+    (by default `timeout`) while another caller holds it. The lock expires
+    after `timeout` seconds.
+
+    Raises:
+        LockTimeout: If the lock was not taken in time.
+    """
+    owner = acquire_cache_lock(key, timeout, wait, alias)
+    if owner is None:
+        raise LockTimeout(f'Lock {key} not acquired.')
+    try:
+        yield
+    finally:
+        release_cache_lock(key, owner, alias)
+
+
+def token_lock_key(tutor_pk: int) -> str:
+    """Returns the cache key of a tutor's token refresh lease."""
+    return f'calendly-token-lock:{tutor_pk}'
+
+
+@contextmanager
+def tutor_token_lock(tutor_pk: int, wait: float = None):
+    """
+    Holds the token refresh lease of a tutor.
+
+    A caller that doesn't get the lease within `wait` seconds continues
+    without it, with the tokens stored in the meantime.
+
+    Args:
+        tutor_pk (int): The primary key of the tutor.
+        wait (float): The seconds to wait for the lease, defaults to
+            LEASE_WAIT.
+
+    Yields:
+        tuple: The tutor's current tokens, read after waiting for the lease,
+        and whether the lease is held.
+    """
+    key = token_lock_key(tutor_pk)
+    owner = acquire_cache_lock(
+        key, LEASE_TIMEOUT, LEASE_WAIT if wait is None else wait)
+    try:
+        yield Tutor.objects.only(*TOKEN_FIELDS).get(pk=tutor_pk), bool(owner)
+    finally:
+        if owner:
+            release_cache_lock(key, owner)
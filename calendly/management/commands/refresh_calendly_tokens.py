@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from calendly import tokens
+
+
+class Command(BaseCommand):
+    """
+    Refreshes the Calendly tokens of tutors before they expire. Runs once,
+    e.g. from a scheduler, or with --loop as a worker process.
+    """
+    help = 'Refreshes Calendly tokens that are about to expire.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Maximum number of concurrent refresh requests.')
+        parser.add_argument(
+            '--batch-size', type=int, default=50,
+            help='Number of tutors loaded per batch.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep scanning for expiring tokens.')
+        parser.add_argument(
+            '--interval', type=int, default=300,
+            help='Seconds between scans with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            outcomes = tokens.refresh_due_tokens(
+                concurrency=max(options['concurrency'], 1),
+                batch_size=max(options['batch_size'], 1))
+            self.stdout.write(self.style.SUCCESS(
+                'Calendly tokens: '
+                f"{outcomes.get('refreshed', 0)} refreshed, "
+                f"{outcomes.get('retrying', 0)} retrying, "
+                f"{outcomes.get('failed', 0)} failed, "
+                f"{outcomes.get('skipped', 0)} skipped."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calendly.webhook_handler import CalendlyWH_Handler
+
+
+def read_events(path):
+    """
+    Reads recorded webhook events from a file holding a JSON event, a JSON
+    array of events or one JSON event per line.
+    """
+    with open(path, encoding='utf-8') as file:
+        content = file.read()
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in content.splitlines()
+                if line.strip()]
+    return data if isinstance(data, list) else [data]
+
+
+class Command(BaseCommand):
+    """
+    Replays recorded Calendly webhook events through the webhook handler,
+    e.g. to backfill sessions after an outage of the webhook endpoint.
+    Replaying is idempotent: sessions are upserted on the invitee URI.
+    """
+    help = 'Replays recorded Calendly webhook payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='+',
+            help='Files with a JSON event, a JSON array or JSON lines.')
+
+    def handle(self, *args, **options):
+        handler = CalendlyWH_Handler()
+        replayed = 0
+        for path in options['paths']:
+            try:
+                events = read_events(path)
+            except (OSError, ValueError) as error:
+                raise CommandError(f'Could not read {path}: {error}')
+            for event in events:
+                response = handler.dispatch(event)
+                self.stdout.write(response.content.decode())
+                replayed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed {replayed} Calendly webhook events.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from calendly import tokens
+
+
+class Command(BaseCommand):
+    """
+    Checks the Calendly tokens of tutors whose last check is outdated or
+    whose token is about to expire, and records the results. Meant to run
+    regularly from a scheduler.
+    """
+    help = 'Revalidates outdated Calendly tokens of tutors.'
+
+    def handle(self, *args, **options):
+        statuses = {}
+        for tutor in tokens.tutors_needing_revalidation().iterator():
+            status = tokens.revalidate_token(tutor)
+            statuses[status] = statuses.get(status, 0) + 1
+
+        summary = ', '.join(
+            f'{count} {status}' for status, count in sorted(statuses.items()))
+        self.stdout.write(self.style.SUCCESS(
+            f'Revalidated {sum(statuses.values())} Calendly tokens'
+            + (f' ({summary}).' if summary else '.')))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from calendly import sync
+from tutor_market.models import Tutor
+
+
+class Command(BaseCommand):
+    """
+    Reconciles the tutoring sessions with the tutors' Calendly bookings.
+    Runs once, e.g. from a scheduler, or with --loop as a worker process.
+    Tutors who connected Calendly since the last run are backfilled.
+    """
+    help = 'Syncs tutoring sessions with Calendly.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Maximum number of tutors fetched at once.')
+        parser.add_argument(
+            '--tutor', type=int, action='append', dest='tutors',
+            help='Only sync this tutor (repeatable).')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep syncing.')
+        parser.add_argument(
+            '--interval', type=int, default=900,
+            help='Seconds between syncs with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            tutors = None
+            if options['tutors']:
+                tutors = Tutor.objects.filter(pk__in=options['tutors'])
+            totals = sync.sync_sessions(
+                tutors, concurrency=max(options['concurrency'], 1))
+            self.stdout.write(self.style.SUCCESS(
+                'Calendly sessions: '
+                f"{totals['created']} created, {totals['updated']} updated, "
+                f"{totals['skipped']} skipped, {totals['failed']} tutors "
+                'failed.'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendlyResource',
+            fields=[
+                ('uri', models.CharField(max_length=200, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('event', 'Scheduled event'), ('invitee', 'Invitee')], max_length=10)),
+                ('data', models.JSONField()),
+                ('etag', models.CharField(blank=True, max_length=200)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+    ]
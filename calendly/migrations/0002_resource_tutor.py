@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendly', '0001_initial'),
+        ('tutor_market', '0033_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendlyresource',
+            name='tutor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='calendly_resources', to='tutor_market.tutor'),
+        ),
+    ]
@@ -1,3 +1,36 @@
 from django.db import models
 
-# Create your models here.
+
+class CalendlyResource(models.Model):
+    """
+    The last known document of a Calendly API resource.
+
+    Scheduled events and invitees are stored as delivered by the API or
+    the webhooks, so later reads don't need another request and later
+    fetches can be conditional. See calendly/resources.py.
+
+    Attributes:
+        uri (str): The URI of the resource.
+        kind (str): The kind of resource, one of KIND_CHOICES.
+        data (dict): The resource document.
+        etag (str): The ETag of the response the document came from, if
+            any.
+        fetched_at (datetime): When the document was received.
+        tutor (Tutor): The tutor whose Calendly account the resource
+            belongs to, if known.
+    """
+    KIND_CHOICES = [
+        ('event', 'Scheduled event'),
+        ('invitee', 'Invitee'),
+    ]
+    uri = models.CharField(max_length=200, primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    data = models.JSONField()
+    etag = models.CharField(max_length=200, blank=True)
+    fetched_at = models.DateTimeField()
+    tutor = models.ForeignKey(
+        'tutor_market.Tutor', on_delete=models.CASCADE, null=True,
+        blank=True, related_name='calendly_resources')
+
+    def __str__(self):
+        return self.uri
@@ -0,0 +1,181 @@
+"""
+Rate limiting of Calendly requests.
+
+Calendly limits the requests per user, so a burst of bookings on a popular
+tutor's profile would otherwise push every caller into 429 errors. The
+shared client takes a token from a bucket per access token (per host for
+the OAuth calls, which carry no access token) before each request. The
+buckets live in the Django cache, so all workers share them as long as the
+cache is shared between processes, see the CACHES setting.
+
+A request waits up to `max_wait` seconds for a token and then fails with
+CalendlyRateLimited. A 429 response empties its bucket until the time in its
+Retry-After header, so every worker backs off, not just the one that got it.
+"""
+import hashlib
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.core.cache import caches
+
+from calendly.locks import LockTimeout, cache_lock
+
+KEY_PREFIX = 'calendly:ratelimit:'
+# Tokens added per second and the bucket size.
+RATE = 2.0
+BURST = 20
+# Seconds a request waits for a token.
+MAX_WAIT = 5
+# Seconds assumed when a 429 response has no usable Retry-After.
+DEFAULT_RETRY_AFTER = 10
+# Seconds a bucket lock expires after if its holder died.
+LOCK_TIMEOUT = 2
+
+
+class CalendlyRateLimited(requests.RequestException):
+    """
+    Raised without a request when no token becomes available in time.
+
+    Derives from requests.RequestException, so callers handling it for
+    failed requests handle it as well.
+    """
+
+
+def retry_after(response: requests.Response) -> float:
+    """
+    Returns the seconds to wait according to a response's Retry-After
+    header, which holds seconds or an HTTP date.
+    """
+    value = response.headers.get('Retry-After', '').strip()
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+class RateLimiter:
+    """
+    Token buckets per access token, stored in the cache.
+
+    Attributes:
+        rate (float): The tokens added per second.
+        burst (int): The size of a bucket.
+        max_wait (float): The seconds a request waits for a token.
+        alias (str): The Django cache holding the buckets.
+        counters (dict): This process's number of requests that waited for
+            a token (throttled), gave up waiting (rejected) and got a 429
+            response (rate_limited).
+        waiting (int): The number of requests currently waiting.
+        max_waiting (int): The highest number of requests waiting at once.
+    """
+
+    def __init__(self, rate: float = RATE, burst: int = BURST,
+                 max_wait: float = MAX_WAIT, alias: str = 'default'):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.alias = alias
+        self.counters = {'throttled': 0, 'rejected': 0, 'rate_limited': 0}
+        self.waiting = 0
+        self.max_waiting = 0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def stats(self) -> dict:
+        """
+        Returns the counters with the current and the highest queue depth.
+        """
+        with self._lock:
+            return {**self.counters, 'waiting': self.waiting,
+                    'max_waiting': self.max_waiting}
+
+    @staticmethod
+    def key(url: str, headers: dict = None) -> str:
+        """
+        Returns the bucket key of a request: its access token, or its host.
+        """
+        authorization = (headers or {}).get('Authorization')
+        if not authorization:
+            authorization = requests.utils.urlparse(url).netloc
+        return KEY_PREFIX + hashlib.sha256(authorization.encode()).hexdigest()
+
+    def _take(self, key: str) -> float:
+        """
+        Takes a token from a bucket if it has one.
+
+        Returns:
+            float: 0 if a token was taken, else the seconds until one is
+            available.
+        """
+        cache = self.backend
+        try:
+            with cache_lock(f'{key}:lock', LOCK_TIMEOUT, self.alias):
+                now = time.time()
+                state = cache.get(key) or {'tokens': self.burst, 'at': now,
+                                           'blocked_until': 0}
+                tokens = min(self.burst,
+                             state['tokens'] + (now - state['at']) * self.rate)
+                if now >= state['blocked_until'] and tokens >= 1:
+                    state.update(tokens=tokens - 1, at=now)
+                    cache.set(key, state, self.burst / self.rate + 1)
+                    return 0
+                return max(state['blocked_until'] - now,
+                           (1 - tokens) / self.rate)
+        except LockTimeout:
+            # The bucket is contended, try again like an empty one
+            return 1 / self.rate
+
+    def acquire(self, key: str):
+        """
+        Takes a token from a bucket, waiting for one if necessary.
+
+        Raises:
+            CalendlyRateLimited: If no token is available within max_wait.
+        """
+        delay = self._take(key)
+        if not delay:
+            return
+        deadline = time.monotonic() + self.max_wait
+        with self._lock:
+            self.counters['throttled'] += 1
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            while delay:
+                if time.monotonic() + delay > deadline:
+                    with self._lock:
+                        self.counters['rejected'] += 1
+                    raise CalendlyRateLimited(
+                        f'Calendly rate limit reached, no request possible '
+                        f'for {delay:.1f} seconds.')
+                time.sleep(delay)
+                delay = self._take(key)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def block(self, key: str, seconds: float):
+        """
+        Empties a bucket for `seconds`, e.g. after a 429 response.
+        """
+        with self._lock:
+            self.counters['rate_limited'] += 1
+        # Tokens accrue again from the end of the block. The block is written
+        # even if the lock is contended, it overrides any bucket state.
+        until = time.time() + seconds
+        state = {'tokens': 0, 'at': until, 'blocked_until': until}
+        try:
+            with cache_lock(f'{key}:lock', LOCK_TIMEOUT, self.alias):
+                self.backend.set(
+                    key, state, seconds + self.burst / self.rate + 1)
+        except LockTimeout:
+            self.backend.set(key, state, seconds + self.burst / self.rate + 1)
@@ -0,0 +1,155 @@
+"""
+Local copies of Calendly resources.
+
+Every scheduled event and invitee document we receive, from the API, the
+webhooks (calendly/webhooks.py) or the session sync (calendly/sync.py), is
+stored as a CalendlyResource with its fetch time and ETag. Reads that accept
+a copy of a given age are served locally, other fetches are conditional and
+reuse the stored document when Calendly answers 304 Not Modified.
+
+Fetched URIs come from user input, so only URIs on the Calendly API host are
+fetched, documents are stored under the URI that was requested, and copies
+are only reused for the tutor whose token fetched them.
+"""
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from calendly.client import calendly_client
+from calendly.models import CalendlyResource
+
+STORE_BATCH_SIZE = 500
+
+
+def resource_kind(uri: str) -> str:
+    """
+    Returns the CalendlyResource kind of a Calendly URI.
+    """
+    return 'invitee' if '/invitees/' in uri else 'event'
+
+
+def is_api_uri(uri: str) -> bool:
+    """
+    Returns whether a URI points to the Calendly API, see
+    settings.CALENDLY_API_URL.
+    """
+    if not isinstance(uri, str):
+        return False
+    api = urlsplit(settings.CALENDLY_API_URL)
+    parts = urlsplit(uri)
+    return (parts.scheme, parts.netloc) == (api.scheme, api.netloc)
+
+
+def store_resources(documents, etags: dict = None, fetched_at=None,
+                    uris: list = None, tutor=None):
+    """
+    Stores Calendly resource documents, replacing older copies.
+
+    Args:
+        documents (list): The resource documents.
+        etags (dict): The ETag of each document's response by URI.
+        fetched_at (datetime): When the documents were received, defaults
+            to now.
+        uris (list): The URI of each document. Defaults to the documents'
+            own `uri`, which is only trusted for documents from Calendly,
+            e.g. signed webhooks.
+        tutor (Tutor): The tutor the resources belong to, if known.
+    """
+    etags = etags or {}
+    fetched_at = fetched_at or timezone.now()
+    if uris is None:
+        uris = [document['uri'] for document in documents]
+    CalendlyResource.objects.bulk_create(
+        [CalendlyResource(uri=uri, kind=resource_kind(uri), data=document,
+                          etag=etags.get(uri, ''), fetched_at=fetched_at,
+                          tutor=tutor)
+         for uri, document in zip(uris, documents)],
+        update_conflicts=True, unique_fields=['uri'],
+        update_fields=['kind', 'data', 'etag', 'fetched_at', 'tutor'],
+        batch_size=STORE_BATCH_SIZE)
+
+
+def get_local(uri: str, tutor, max_age=None):
+    """
+    Returns the stored document of a tutor's Calendly resource, or None.
+
+    Args:
+        uri (str): The URI of the resource.
+        tutor (Tutor): The tutor the resource belongs to.
+        max_age (timedelta): The maximum age of the copy, if limited.
+    """
+    resources = CalendlyResource.objects.filter(uri=uri, tutor=tutor)
+    if max_age is not None:
+        resources = resources.filter(fetched_at__gte=timezone.now() - max_age)
+    return resources.values_list('data', flat=True).first()
+
+
+def fetch_resources(uris, tutor, deadline: float, max_age=None) -> list:
+    """
+    Returns the documents of a tutor's Calendly resources.
+
+    Copies stored for the tutor younger than `max_age` are used as they are.
+    The other resources are requested concurrently with the tutor's access
+    token and a shared deadline, conditionally if a copy with an ETag
+    exists, and stored.
+
+    Args:
+        uris (list): The URIs of the resources.
+        tutor (Tutor): The tutor the resources belong to.
+        deadline (float): Seconds to wait for Calendly.
+        max_age (timedelta): The maximum age of copies used without a
+            request; None always asks Calendly.
+
+    Returns:
+        list: The document of each URI, or the exception (usually a
+        requests.RequestException, ValueError or KeyError) that prevented
+        fetching it. URIs outside the Calendly API get a ValueError.
+    """
+    now = timezone.now()
+    documents = {uri: ValueError(f'Not a Calendly API URI: {uri}')
+                 for uri in uris if not is_api_uri(uri)}
+    stored = CalendlyResource.objects.filter(tutor=tutor).in_bulk(
+        [uri for uri in uris if uri not in documents])
+    to_fetch = []
+    for uri in uris:
+        if uri in documents:
+            continue
+        resource = stored.get(uri)
+        if (resource is not None and max_age is not None
+                and resource.fetched_at >= now - max_age):
+            documents[uri] = resource.data
+        else:
+            to_fetch.append(uri)
+    if not to_fetch:
+        return [documents[uri] for uri in uris]
+
+    url_headers = {uri: {'If-None-Match': stored[uri].etag}
+                   for uri in to_fetch if uri in stored and stored[uri].etag}
+    responses = calendly_client.get_many(
+        to_fetch, deadline, url_headers=url_headers,
+        headers={'Authorization': f'Bearer {tutor.calendly_access_token}'})
+
+    fresh, fresh_uris, etags, unchanged = [], [], {}, []
+    for uri, response in zip(to_fetch, responses):
+        if isinstance(response, Exception):
+            documents[uri] = response
+        elif response.status_code == 304 and uri in stored:
+            documents[uri] = stored[uri].data
+            unchanged.append(uri)
+        else:
+            try:
+                response.raise_for_status()
+                documents[uri] = response.json()['resource']
+            except (requests.RequestException, ValueError, KeyError) as error:
+                documents[uri] = error
+                continue
+            fresh.append(documents[uri])
+            fresh_uris.append(uri)
+            etags[uri] = response.headers.get('ETag', '')
+
+    store_resources(fresh, etags, now, uris=fresh_uris, tutor=tutor)
+    CalendlyResource.objects.filter(
+        uri__in=unchanged, tutor=tutor).update(fetched_at=now)
+    return [documents[uri] for uri in uris]
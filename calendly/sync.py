@@ -0,0 +1,260 @@
+"""
+Reconciliation of the tutoring sessions with Calendly.
+
+Sessions are created and cancelled through the booking form and the
+webhooks (see calendly/webhooks.py), but bookings changed while a webhook
+was lost drift from Calendly. `python manage.py sync_calendly_sessions`,
+run from a scheduler, pages through the scheduled events of every connected
+tutor and applies the differences in bulk.
+
+`Tutor.calendly_sync_cursor` records when a tutor was last synced. Later runs
+only list the events starting within SYNC_LOOKBACK of the cursor and only
+fetch the invitees of events updated since. Tutors without a cursor, e.g.
+after connecting Calendly, get their whole history backfilled.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from booking.models import TutoringSession
+from calendly.client import calendly_client
+from calendly.resources import store_resources
+from calendly.webhook_handler import find_student
+from tutor_market.models import Tutor
+
+# Events starting this long before the cursor are still listed.
+SYNC_LOOKBACK = timedelta(days=30)
+# Events updated this long before the cursor are fetched again, for clock
+# differences between Calendly and us.
+CURSOR_MARGIN = timedelta(minutes=5)
+PAGE_SIZE = 100
+WRITE_CHUNK_SIZE = 500
+SYNCED_FIELDS = ['start_time', 'end_time', 'location_url', 'session_name',
+                 'event_uri', 'cancel_url', 'reschedule_url',
+                 'session_status']
+
+
+def session_status(event, invitee, current: str) -> str:
+    """
+    Returns the status of a session given its Calendly event and invitee.
+
+    Calendly only knows whether a booking was cancelled, so any other local
+    status (pending, scheduled or completed) is kept.
+
+    Args:
+        event (dict): The Calendly scheduled event resource.
+        invitee (dict): The Calendly invitee resource or None.
+        current (str): The current status of the session.
+
+    Returns:
+        str: The status.
+    """
+    if invitee is not None and invitee.get('status') == 'canceled':
+        return 'rescheduled' if invitee.get('rescheduled') else 'cancelled'
+    if event.get('status') == 'canceled':
+        return 'cancelled'
+    return current
+
+
+def _iter_collection(url: str, headers: dict, params: dict = None):
+    """
+    Yields the items of a paginated Calendly collection.
+
+    Raises:
+        requests.RequestException: If a page can't be fetched.
+    """
+    while url:
+        response = calendly_client.get(url, headers=headers, params=params)
+        response.raise_for_status()
+        data = response.json()
+        yield from data['collection']
+        # The next page URL carries the query parameters
+        url = data['pagination'].get('next_page')
+        params = None
+
+
+def fetch_changes(tutor, now) -> tuple:
+    """
+    Fetches the scheduled events of a tutor that changed since the tutor's
+    sync cursor, with their invitees. Only talks to Calendly, so it can run
+    in worker threads.
+
+    Args:
+        tutor (Tutor): The tutor.
+        now (datetime): The start of the sync, the tutor's next cursor.
+
+    Returns:
+        tuple: The tutor's Calendly user URI and a list of (event,
+        invitees) tuples.
+
+    Raises:
+        requests.RequestException: If Calendly can't be reached or refuses
+            the tutor's token.
+    """
+    api_url = settings.CALENDLY_API_URL
+    headers = {'Authorization': f'Bearer {tutor.calendly_access_token}'}
+
+    user_uri = tutor.calendly_user_uri
+    if not user_uri:
+        response = calendly_client.get(f'{api_url}/users/me', headers=headers)
+        response.raise_for_status()
+        user_uri = response.json()['resource']['uri']
+
+    params = {'user': user_uri, 'count': PAGE_SIZE, 'sort': 'start_time:asc'}
+    cursor = tutor.calendly_sync_cursor
+    if cursor is not None:
+        params['min_start_time'] = (cursor - SYNC_LOOKBACK).isoformat()
+
+    changes = []
+    for event in _iter_collection(
+            f'{api_url}/scheduled_events', headers, params):
+        updated_at = parse_datetime(event['updated_at'])
+        if cursor is not None and updated_at < cursor - CURSOR_MARGIN:
+            continue
+        invitees = list(_iter_collection(
+            f"{event['uri']}/invitees", headers, {'count': PAGE_SIZE}))
+        changes.append((event, invitees))
+    return user_uri, changes
+
+
+def apply_changes(tutor, changes) -> dict:
+    """
+    Applies the changed events of a tutor to the tutoring sessions.
+
+    Sessions are matched by invitee URI, and sessions whose invitee is not
+    listed by event URI. New invitees are created as sessions if their
+    student is known. Writes use bulk_update and bulk_create in chunks. The
+    events and invitees are stored as Calendly resources.
+
+    Args:
+        tutor (Tutor): The tutor.
+        changes (list): The (event, invitees) tuples of fetch_changes.
+
+    Returns:
+        dict: The number of created, updated and skipped sessions. Invitees
+        without a known student or whose session was created meanwhile are
+        skipped.
+    """
+    invitee_uris = [invitee['uri']
+                    for _, invitees in changes for invitee in invitees]
+    event_uris = [event['uri'] for event, _ in changes]
+    sessions = TutoringSession.objects.filter(
+        Q(invitee_uri__in=invitee_uris) | Q(event_uri__in=event_uris))
+    by_invitee = {session.invitee_uri: session for session in sessions}
+    by_event = {}
+    for session in by_invitee.values():
+        by_event.setdefault(session.event_uri, []).append(session)
+
+    counts = {'created': 0, 'updated': 0, 'skipped': 0}
+    changed, new = [], []
+    subject = None
+    for event, invitees in changes:
+        matched = set()
+        for invitee in invitees:
+            fields = TutoringSession.objects.calendly_fields(event, invitee)
+            session = by_invitee.get(invitee['uri'])
+            if session is None:
+                student = find_student(invitee)
+                if student is None:
+                    counts['skipped'] += 1
+                    continue
+                subject = subject or tutor.subjects.first()
+                new.append(TutoringSession(
+                    **fields, invitee_uri=invitee['uri'], tutor=tutor,
+                    student=student, price=tutor.hourly_rate,
+                    subject=subject,
+                    session_status=session_status(event, invitee, 'pending')))
+                continue
+
+            matched.add(session.pk)
+            fields['session_status'] = session_status(
+                event, invitee, session.session_status)
+            if any(getattr(session, field) != fields[field]
+                   for field in SYNCED_FIELDS):
+                for field in SYNCED_FIELDS:
+                    setattr(session, field, fields[field])
+                changed.append(session)
+
+        # Sessions of the event whose invitee Calendly no longer lists
+        for session in by_event.get(event['uri'], []):
+            status = session_status(event, None, session.session_status)
+            if session.pk not in matched and status != session.session_status:
+                session.session_status = status
+                changed.append(session)
+
+    with transaction.atomic():
+        store_resources(
+            [event for event, _ in changes]
+            + [invitee for _, invitees in changes for invitee in invitees],
+            tutor=tutor)
+        TutoringSession.objects.bulk_update(
+            changed, SYNCED_FIELDS, batch_size=WRITE_CHUNK_SIZE)
+        # Sessions created meanwhile by a webhook are left alone. The rows
+        # skipped as conflicts are not reported, so the inserted ones are
+        # counted.
+        new_sessions = TutoringSession.objects.filter(
+            invitee_uri__in=[session.invitee_uri for session in new])
+        existing = new_sessions.count() if new else 0
+        TutoringSession.objects.bulk_create(
+            new, batch_size=WRITE_CHUNK_SIZE, ignore_conflicts=True)
+        created = new_sessions.count() - existing if new else 0
+    counts['updated'] += len({session.pk for session in changed})
+    counts['created'] += created
+    counts['skipped'] += len(new) - created
+    return counts
+
+
+def connected_tutors():
+    """
+    Returns the tutors connected to Calendly, those to backfill first.
+    """
+    return Tutor.objects.exclude(
+        calendly_access_token__isnull=True
+    ).exclude(calendly_access_token='').exclude(
+        calendly_token_status='error'
+    ).order_by(F('calendly_sync_cursor').asc(nulls_first=True), 'pk')
+
+
+def sync_sessions(tutors=None, concurrency: int = 4) -> dict:
+    """
+    Reconciles the tutoring sessions of tutors with Calendly.
+
+    The events of up to `concurrency` tutors are fetched at a time; the
+    changes are applied in the calling thread. A tutor's cursor only
+    advances when their sync succeeded.
+
+    Args:
+        tutors (QuerySet): The tutors, defaults to connected_tutors().
+        concurrency (int): The maximum number of tutors fetched at once.
+
+    Returns:
+        dict: The number of created, updated and skipped sessions and of
+        failed tutors.
+    """
+    tutors = list(connected_tutors() if tutors is None else tutors)
+    now = timezone.now()
+    totals = {'created': 0, 'updated': 0, 'skipped': 0, 'failed': 0}
+
+    def fetch(tutor):
+        try:
+            return fetch_changes(tutor, now)
+        except (requests.RequestException, ValueError, KeyError):
+            return None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for tutor, result in zip(tutors, executor.map(fetch, tutors)):
+            if result is None:
+                totals['failed'] += 1
+                continue
+            user_uri, changes = result
+            for outcome, count in apply_changes(tutor, changes).items():
+                totals[outcome] += count
+            Tutor.objects.filter(pk=tutor.pk).update(
+                calendly_user_uri=user_uri, calendly_sync_cursor=now)
+    return totals
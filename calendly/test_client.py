@@ -0,0 +1,105 @@
+import socket
+import time
+from unittest import mock
+from django.db import DatabaseError
+from django.test import SimpleTestCase
+import requests
+
+from calendly.client import CalendlyClient, CalendlyUnavailable
+from calendly.testing import FakeCalendlyServerMixin, QuietHandler
+
+
+class FakeCalendlyHandler(QuietHandler):
+    """
+    Answers /ok with 200, /down with 503 and /flaky with 503 for the first
+    two requests. Records the client address of every request.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def _respond(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path,
+                                    self.client_address))
+            count = sum(1 for request in server.requests
+                        if request[1] == self.path)
+        status = 200
+        if self.path == '/down' or (self.path == '/flaky' and count <= 2):
+            status = 503
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = b'{}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _respond
+
+
+class CalendlyClientTestCases(FakeCalendlyServerMixin, SimpleTestCase):
+    """Test cases for the shared Calendly HTTP client."""
+
+    handler_class = FakeCalendlyHandler
+
+    def setUp(self):
+        self.server.requests = []
+        self.calendly = CalendlyClient(breaker_threshold=3,
+                                       breaker_cooldown=0.2)
+
+    def tearDown(self):
+        self.calendly.session.close()
+
+    def test_connections_are_kept_alive(self):
+        for _ in range(5):
+            response = self.calendly.get(f'{self.base_url}/ok')
+            self.assertEqual(response.status_code, 200)
+        addresses = {address for _, _, address in self.server.requests}
+        self.assertEqual(len(addresses), 1)
+
+    def test_idempotent_requests_are_retried(self):
+        response = self.calendly.get(f'{self.base_url}/flaky')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_posts_are_not_repeated(self):
+        response = self.calendly.post(
+            f'{self.base_url}/flaky', data={'a': 1})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_unsent_posts_are_retried(self):
+        with socket.socket() as unused:
+            unused.bind(('127.0.0.1', 0))
+            url = f'http://127.0.0.1:{unused.getsockname()[1]}/token'
+        client = CalendlyClient(breaker_threshold=10)
+        with self.assertRaises(requests.ConnectionError):
+            client.post(url, data={'a': 1})
+        self.assertEqual(client._breaker(url).failures, 3)
+
+    def test_breaker_fails_fast_and_recovers(self):
+        client = CalendlyClient(max_retries=0, breaker_threshold=3,
+                                breaker_cooldown=0.2)
+        for _ in range(3):
+            client.get(f'{self.base_url}/down')
+        with self.assertRaises(CalendlyUnavailable):
+            client.get(f'{self.base_url}/ok')
+        self.assertEqual(len(self.server.requests), 3)
+
+        time.sleep(0.25)
+        self.assertEqual(client.get(f'{self.base_url}/ok').status_code, 200)
+        self.assertEqual(client.get(f'{self.base_url}/ok').status_code, 200)
+        client.session.close()
+
+    def test_get_many_returns_errors(self):
+        limiter = mock.Mock()
+        limiter.acquire.side_effect = [None, DatabaseError('cache failed')]
+        client = CalendlyClient(limiter=limiter)
+        with mock.patch('calendly.client.connections') as connections:
+            results = client.get_many(
+                [f'{self.base_url}/ok', f'{self.base_url}/ok'], 5)
+        errors = [result for result in results
+                  if isinstance(result, DatabaseError)]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(connections.close_all.call_count, 2)
+        client.session.close()
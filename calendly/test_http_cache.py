@@ -0,0 +1,135 @@
+import json
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from calendly.client import CalendlyClient
+from calendly.http_cache import ResponseCache, freshness
+from calendly.testing import FakeCalendlyServerMixin, QuietHandler
+
+
+class CachingCalendlyHandler(QuietHandler):
+    """
+    Serves /fresh/<n> with max-age=60, /etag with no-cache and an ETag
+    (answering 304 when it matches) and /nostore with no-store. Records the
+    path, Authorization and If-None-Match of every request.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers['Authorization'],
+                                    self.headers['If-None-Match']))
+        headers = {'Cache-Control': 'no-store'}
+        if self.path.startswith('/fresh'):
+            headers = {'Cache-Control': 'private, max-age=60'}
+        elif self.path == '/etag':
+            headers = {'Cache-Control': 'no-cache',
+                       'ETag': f'"{server.version}"'}
+
+        if ('ETag' in headers
+                and self.headers['If-None-Match'] == headers['ETag']):
+            self.send_response(304)
+            body = b''
+        else:
+            self.send_response(200)
+            headers['Content-Type'] = 'application/json'
+            body = json.dumps({'resource': {'path': self.path,
+                                            'version': server.version}})
+            body = body.encode()
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ResponseCacheTestCases(FakeCalendlyServerMixin, SimpleTestCase):
+    """Test cases for the HTTP cache of the Calendly client."""
+
+    handler_class = CachingCalendlyHandler
+
+    def setUp(self):
+        cache.clear()
+        self.server.requests = []
+        self.server.version = 1
+        self.cache = ResponseCache(max_entries=2)
+        self.calendly = CalendlyClient(cache=self.cache)
+        self.headers = {'Authorization': 'Bearer token'}
+
+    def tearDown(self):
+        self.calendly.session.close()
+
+    def get(self, path, **kwargs):
+        kwargs.setdefault('headers', self.headers)
+        response = self.calendly.get(f'{self.base_url}{path}', **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['resource']
+
+    def test_fresh_responses_are_served_from_the_cache(self):
+        self.get('/fresh/1')
+        self.server.version = 2
+        self.assertEqual(self.get('/fresh/1')['version'], 1)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+        self.assertEqual(self.cache.stats()['hit_ratio'], 0.5)
+
+    def test_entries_are_per_token_and_query(self):
+        self.get('/fresh/1')
+        self.get('/fresh/1', headers={'Authorization': 'Bearer other'})
+        self.get('/fresh/1', params={'count': 10})
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_etags_are_revalidated(self):
+        self.get('/etag')
+        self.assertEqual(self.get('/etag')['version'], 1)
+        self.assertEqual(self.server.requests[1][2], '"1"')
+        self.assertEqual(self.cache.stats()['revalidations'], 1)
+
+        self.server.version = 2
+        self.assertEqual(self.get('/etag')['version'], 2)
+        self.assertEqual(self.get('/etag')['version'], 2)
+        self.assertEqual(self.server.requests[3][2], '"2"')
+        self.assertEqual(self.cache.stats()['revalidations'], 2)
+
+    def test_no_store_responses_are_not_cached(self):
+        self.get('/nostore')
+        self.get('/nostore')
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def test_own_conditional_requests_bypass_the_cache(self):
+        self.get('/fresh/1')
+        response = self.calendly.get(
+            f'{self.base_url}/fresh/1',
+            headers={**self.headers, 'If-None-Match': '"0"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.get('/fresh/1')
+        self.get('/fresh/2')
+        self.get('/fresh/1')
+        self.get('/fresh/3')
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+        self.server.requests = []
+        self.get('/fresh/1')
+        self.get('/fresh/3')
+        self.get('/fresh/2')
+        self.assertEqual([path for path, _, _ in self.server.requests],
+                         ['/fresh/2'])
+
+    def test_large_responses_are_not_cached(self):
+        self.calendly.cache = ResponseCache(max_entry_size=10)
+        self.get('/fresh/1')
+        self.get('/fresh/1')
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_freshness(self):
+        self.assertEqual(freshness({'Cache-Control': 'max-age=30'}), 30)
+        self.assertEqual(freshness({'Cache-Control': 'max-age=30, no-cache'}),
+                         0)
+        self.assertIsNone(freshness({'Cache-Control': 'no-store'}))
+        self.assertEqual(freshness({}), 0)
@@ -0,0 +1,123 @@
+import threading
+import time
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from calendly import tokens
+from calendly.locks import LockTimeout, cache_lock, tutor_token_lock
+from calendly.views import refresh_access_token
+from tutor_market.models import Tutor
+from tutor_market.testing import create_tutor
+
+
+class TokenRefreshLockTestCases(TransactionTestCase):
+    """Test cases for the single-flight Calendly token refresh."""
+
+    def setUp(self):
+        """Create a tutor with an expired Calendly token."""
+        cache.clear()
+        self.tutor = create_tutor('testuser', calendly_access_token='expired',
+                                  calendly_refresh_token='refresh-0')
+        self.calls = []
+        self.calls_lock = threading.Lock()
+
+    def fake_refresh(self, refresh_token):
+        """Rotates the refresh token like Calendly, slowly."""
+        with self.calls_lock:
+            self.calls.append(refresh_token)
+            number = len(self.calls)
+        time.sleep(0.05)
+        if refresh_token != f'refresh-{number - 1}':
+            return 400, {'error': 'invalid_grant',
+                         'error_description': 'Refresh token was rotated'}
+        return 200, {'access_token': f'access-{number}',
+                     'refresh_token': f'refresh-{number}',
+                     'expires_in': 7200}
+
+    def test_concurrent_refreshes_share_one_request(self):
+        results = []
+        start = threading.Barrier(16)
+
+        def refresh():
+            # Every worker loaded the tutor before the token was refreshed
+            tutor = Tutor.objects.get(pk=self.tutor.pk)
+            start.wait()
+            try:
+                results.append(refresh_access_token(tutor))
+            finally:
+                connection.close()
+
+        with mock.patch('calendly.views.request_token_refresh',
+                        side_effect=self.fake_refresh):
+            threads = [threading.Thread(target=refresh) for _ in range(16)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(self.calls, ['refresh-0'])
+        self.assertEqual(len(results), 16)
+        self.assertEqual({result['access_token'] for result in results},
+                         {'access-1'})
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.calendly_access_token, 'access-1')
+        self.assertEqual(self.tutor.calendly_refresh_token, 'refresh-1')
+        self.assertIsNotNone(self.tutor.calendly_token_expires_at)
+
+    def test_scheduler_discards_outcomes_for_rotated_tokens(self):
+        stale = Tutor.objects.get(pk=self.tutor.pk)
+        with mock.patch('calendly.views.request_token_refresh',
+                        side_effect=self.fake_refresh):
+            refresh_access_token(self.tutor)
+
+        outcome = tokens._persist_refresh(
+            stale, 400, {'error': 'invalid_grant'}, timezone.now())
+        self.assertEqual(outcome, 'rotated')
+        self.tutor.refresh_from_db()
+        self.assertTrue(self.tutor.profile_status)
+        self.assertEqual(self.tutor.calendly_refresh_token, 'refresh-1')
+
+    def test_waiters_give_up_without_refreshing(self):
+        with mock.patch('calendly.locks.LEASE_WAIT', 0.1):
+            with tutor_token_lock(self.tutor.pk) as (_, held):
+                self.assertTrue(held)
+                with mock.patch('calendly.views.request_token_refresh',
+                                side_effect=self.fake_refresh):
+                    response_data = refresh_access_token(self.tutor)
+        self.assertEqual(response_data['error'], 'refresh_in_progress')
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.tutor.calendly_refresh_token, 'refresh-0')
+
+    def test_refreshes_do_not_lock_the_tutor_row(self):
+        finished = []
+
+        def rate():
+            try:
+                Tutor(pk=self.tutor.pk).refresh_rating_stats()
+                finished.append(True)
+            finally:
+                connection.close()
+
+        def slow_refresh(refresh_token):
+            # Rating writes lock the tutor row while the request runs
+            thread = threading.Thread(target=rate)
+            thread.start()
+            thread.join(timeout=5)
+            return self.fake_refresh(refresh_token)
+
+        with mock.patch('calendly.views.request_token_refresh',
+                        side_effect=slow_refresh):
+            refresh_access_token(self.tutor)
+        self.assertEqual(finished, [True])
+        self.assertEqual(self.tutor.calendly_refresh_token, 'refresh-1')
+
+    def test_cache_locks_time_out(self):
+        with cache_lock('lock', timeout=5):
+            with self.assertRaises(LockTimeout):
+                with cache_lock('lock', timeout=5, wait=0.1):
+                    pass
+        with cache_lock('lock', timeout=5, wait=0):
+            pass
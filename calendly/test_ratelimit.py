@@ -0,0 +1,158 @@
+import threading
+import time
+from email.utils import formatdate
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+import requests
+
+from calendly.client import CalendlyClient
+from calendly.ratelimit import CalendlyRateLimited, RateLimiter, retry_after
+from calendly.testing import FakeCalendlyServerMixin, QuietHandler
+
+
+class RateLimitedHandler(QuietHandler):
+    """
+    Answers /ok with 200 and /limited with 429 and a Retry-After of one
+    second for its first request. Records the time of every request.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def _respond(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, time.monotonic()))
+            count = sum(1 for path, _ in server.requests if path == self.path)
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path == '/limited' and count == 1:
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    do_GET = do_POST = _respond
+
+
+class RateLimiterTestCases(FakeCalendlyServerMixin, SimpleTestCase):
+    """Test cases for the rate limiting of Calendly requests."""
+
+    handler_class = RateLimitedHandler
+
+    def setUp(self):
+        cache.clear()
+        self.server.requests = []
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.session.close()
+
+    def calendly(self, max_retries=2, **kwargs):
+        client = CalendlyClient(max_retries=max_retries,
+                                limiter=RateLimiter(**kwargs))
+        self.clients.append(client)
+        return client
+
+    def get(self, client, path='/ok', token='a'):
+        return client.get(f'{self.base_url}{path}',
+                          headers={'Authorization': f'Bearer {token}'})
+
+    def test_bursts_are_spread_out(self):
+        client = self.calendly(rate=10, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            self.assertEqual(self.get(client).status_code, 200)
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        self.assertEqual(client.limiter.stats()['throttled'], 2)
+        self.assertEqual(client.limiter.stats()['waiting'], 0)
+
+    def test_buckets_are_per_access_token(self):
+        client = self.calendly(rate=0.1, burst=1, max_wait=0)
+        self.get(client, token='a')
+        self.get(client, token='b')
+        with self.assertRaises(CalendlyRateLimited):
+            self.get(client, token='a')
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(client.limiter.stats()['rejected'], 1)
+
+    def test_buckets_are_shared_between_workers(self):
+        self.get(self.calendly(rate=0.1, burst=1))
+        with self.assertRaises(requests.RequestException):
+            self.get(self.calendly(rate=0.1, burst=1, max_wait=0.5))
+
+    def test_concurrent_waiters_are_counted(self):
+        client = self.calendly(rate=20, burst=1)
+        threads = [threading.Thread(target=self.get, args=(client,))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertGreaterEqual(client.limiter.stats()['max_waiting'], 2)
+
+    def test_retry_after_holds_back_all_workers(self):
+        client = self.calendly()
+        other_worker = self.calendly(max_wait=0.2)
+        start = time.monotonic()
+        response = self.get(client, '/limited')
+        self.assertEqual(response.status_code, 200)
+        retry_at = self.server.requests[1][1]
+        self.assertGreaterEqual(retry_at - start, 1)
+        self.assertEqual(client.limiter.stats()['rate_limited'], 1)
+
+        cache.clear()
+        self.server.requests = []
+        response = self.get(self.calendly(max_retries=0), '/limited')
+        self.assertEqual(response.status_code, 429)
+        with self.assertRaises(CalendlyRateLimited):
+            self.get(other_worker, token='a')
+
+    def test_retry_after(self):
+        response = requests.Response()
+        response.headers['Retry-After'] = '3'
+        self.assertEqual(retry_after(response), 3)
+        response.headers['Retry-After'] = formatdate(time.time() + 60,
+                                                     usegmt=True)
+        self.assertAlmostEqual(retry_after(response), 60, delta=2)
+        del response.headers['Retry-After']
+        self.assertEqual(retry_after(response), 10)
+
+
+# Two aliases of one database cache table, like the caches of two worker
+# processes
+SHARED_CACHE = {
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+    'LOCATION': 'calendly_test_cache',
+}
+
+
+@override_settings(CACHES={'default': SHARED_CACHE,
+                           'other_worker': SHARED_CACHE})
+class SharedRateLimiterTestCases(TestCase):
+    """Test cases for rate limiting through a cache shared by workers."""
+
+    def setUp(self):
+        call_command('createcachetable', verbosity=0)
+
+    def test_workers_share_the_buckets(self):
+        key = RateLimiter.key('https://api.calendly.com/users/me',
+                              {'Authorization': 'Bearer a'})
+        worker = RateLimiter(rate=0.1, burst=2, max_wait=0)
+        other_worker = RateLimiter(rate=0.1, burst=2, max_wait=0,
+                                   alias='other_worker')
+        worker.acquire(key)
+        other_worker.acquire(key)
+        with self.assertRaises(CalendlyRateLimited):
+            worker.acquire(key)
+        with self.assertRaises(CalendlyRateLimited):
+            other_worker.acquire(key)
+
+    def test_blocks_reach_all_workers(self):
+        key = RateLimiter.key('https://api.calendly.com/users/me')
+        RateLimiter(alias='other_worker').block(key, 60)
+        with self.assertRaises(CalendlyRateLimited):
+            RateLimiter(max_wait=0).acquire(key)
@@ -0,0 +1,136 @@
+import json
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+
+from calendly.models import CalendlyResource
+from calendly.resources import fetch_resources, get_local, store_resources
+from calendly.testing import FakeCalendlyServerMixin, QuietHandler
+from tutor_market.testing import create_tutor
+
+
+class ETagHandler(QuietHandler):
+    """
+    Serves the server's `documents` by path with an ETag, answering 304 to
+    matching If-None-Match headers.
+    """
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.headers['If-None-Match']))
+        document = server.documents.get(self.path)
+        if document is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = f'"{document["version"]}"'
+        if self.headers['If-None-Match'] == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        body = json.dumps({'resource': document}).encode()
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class CalendlyResourceTestCases(FakeCalendlyServerMixin, TestCase):
+    """Test cases for the local copies of Calendly resources."""
+
+    handler_class = ETagHandler
+    calendly_settings = ('CALENDLY_API_URL',)
+
+    def setUp(self):
+        self.tutor = create_tutor('tutor', calendly_access_token='token')
+        self.event_uri = f'{self.base_url}/scheduled_events/E1'
+        self.invitee_uri = f'{self.event_uri}/invitees/I1'
+        self.server.requests = []
+        self.server.documents = {
+            '/scheduled_events/E1': {'uri': self.event_uri, 'version': 1},
+            '/scheduled_events/E1/invitees/I1': {
+                'uri': self.invitee_uri, 'version': 1,
+                'questions_and_answers': [{'question': 'Topic?',
+                                           'answer': 'Algebra'}]},
+        }
+
+    def fetch(self, max_age=None, tutor=None):
+        return fetch_resources([self.event_uri, self.invitee_uri],
+                               tutor or self.tutor, 5, max_age=max_age)
+
+    def test_fetched_documents_are_stored(self):
+        event, invitee = self.fetch()
+        self.assertEqual(invitee['questions_and_answers'][0]['answer'],
+                         'Algebra')
+        stored = CalendlyResource.objects.get(uri=self.invitee_uri)
+        self.assertEqual(stored.kind, 'invitee')
+        self.assertEqual(stored.etag, '"1"')
+        self.assertEqual(stored.data, invitee)
+        self.assertEqual(
+            CalendlyResource.objects.get(uri=self.event_uri).kind, 'event')
+
+    def test_unchanged_documents_are_revalidated(self):
+        self.fetch()
+        CalendlyResource.objects.update(
+            fetched_at=timezone.now() - timedelta(hours=1))
+        self.server.requests = []
+        self.server.documents['/scheduled_events/E1']['version'] = 2
+
+        event, invitee = self.fetch()
+        self.assertEqual(sorted(self.server.requests), [
+            ('/scheduled_events/E1', '"1"'),
+            ('/scheduled_events/E1/invitees/I1', '"1"'),
+        ])
+        self.assertEqual(event['version'], 2)
+        self.assertEqual(invitee['version'], 1)
+        # The 304 marks the stored copy as fresh
+        self.assertIsNotNone(get_local(self.invitee_uri, self.tutor,
+                                       max_age=timedelta(minutes=1)))
+
+    def test_fresh_copies_are_served_locally(self):
+        store_resources([{'uri': self.event_uri, 'version': 0}],
+                        tutor=self.tutor)
+        event, invitee = self.fetch(max_age=timedelta(minutes=5))
+        self.assertEqual(event['version'], 0)
+        self.assertEqual([path for path, _ in self.server.requests],
+                         ['/scheduled_events/E1/invitees/I1'])
+
+    def test_failed_fetches_are_returned_as_errors(self):
+        del self.server.documents['/scheduled_events/E1/invitees/I1']
+        event, invitee = self.fetch()
+        self.assertEqual(event['version'], 1)
+        self.assertIsInstance(invitee, Exception)
+        self.assertFalse(CalendlyResource.objects.filter(
+            uri=self.invitee_uri).exists())
+
+    def test_documents_are_stored_under_the_requested_uri(self):
+        other_uri = f'{self.base_url}/scheduled_events/E2'
+        self.server.documents['/scheduled_events/E1'].update(
+            uri=other_uri, version=2)
+        self.fetch()
+        self.assertEqual(
+            CalendlyResource.objects.get(uri=self.event_uri).data['uri'],
+            other_uri)
+        self.assertFalse(
+            CalendlyResource.objects.filter(uri=other_uri).exists())
+
+    def test_copies_are_scoped_to_their_tutor(self):
+        store_resources([{'uri': self.event_uri, 'version': 0}],
+                        tutor=self.tutor)
+        other_tutor = create_tutor('other', calendly_access_token='token')
+        event, _ = self.fetch(max_age=timedelta(minutes=5),
+                              tutor=other_tutor)
+        self.assertEqual(event['version'], 1)
+        self.assertIsNone(get_local(self.event_uri, self.tutor))
+        self.assertIsNotNone(get_local(self.event_uri, other_tutor))
+
+    def test_foreign_uris_are_not_fetched(self):
+        uri = 'http://example.com/scheduled_events/E1'
+        document, = fetch_resources([uri], self.tutor, 5)
+        self.assertIsInstance(document, ValueError)
+        self.assertEqual(self.server.requests, [])
+        self.assertFalse(CalendlyResource.objects.exists())
@@ -0,0 +1,168 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from booking.models import TutoringSession
+from calendly import sync
+from calendly.testing import FakeCalendlyServerMixin, QuietHandler
+from tutor_market.models import Subject, Tutor
+from tutor_market.testing import create_tutor
+
+
+class FakeCalendlyApiHandler(QuietHandler):
+    """
+    Serves the server's `events` and `invitees` like Calendly's API, with
+    `count` events per page. Rejects tokens other than 'valid'.
+    """
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        params = {key: values[0]
+                  for key, values in parse_qs(url.query).items()}
+        server.requests.append((url.path, params))
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+        if self.headers['Authorization'] != 'Bearer valid':
+            status, data = 401, {'title': 'Unauthenticated'}
+        elif url.path == '/users/me':
+            status, data = 200, {'resource': {'uri': f'{base_url}/users/T'}}
+        elif url.path == '/scheduled_events':
+            offset = int(params.get('page_token', 0))
+            count = int(params['count'])
+            events = server.events[offset:offset + count]
+            next_page = None
+            if offset + count < len(server.events):
+                next_page = (f'{base_url}/scheduled_events?count={count}'
+                             f'&page_token={offset + count}')
+            status, data = 200, {'collection': events,
+                                 'pagination': {'next_page': next_page}}
+        else:
+            event_uri = base_url + url.path.removesuffix('/invitees')
+            status, data = 200, {
+                'collection': server.invitees.get(event_uri, []),
+                'pagination': {'next_page': None}}
+
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class CalendlySyncTestCases(FakeCalendlyServerMixin, TestCase):
+    """Test cases for the session sync against a fake Calendly API."""
+
+    handler_class = FakeCalendlyApiHandler
+    calendly_settings = ('CALENDLY_API_URL',)
+
+    def setUp(self):
+        """Create a connected tutor, a student and three Calendly events."""
+        self.tutor = create_tutor(
+            'tutor', [Subject.objects.create(name='Mathematics')],
+            hourly_rate=Decimal('50.00'), calendly_access_token='valid')
+        self.student = User.objects.create_user(
+            username='student', password='test_password',
+            email='student@example.com')
+
+        self.long_ago = (timezone.now() - timedelta(days=2)).isoformat()
+        self.server.requests = []
+        self.server.events = [self.event(i) for i in range(3)]
+        self.server.invitees = {
+            event['uri']: [self.invitee(event, i)]
+            for i, event in enumerate(self.server.events)}
+        # Booked by someone without an account
+        self.server.invitees[self.server.events[2]['uri']][0]['email'] = (
+            'stranger@example.com')
+
+        # Known session, since cancelled on Calendly
+        event = self.server.events[0]
+        self.session, _ = TutoringSession.objects.upsert_from_calendly(
+            event, self.invitee(event, 0), self.tutor, self.student,
+            'scheduled')
+        event['status'] = 'canceled'
+
+    def event(self, i):
+        return {
+            'uri': f'{self.base_url}/scheduled_events/E{i}',
+            'name': 'Math Tutoring Session',
+            'status': 'active',
+            'start_time': f'2030-05-0{i + 1}T10:00:00.000000Z',
+            'end_time': f'2030-05-0{i + 1}T11:00:00.000000Z',
+            'created_at': '2030-04-01T10:00:00.000000Z',
+            'updated_at': self.long_ago,
+            'location': {'join_url': 'https://example.com/join'},
+        }
+
+    def invitee(self, event, i):
+        return {
+            'uri': f"{event['uri']}/invitees/I{i}",
+            'email': 'student@example.com',
+            'status': 'active',
+            'cancel_url': f'https://calendly.com/cancellations/{i}',
+            'reschedule_url': f'https://calendly.com/reschedulings/{i}',
+            'questions_and_answers': [],
+        }
+
+    def invitee_requests(self):
+        return [path for path, _ in self.server.requests
+                if path.endswith('/invitees')]
+
+    @mock.patch('calendly.sync.PAGE_SIZE', 2)
+    def test_backfill_and_incremental_sync(self):
+        totals = sync.sync_sessions()
+        self.assertEqual(totals, {'created': 1, 'updated': 1, 'skipped': 1,
+                                  'failed': 0})
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.session_status, 'cancelled')
+        created = TutoringSession.objects.get(invitee_uri__endswith='/I1')
+        self.assertEqual(created.student, self.student)
+        self.assertEqual(created.price, Decimal('50.00'))
+        self.assertEqual(len(self.invitee_requests()), 3)
+
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.calendly_user_uri,
+                         f'{self.base_url}/users/T')
+        self.assertIsNotNone(self.tutor.calendly_sync_cursor)
+
+        # Only events updated since the last sync are looked at
+        self.server.requests = []
+        event = self.server.events[1]
+        event['updated_at'] = timezone.now().isoformat()
+        event['start_time'] = '2030-06-01T10:00:00.000000Z'
+        event['end_time'] = '2030-06-01T11:00:00.000000Z'
+        call_command('sync_calendly_sessions', stdout=StringIO())
+
+        self.assertEqual(self.invitee_requests(),
+                         ['/scheduled_events/E1/invitees'])
+        self.assertIn('min_start_time', self.server.requests[0][1])
+        created.refresh_from_db()
+        self.assertEqual(created.start_time.month, 6)
+        self.assertEqual(TutoringSession.objects.count(), 2)
+
+    def test_conflicting_sessions_are_not_counted_as_created(self):
+        event = self.event(5)
+        invitee = self.invitee(event, 5)
+        # Listed twice, so the second session conflicts with the first
+        counts = sync.apply_changes(
+            self.tutor, [(event, [invitee]), (event, [invitee])])
+        self.assertEqual(counts, {'created': 1, 'updated': 0, 'skipped': 1})
+        self.assertEqual(TutoringSession.objects.filter(
+            invitee_uri=invitee['uri']).count(), 1)
+
+    def test_failed_tutors_keep_their_cursor(self):
+        Tutor.objects.filter(pk=self.tutor.pk).update(
+            calendly_access_token='expired')
+        self.assertEqual(sync.sync_sessions()['failed'], 1)
+        self.tutor.refresh_from_db()
+        self.assertIsNone(self.tutor.calendly_sync_cursor)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.session_status, 'scheduled')
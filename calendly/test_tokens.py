@@ -0,0 +1,245 @@
+import json
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+import requests
+
+from calendly import tokens
+from calendly.locks import tutor_token_lock
+from calendly.testing import FakeCalendlyServerMixin, QuietHandler
+from tutor_market.models import Tutor
+from tutor_market.testing import create_tutor
+
+
+def fake_response(status_code, data):
+    """Returns a stand-in for a requests response."""
+    response = mock.Mock(status_code=status_code)
+    response.json.return_value = data
+    return response
+
+
+class CalendlyTokenHealthTestCases(TestCase):
+    """Test cases for the recorded Calendly token health."""
+
+    def setUp(self):
+        """Create a tutor with Calendly tokens."""
+        self.tutor = create_tutor('testuser', calendly_access_token='access',
+                                  calendly_refresh_token='refresh')
+
+    @mock.patch('calendly.views.calendly_client.post')
+    def test_active_token_records_expiry(self, post):
+        expires = timezone.now().replace(microsecond=0) + timedelta(hours=2)
+        post.return_value = fake_response(
+            200, {'active': True, 'exp': int(expires.timestamp())})
+
+        self.assertEqual(tokens.revalidate_token(self.tutor), 'active')
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.calendly_token_expires_at, expires)
+        self.assertIsNotNone(self.tutor.calendly_token_checked_at)
+
+    @mock.patch('calendly.views.calendly_client.post')
+    def test_inactive_token_is_refreshed(self, post):
+        post.side_effect = [
+            fake_response(200, {'active': False}),
+            fake_response(200, {'access_token': 'new',
+                                'refresh_token': 'new_refresh',
+                                'expires_in': 7200}),
+        ]
+        self.assertEqual(tokens.revalidate_token(self.tutor), 'active')
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.calendly_access_token, 'new')
+        self.assertGreater(self.tutor.calendly_token_expires_at,
+                           timezone.now() + timedelta(hours=1))
+
+    @mock.patch('calendly.locks.LEASE_WAIT', 0)
+    @mock.patch('calendly.views.calendly_client.post')
+    def test_refreshes_in_progress_are_not_recorded(self, post):
+        post.return_value = fake_response(200, {'active': False})
+        with tutor_token_lock(self.tutor.pk) as (_, held):
+            self.assertTrue(held)
+            self.assertEqual(tokens.revalidate_token(self.tutor), 'unknown')
+        post.assert_called_once()
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.calendly_token_status, 'unknown')
+        self.assertEqual(self.tutor.calendly_token_error, '')
+
+    @mock.patch('calendly.views.calendly_client.post')
+    def test_failures_are_recorded(self, post):
+        post.return_value = fake_response(
+            400, {'error': 'invalid_client',
+                  'error_description': 'Client is invalid'})
+        self.assertEqual(tokens.revalidate_token(self.tutor), 'error')
+        self.assertEqual(self.tutor.calendly_token_error,
+                         'invalid_client: Client is invalid')
+
+        post.side_effect = requests.ConnectionError('unreachable')
+        self.assertEqual(tokens.revalidate_token(self.tutor), 'error')
+        self.assertIn('unreachable', self.tutor.calendly_token_error)
+
+    @mock.patch('calendly.views.calendly_client.post')
+    def test_command_only_checks_outdated_tokens(self, post):
+        post.return_value = fake_response(200, {'active': True})
+        call_command('revalidate_calendly_tokens', stdout=StringIO())
+        call_command('revalidate_calendly_tokens', stdout=StringIO())
+        self.assertEqual(post.call_count, 1)
+
+        Tutor.objects.filter(pk=self.tutor.pk).update(
+            calendly_token_expires_at=timezone.now() + timedelta(minutes=5))
+        call_command('revalidate_calendly_tokens', stdout=StringIO())
+        self.assertEqual(post.call_count, 2)
+
+    @mock.patch('calendly.views.calendly_client.post')
+    def test_detail_page_reads_the_recorded_state(self, post):
+        User.objects.create_user(username='student', password='12345')
+        self.client.login(username='student', password='12345')
+        url = reverse('tutor_detail', args=[self.tutor.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(list(get_messages(response.wsgi_request)), [])
+
+        tokens.record_token_state(
+            self.tutor, 'error', 'invalid_grant: Refresh token expired')
+        response = self.client.get(url)
+        messages = list(get_messages(response.wsgi_request))
+        self.assertEqual(
+            str(messages[0]), 'invalid_grant: Refresh token expired')
+        post.assert_not_called()
+
+
+class FakeOAuthHandler(QuietHandler):
+    """
+    Calendly's token endpoint. The behaviour depends on the refresh token:
+    'good-*' succeeds, 'revoked-*' is rejected, 'misconfigured-*' fails as
+    if the client secret was wrong and 'flaky-*' fails with a server error.
+    """
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        form = parse_qs(self.rfile.read(length).decode())
+        refresh_token = form['refresh_token'][0]
+
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        time.sleep(0.05)
+        with server.lock:
+            server.active -= 1
+
+        if refresh_token.startswith('good'):
+            status, data = 200, {'access_token': f'access-{refresh_token}',
+                                 'refresh_token': f'{refresh_token}-next',
+                                 'expires_in': 7200}
+        elif refresh_token.startswith('revoked'):
+            status, data = 400, {'error': 'invalid_grant',
+                                 'error_description': 'Token revoked'}
+        elif refresh_token.startswith('misconfigured'):
+            status, data = 401, {'error': 'invalid_client',
+                                 'error_description': 'Client is invalid'}
+        else:
+            status, data = 503, {'error': 'unavailable'}
+
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TokenRefreshSchedulerTestCases(FakeCalendlyServerMixin, TestCase):
+    """Test cases for the scheduled token refresh against a fake OAuth
+    server."""
+
+    handler_class = FakeOAuthHandler
+    calendly_settings = ('CALENDLY_AUTH_URL',)
+
+    def setUp(self):
+        self.server.active = 0
+        self.server.peak = 0
+
+    def _create_tutor(self, name, refresh_token, expires_in):
+        return create_tutor(
+            name,
+            calendly_access_token='access',
+            calendly_refresh_token=refresh_token,
+            calendly_token_expires_at=timezone.now() + expires_in,
+        )
+
+    def test_expiring_tokens_are_refreshed_concurrently(self):
+        tutors = [self._create_tutor(f'good{i}', f'good-{i}',
+                                     timedelta(minutes=10))
+                  for i in range(6)]
+        fresh = self._create_tutor('fresh', 'good-fresh', timedelta(days=1))
+
+        outcomes = tokens.refresh_due_tokens(concurrency=3, batch_size=4)
+
+        self.assertEqual(outcomes, {'refreshed': 6})
+        self.assertLessEqual(self.server.peak, 3)
+        self.assertGreater(self.server.peak, 1)
+        for i, tutor in enumerate(tutors):
+            tutor.refresh_from_db()
+            self.assertEqual(tutor.calendly_refresh_token, f'good-{i}-next')
+            self.assertGreater(tutor.calendly_token_expires_at,
+                               timezone.now() + timedelta(hours=1))
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.calendly_refresh_token, 'good-fresh')
+
+    def test_server_errors_back_off(self):
+        tutor = self._create_tutor('flaky', 'flaky-1', timedelta(minutes=5))
+
+        self.assertEqual(tokens.refresh_due_tokens(), {'retrying': 1})
+        tutor.refresh_from_db()
+        self.assertTrue(tutor.profile_status)
+        self.assertEqual(tutor.calendly_refresh_failures, 1)
+        self.assertGreater(tutor.calendly_refresh_retry_at, timezone.now())
+
+        # Backing off until the retry time
+        self.assertEqual(tokens.refresh_due_tokens(), {})
+        later = tutor.calendly_refresh_retry_at + timedelta(seconds=1)
+        self.assertEqual(tokens.refresh_due_tokens(now=later),
+                         {'retrying': 1})
+        tutor.refresh_from_db()
+        self.assertEqual(tutor.calendly_refresh_failures, 2)
+
+    def test_rejected_tokens_deactivate_the_profile(self):
+        tutor = self._create_tutor('revoked', 'revoked-1',
+                                   timedelta(minutes=5))
+        call_command('refresh_calendly_tokens', stdout=StringIO())
+        tutor.refresh_from_db()
+        self.assertFalse(tutor.profile_status)
+        self.assertEqual(tutor.calendly_token_status, 'error')
+        self.assertEqual(tutor.calendly_token_error,
+                         'invalid_grant: Token revoked')
+
+    def test_tutors_being_refreshed_are_skipped(self):
+        tutor = self._create_tutor('revoked', 'revoked-1',
+                                   timedelta(minutes=5))
+        with tutor_token_lock(tutor.pk) as (_, held):
+            self.assertTrue(held)
+            self.assertEqual(tokens.refresh_due_tokens(), {'skipped': 1})
+        tutor.refresh_from_db()
+        self.assertTrue(tutor.profile_status)
+        self.assertEqual(tutor.calendly_token_status, 'unknown')
+
+        self.assertEqual(tokens.refresh_due_tokens(), {'failed': 1})
+
+    def test_client_errors_keep_the_profile_active(self):
+        tutor = self._create_tutor('misconfigured', 'misconfigured-1',
+                                   timedelta(minutes=5))
+        self.assertEqual(tokens.refresh_due_tokens(), {'retrying': 1})
+        tutor.refresh_from_db()
+        self.assertTrue(tutor.profile_status)
+        self.assertEqual(tutor.calendly_token_status, 'error')
+        self.assertEqual(tutor.calendly_token_error,
+                         'invalid_client: Client is invalid')
+        self.assertEqual(tutor.calendly_refresh_failures, 1)
+        self.assertGreater(tutor.calendly_refresh_retry_at, timezone.now())
@@ -0,0 +1,174 @@
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from booking.models import TutoringSession
+from calendly.webhooks import verify_signature
+from tutor_market.models import Subject
+from tutor_market.testing import create_tutor
+
+SIGNING_KEY = 'test-signing-key'
+TUTOR_URI = 'https://api.calendly.com/users/TUTOR'
+
+
+def webhook_event(event_type, invitee_id='1', **invitee):
+    """Returns a Calendly webhook event for an invitee."""
+    return {
+        'event': event_type,
+        'created_at': '2030-04-01T10:00:00.000000Z',
+        'created_by': TUTOR_URI,
+        'payload': {
+            'uri': f'https://api.calendly.com/scheduled_events/E/invitees/'
+                   f'{invitee_id}',
+            'email': 'Student@Example.com',
+            'cancel_url': 'https://calendly.com/cancellations/1',
+            'reschedule_url': 'https://calendly.com/reschedulings/1',
+            'questions_and_answers': [{'answer': 'Algebra please.'}],
+            'tracking': {'utm_content': None},
+            'rescheduled': False,
+            'scheduled_event': {
+                'uri': 'https://api.calendly.com/scheduled_events/E',
+                'name': 'Math Tutoring Session',
+                'start_time': '2030-05-01T10:00:00.000000Z',
+                'end_time': '2030-05-01T11:00:00.000000Z',
+                'created_at': '2030-04-01T10:00:00.000000Z',
+                'location': {'join_url': 'https://example.com/join'},
+                'event_memberships': [{'user': TUTOR_URI}],
+            },
+            **invitee,
+        },
+    }
+
+
+@override_settings(CALENDLY_WEBHOOK_SIGNING_KEY=SIGNING_KEY)
+class CalendlyWebhookTestCases(TestCase):
+    """Test cases for the Calendly webhook endpoint."""
+
+    def setUp(self):
+        """Create a tutor connected to Calendly and a student."""
+        self.tutor = create_tutor(
+            'tutor', [Subject.objects.create(name='Mathematics')],
+            hourly_rate=Decimal('50.00'), calendly_user_uri=TUTOR_URI)
+        self.student = User.objects.create_user(
+            username='student', password='test_password',
+            email='student@example.com')
+
+    def post(self, event, timestamp=None, key=SIGNING_KEY):
+        body = json.dumps(event).encode()
+        timestamp = str(int(timestamp or time.time()))
+        signature = hmac.new(key.encode(), f'{timestamp}.'.encode() + body,
+                             hashlib.sha256).hexdigest()
+        return self.client.post(
+            reverse('calendly_webhook'), body,
+            content_type='application/json',
+            HTTP_CALENDLY_WEBHOOK_SIGNATURE=f't={timestamp},v1={signature}')
+
+    def test_signatures_are_required(self):
+        event = webhook_event('invitee.created')
+        self.assertEqual(self.post(event, key='wrong').status_code, 400)
+        self.assertEqual(
+            self.post(event, timestamp=time.time() - 3600).status_code, 400)
+        response = self.client.post(
+            reverse('calendly_webhook'), json.dumps(event),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        with override_settings(CALENDLY_WEBHOOK_SIGNING_KEY=''):
+            self.assertEqual(self.post(event).status_code, 400)
+        self.assertFalse(TutoringSession.objects.exists())
+
+    def test_verify_signature(self):
+        body = b'{}'
+        signature = hmac.new(b'key', b'100.{}', hashlib.sha256).hexdigest()
+        self.assertTrue(verify_signature(
+            body, f't=100,v1={signature}', 'key', now=150))
+        self.assertFalse(verify_signature(
+            body, f't=100,v1={signature}', 'key', now=1000))
+        self.assertFalse(verify_signature(body, 'v1=abc', 'key', now=100))
+        self.assertFalse(verify_signature(body, None, 'key', now=100))
+
+    @mock.patch('calendly.client.calendly_client.request')
+    def test_sessions_are_upserted_from_the_payload(self, request):
+        event = webhook_event('invitee.created')
+        response = self.post(event)
+        self.assertEqual(response.status_code, 200)
+
+        session = TutoringSession.objects.get()
+        self.assertEqual(session.tutor, self.tutor)
+        self.assertEqual(session.student, self.student)
+        self.assertEqual(session.price, Decimal('50.00'))
+        self.assertEqual(session.session_status, 'pending')
+        self.assertEqual(session.location_url, 'https://example.com/join')
+        self.assertEqual(session.invitee_notes, 'Algebra please.')
+
+        # Redelivery keeps the session and its status
+        TutoringSession.objects.update(session_status='scheduled')
+        self.post(event)
+        session = TutoringSession.objects.get()
+        self.assertEqual(session.session_status, 'scheduled')
+        request.assert_not_called()
+
+    def test_cancellations_and_reschedules(self):
+        self.post(webhook_event('invitee.created', '1'))
+        self.post(webhook_event('invitee.canceled', '1'))
+        self.assertEqual(
+            TutoringSession.objects.get().session_status, 'cancelled')
+
+        # A cancellation delivered before its booking
+        self.post(webhook_event('invitee.canceled', '2', rescheduled=True))
+        self.post(webhook_event('invitee.created', '2'))
+        self.assertEqual(TutoringSession.objects.get(
+            invitee_uri__endswith='/2').session_status, 'rescheduled')
+
+    def test_unknown_hosts_and_invitees_are_skipped(self):
+        self.tutor.calendly_user_uri = 'https://api.calendly.com/users/OTHER'
+        self.tutor.save()
+        self.assertEqual(
+            self.post(webhook_event('invitee.created')).status_code, 200)
+        self.assertEqual(self.post(webhook_event(
+            'routing_form_submission.created')).status_code, 200)
+        self.assertFalse(TutoringSession.objects.exists())
+
+    def test_the_student_id_is_only_trusted_with_the_email(self):
+        other = User.objects.create_user(
+            username='other', password='test_password',
+            email='student@example.com')
+        self.post(webhook_event(
+            'invitee.created', '1', tracking={'utm_content': str(other.pk)}))
+        self.post(webhook_event(
+            'invitee.created', '2',
+            tracking={'utm_content': str(self.tutor.user.pk)}))
+        students = dict(TutoringSession.objects.values_list(
+            'invitee_uri', 'student'))
+        self.assertEqual(students[webhook_event(
+            'invitee.created', '1')['payload']['uri']], other.pk)
+        self.assertEqual(students[webhook_event(
+            'invitee.created', '2')['payload']['uri']], self.student.pk)
+
+    def test_replay_command(self):
+        events = [webhook_event('invitee.created', '1'),
+                  webhook_event('invitee.created', '2'),
+                  webhook_event('invitee.canceled', '1')]
+        with tempfile.NamedTemporaryFile(
+                'w', suffix='.ndjson', delete=False) as file:
+            file.write('\n'.join(json.dumps(event) for event in events))
+        self.addCleanup(os.remove, file.name)
+
+        out = StringIO()
+        call_command('replay_calendly_webhooks', file.name, file.name,
+                     stdout=out)
+        self.assertIn('Replayed 6 Calendly webhook events.', out.getvalue())
+        self.assertEqual(dict(TutoringSession.objects.values_list(
+            'invitee_uri', 'session_status')), {
+            events[0]['payload']['uri']: 'cancelled',
+            events[1]['payload']['uri']: 'pending',
+        })
@@ -0,0 +1,44 @@
+"""
+Helpers shared by the tests talking to a fake Calendly server.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import override_settings
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """A request handler that doesn't log the requests it answers."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeCalendlyServerMixin:
+    """
+    Serves `handler_class` on a local port while the test case's tests run.
+
+    The server is available as `cls.server`, with a `lock` for the state
+    handlers keep on it, and its URL as `cls.base_url`. The settings named
+    in `calendly_settings`, e.g. CALENDLY_API_URL, point at the server.
+    """
+    handler_class = QuietHandler
+    calendly_settings = ()
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), cls.handler_class)
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+        cls.settings_override = override_settings(
+            **dict.fromkeys(cls.calendly_settings, cls.base_url))
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
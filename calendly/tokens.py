@@ -0,0 +1,278 @@
+"""
+Health of the tutors' Calendly tokens.
+
+The result of the last token introspection is stored on the tutor together
+with the token's expiry, so pages never wait for Calendly. Tokens are
+revalidated out of band with `python manage.py revalidate_calendly_tokens`
+and refreshed ahead of their expiry with
+`python manage.py refresh_calendly_tokens`, e.g. from a scheduler.
+"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from calendly.locks import (
+    LEASE_TIMEOUT, acquire_cache_lock, release_cache_lock, token_lock_key
+)
+from calendly.views import (
+    expires_at_from_response, introspect_access_token, request_token_refresh
+)
+from tutor_market.models import Tutor
+
+# How long a token check is trusted.
+TOKEN_CHECK_INTERVAL = timedelta(hours=6)
+# Tokens expiring within this margin are checked (and refreshed) early.
+TOKEN_EXPIRY_MARGIN = timedelta(minutes=30)
+# Tokens expiring within this lead time are refreshed by the scheduler.
+REFRESH_LEAD_TIME = timedelta(hours=1)
+# Delay before retrying a failed refresh, doubled per consecutive failure.
+REFRESH_BACKOFF_BASE = timedelta(minutes=1)
+REFRESH_BACKOFF_MAX = timedelta(hours=6)
+
+
+def record_token_state(tutor, status: str, error: str = '',
+                       expires_at=None):
+    """
+    Stores the result of a token check on the tutor.
+
+    The state is written with an UPDATE, so recording a check does not
+    invalidate the tutor's search document or cached card.
+
+    Args:
+        tutor (Tutor): The tutor.
+        status (str): One of Tutor.TOKEN_STATUS_CHOICES.
+        error (str): The error of a failed check.
+        expires_at (datetime): The expiry of the token, if known.
+    """
+    fields = {
+        'calendly_token_status': status,
+        'calendly_token_checked_at': timezone.now(),
+        'calendly_token_error': error[:255],
+    }
+    if expires_at is not None:
+        fields['calendly_token_expires_at'] = expires_at
+    Tutor.objects.filter(pk=tutor.pk).update(**fields)
+    for field, value in fields.items():
+        setattr(tutor, field, value)
+
+
+def revalidate_token(tutor) -> str:
+    """
+    Introspects a tutor's Calendly token, refreshing it if it is no longer
+    active, and records the result. A token that can't be refreshed is
+    recorded as an error, unless another caller is refreshing it.
+
+    Args:
+        tutor (Tutor): The tutor.
+
+    Returns:
+        str: The recorded token status.
+    """
+    try:
+        response_data = introspect_access_token(tutor)
+    except (requests.RequestException, ValueError) as error:
+        record_token_state(tutor, 'error', f'request_failed: {error}')
+        return tutor.calendly_token_status
+
+    if response_data.get('error') == 'refresh_in_progress':
+        # Another caller is refreshing the token and records the outcome
+        return tutor.calendly_token_status
+    if 'error' in response_data:
+        record_token_state(
+            tutor, 'error',
+            f"{response_data['error']}: "
+            f"{response_data.get('error_description', '')}")
+    else:
+        record_token_state(
+            tutor, 'active',
+            expires_at=expires_at_from_response(response_data))
+    return tutor.calendly_token_status
+
+
+def tutors_needing_revalidation():
+    """
+    Returns the tutors with a Calendly token that should be checked again.
+    """
+    now = timezone.now()
+    return Tutor.objects.exclude(
+        calendly_access_token__isnull=True
+    ).exclude(calendly_access_token='').filter(
+        Q(calendly_token_checked_at__isnull=True)
+        | Q(calendly_token_checked_at__lt=now - TOKEN_CHECK_INTERVAL)
+        | Q(calendly_token_expires_at__lt=now + TOKEN_EXPIRY_MARGIN)
+    )
+
+
+def tutors_due_for_refresh(now=None):
+    """
+    Returns the tutors whose Calendly token expires within the lead time
+    (or has no recorded expiry) and whose refresh is not backing off.
+    """
+    now = now or timezone.now()
+    return Tutor.objects.exclude(
+        calendly_refresh_token__isnull=True
+    ).exclude(calendly_refresh_token='').filter(
+        Q(calendly_token_expires_at__isnull=True)
+        | Q(calendly_token_expires_at__lt=now + REFRESH_LEAD_TIME),
+        Q(calendly_refresh_retry_at__isnull=True)
+        | Q(calendly_refresh_retry_at__lte=now),
+    )
+
+
+def backoff_delay(failures: int) -> timedelta:
+    """
+    Returns the delay before the next refresh attempt after a number of
+    consecutive failures, with jitter so failed tutors don't retry in sync.
+    """
+    delay = min(REFRESH_BACKOFF_BASE * 2 ** (failures - 1),
+                REFRESH_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1)
+
+
+def _request_refresh(tutor) -> tuple:
+    """
+    Takes the tutor's token refresh lease and requests a token refresh,
+    turning transport failures into a response without status code.
+
+    Runs in a worker thread. The lease stays held until the caller stored
+    the outcome and released it.
+
+    Returns:
+        tuple: The owner token of the lease, or None if another caller is
+        refreshing the token, and the status code and JSON data of the
+        response.
+    """
+    try:
+        owner = acquire_cache_lock(
+            token_lock_key(tutor.pk), LEASE_TIMEOUT, wait=0)
+        if owner is None:
+            return None, None, None
+        try:
+            return (owner, *request_token_refresh(
+                tutor.calendly_refresh_token))
+        except (requests.RequestException, ValueError) as error:
+            return owner, None, {'error': 'request_failed',
+                                 'error_description': str(error)}
+    finally:
+        # The cache and the rate limiter may have used the database
+        connections.close_all()
+
+
+def _persist_refresh(tutor, status_code, response_data, now) -> str:
+    """
+    Stores the outcome of a token refresh.
+
+    Network errors, rate limits, server errors and other rejected requests
+    (e.g. an invalid client secret) back off and leave the profile active.
+    Only when Calendly rejects the refresh token itself (400 invalid_grant)
+    is the token marked as broken and the tutor's profile deactivated, since
+    the tutor has to reconnect Calendly.
+
+    The tutor's refresh token may have been rotated by a web worker since
+    the request was sent (see calendly/locks.py). The outcome is then
+    discarded.
+
+    Returns:
+        str: 'refreshed', 'retrying', 'failed' or 'rotated'.
+    """
+    unchanged = Tutor.objects.filter(
+        pk=tutor.pk, calendly_refresh_token=tutor.calendly_refresh_token)
+    if status_code == 200:
+        if not unchanged.update(
+            calendly_access_token=response_data['access_token'],
+            calendly_refresh_token=response_data['refresh_token'],
+            calendly_token_expires_at=expires_at_from_response(response_data),
+            calendly_token_status='active',
+            calendly_token_checked_at=now,
+            calendly_token_error='',
+            calendly_refresh_failures=0,
+            calendly_refresh_retry_at=None,
+        ):
+            return 'rotated'
+        return 'refreshed'
+
+    error = (f"{response_data.get('error', 'unknown_error')}: "
+             f"{response_data.get('error_description', '')}")[:255]
+    failures = tutor.calendly_refresh_failures + 1
+    if status_code != 400 or response_data.get('error') != 'invalid_grant':
+        fields = {
+            'calendly_token_error': error,
+            'calendly_refresh_failures': failures,
+            'calendly_refresh_retry_at': now + backoff_delay(failures),
+        }
+        if (status_code is not None and 400 <= status_code < 500
+                and status_code != 429):
+            # Rejected for a reason the tutor can't fix, e.g. a wrong client
+            # secret
+            fields.update(calendly_token_status='error',
+                          calendly_token_checked_at=now)
+        if not unchanged.update(**fields):
+            return 'rotated'
+        return 'retrying'
+    if not unchanged.exists():
+        return 'rotated'
+
+    # Saved with signals, so the deactivated profile leaves the search
+    # index and the cached listings.
+    tutor.calendly_token_status = 'error'
+    tutor.calendly_token_checked_at = now
+    tutor.calendly_token_error = error
+    tutor.calendly_refresh_failures = failures
+    tutor.calendly_refresh_retry_at = now + REFRESH_BACKOFF_MAX
+    tutor.profile_status = False
+    tutor.save(update_fields=[
+        'calendly_token_status', 'calendly_token_checked_at',
+        'calendly_token_error', 'calendly_refresh_failures',
+        'calendly_refresh_retry_at', 'profile_status',
+    ])
+    return 'failed'
+
+
+def refresh_due_tokens(concurrency: int = 4, batch_size: int = 50,
+                       now=None) -> dict:
+    """
+    Refreshes the Calendly tokens that are about to expire.
+
+    Tutors are processed in batches. The refresh requests of a batch run in
+    at most `concurrency` threads, the results are stored in the calling
+    thread. Each refresh holds the tutor's token refresh lease, like
+    refresh_access_token, and tutors whose token another caller is
+    refreshing are skipped.
+
+    Args:
+        concurrency (int): The maximum number of concurrent requests.
+        batch_size (int): The number of tutors loaded per batch.
+        now (datetime): The current time, defaults to timezone.now().
+
+    Returns:
+        dict: The number of tutors per outcome, see _persist_refresh, or
+        'skipped'.
+    """
+    now = now or timezone.now()
+    tutor_ids = list(tutors_due_for_refresh(now).order_by(
+        'calendly_token_expires_at', 'pk').values_list('pk', flat=True))
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for start in range(0, len(tutor_ids), batch_size):
+            tutors = list(Tutor.objects.filter(
+                pk__in=tutor_ids[start:start + batch_size]))
+            responses = list(executor.map(_request_refresh, tutors))
+            try:
+                for tutor, (owner, status_code, response_data) in zip(
+                        tutors, responses):
+                    if owner is None:
+                        outcome = 'skipped'
+                    else:
+                        outcome = _persist_refresh(
+                            tutor, status_code, response_data, now)
+                    outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            finally:
+                for tutor, (owner, _, _) in zip(tutors, responses):
+                    if owner is not None:
+                        release_cache_lock(token_lock_key(tutor.pk), owner)
+    return outcomes
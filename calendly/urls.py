@@ -1,9 +1,11 @@
 from django.urls import path
 from calendly import views
+from calendly.webhooks import webhook
 
 urlpatterns = [
     path('connect/', views.connect_calendly, name='connect_calendly'),
     path('auth/', views.calendly_auth, name='calendly_auth'),
     path('disconnect/<int:pk>/', views.disconnect_calendly,
          name='disconnect_calendly'),
+    path('wh/', webhook, name='calendly_webhook'),
 ]
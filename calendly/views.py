@@ -1,12 +1,16 @@
 import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from django.contrib import messages
 import requests
 from django.contrib.auth.decorators import login_required
+from django.utils import timezone
 
-from gipfel_tutor import settings
+from django.conf import settings
+from calendly.client import calendly_client
+from calendly.locks import TOKEN_FIELDS, tutor_token_lock
 from tutor_market.models import Tutor
 
 
@@ -46,7 +50,7 @@ def calendly_auth(request: HttpRequest) -> HttpResponse:
     """
     code = request.GET.get('code')
 
-    url = "https://auth.calendly.com/oauth/token"
+    url = f"{settings.CALENDLY_AUTH_URL}/oauth/token"
 
     base64_string = get_base64_string()
     redirect_uri = settings.CALENDLY_REDIRECT_URI
@@ -62,9 +66,13 @@ def calendly_auth(request: HttpRequest) -> HttpResponse:
         "Authorization": f"Basic {base64_string}"
     }
 
-    response = requests.post(url, data=payload, headers=headers)
-
-    response_data = response.json()
+    try:
+        response = calendly_client.post(url, data=payload, headers=headers)
+        response_data = response.json()
+    except (requests.RequestException, ValueError):
+        messages.warning(request, "Calendly could not be reached, please try "
+                         "again later.")
+        return redirect(reverse('dashboard', kwargs={'pk': request.user.pk}))
 
     if response.status_code != 200:
         messages.warning(request, f"{response_data['error']}: "
@@ -76,11 +84,33 @@ def calendly_auth(request: HttpRequest) -> HttpResponse:
 
     request.user.tutor.calendly_access_token = response_data['access_token']
     request.user.tutor.calendly_refresh_token = response_data['refresh_token']
+    request.user.tutor.calendly_token_expires_at = expires_at_from_response(
+        response_data)
+    request.user.tutor.calendly_user_uri = response_data.get('owner')
+    # The next session sync backfills the tutor's bookings
+    request.user.tutor.calendly_sync_cursor = None
+    request.user.tutor.calendly_token_status = 'active'
+    request.user.tutor.calendly_token_checked_at = timezone.now()
+    request.user.tutor.calendly_token_error = ''
     request.user.tutor.save()
 
     return redirect(reverse('dashboard', kwargs={'pk': request.user.pk}))
 
 
+def expires_at_from_response(response_data: dict):
+    """
+    Returns the expiry of a token from a Calendly token response (with
+    `expires_in`) or introspection response (with `exp`), or None.
+    """
+    if response_data.get('expires_in'):
+        return timezone.now() + timedelta(
+            seconds=int(response_data['expires_in']))
+    if response_data.get('exp'):
+        return datetime.fromtimestamp(
+            int(response_data['exp']), tz=dt_timezone.utc)
+    return None
+
+
 def introspect_access_token(tutor) -> dict:
     """
     Introspects the Calendly access token to check if it is still valid.
@@ -91,7 +121,7 @@ def introspect_access_token(tutor) -> dict:
     access_token = tutor.calendly_access_token
     refresh_token = tutor.calendly_refresh_token
 
-    url = "https://auth.calendly.com/oauth/introspect"
+    url = f"{settings.CALENDLY_AUTH_URL}/oauth/introspect"
 
     payload = {
         "client_id": settings.CALENDLY_CLIENT_ID,
@@ -103,7 +133,7 @@ def introspect_access_token(tutor) -> dict:
         "Accept": "application/json",
     }
 
-    response = requests.post(url, data=payload, headers=headers)
+    response = calendly_client.post(url, data=payload, headers=headers)
 
     response_data = response.json()
 
@@ -116,13 +146,21 @@ def introspect_access_token(tutor) -> dict:
     return response_data
 
 
-def refresh_access_token(tutor) -> dict:
-    """
-    Refreshes the Calendly access token using the refresh token.
+def request_token_refresh(refresh_token: str) -> tuple:
     """
-    refresh_token = tutor.calendly_refresh_token
+    Requests new Calendly tokens for a refresh token.
+
+    Args:
+        refresh_token (str): The refresh token.
 
-    url = "https://auth.calendly.com/oauth/token"
+    Returns:
+        tuple: The status code and the JSON data of the response.
+
+    Raises:
+        requests.RequestException: If Calendly can't be reached.
+        ValueError: If the response is not JSON.
+    """
+    url = f"{settings.CALENDLY_AUTH_URL}/oauth/token"
 
     base64_string = get_base64_string()
 
@@ -136,17 +174,60 @@ def refresh_access_token(tutor) -> dict:
         "Authorization": f"Basic {base64_string}"
     }
 
-    response = requests.post(url, data=payload, headers=headers)
+    response = calendly_client.post(url, data=payload, headers=headers)
 
-    response_data = response.json()
+    return response.status_code, response.json()
 
-    if response.status_code != 200:
-        return response_data
 
-    tutor.calendly_access_token = response_data['access_token']
-    tutor.calendly_refresh_token = response_data['refresh_token']
-    tutor.save()
+def refresh_access_token(tutor) -> dict:
+    """
+    Refreshes the Calendly access token using the refresh token.
 
+    Only one caller refreshes a tutor's token at a time, see
+    calendly/locks.py. Callers that waited for the lease while another
+    caller rotated the token get the rotated token without a request.
+
+    Args:
+        tutor (Tutor): The tutor, updated with the new tokens.
+
+    Returns:
+        dict: The token response, or the error response of Calendly.
+    """
+    stale_refresh_token = tutor.calendly_refresh_token
+    with tutor_token_lock(tutor.pk) as (current, held):
+        if current.calendly_refresh_token != stale_refresh_token:
+            response_data = {
+                'access_token': current.calendly_access_token,
+                'refresh_token': current.calendly_refresh_token,
+            }
+            if current.calendly_token_expires_at:
+                response_data['exp'] = int(
+                    current.calendly_token_expires_at.timestamp())
+        elif not held:
+            return {
+                'error': 'refresh_in_progress',
+                'error_description': 'The token is being refreshed by '
+                                     'another request.',
+            }
+        else:
+            status_code, response_data = request_token_refresh(
+                stale_refresh_token)
+            if status_code != 200:
+                return response_data
+            current.calendly_access_token = response_data['access_token']
+            current.calendly_refresh_token = response_data['refresh_token']
+            current.calendly_token_expires_at = expires_at_from_response(
+                response_data)
+            # Written with an UPDATE, token changes don't affect the search
+            # document or the cached card.
+            Tutor.objects.filter(pk=tutor.pk).update(
+                calendly_access_token=current.calendly_access_token,
+                calendly_refresh_token=current.calendly_refresh_token,
+                calendly_token_expires_at=current.calendly_token_expires_at,
+            )
+
+    for field in TOKEN_FIELDS:
+        setattr(tutor, field, getattr(current, field))
     return response_data
 
 
@@ -161,6 +242,10 @@ def disconnect_calendly(request: HttpRequest, pk: int) -> HttpResponse:
     tutor.calendly_access_token = None
     tutor.calendly_refresh_token = None
     tutor.calendly_token_expires_at = None
+    tutor.calendly_user_uri = None
+    tutor.calendly_token_status = 'unknown'
+    tutor.calendly_token_checked_at = None
+    tutor.calendly_token_error = ''
     tutor.save()
 
     messages.info(
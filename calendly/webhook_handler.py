@@ -0,0 +1,148 @@
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+
+from booking.models import TutoringSession
+from calendly.resources import store_resources
+from tutor_market.models import Tutor
+
+
+def find_student(invitee):
+    """
+    Returns the student who booked as a Calendly invitee, or None.
+
+    The booking widget passes the student's id as utm_content (see
+    tutor_detail.js); it is only trusted for users with the invitee's email
+    address.
+    """
+    students = User.objects.filter(email__iexact=invitee['email'])
+    student_id = (invitee.get('tracking') or {}).get('utm_content') or ''
+    if student_id.isdigit():
+        return (students.filter(pk=student_id).first()
+                or students.order_by('pk').first())
+    return students.order_by('pk').first()
+
+
+class CalendlyWH_Handler:
+    """
+    Handle Calendly webhooks.
+
+    Bookings, cancellations and reschedules made on Calendly are written to
+    the tutoring sessions straight from the webhook payload, which contains
+    the invitee and its scheduled event, without fetching them again.
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+
+    def _find_tutor(self, event):
+        """
+        Returns the tutor hosting the scheduled event of a webhook, or None.
+        """
+        scheduled_event = event['payload']['scheduled_event']
+        user_uris = [membership['user'] for membership in
+                     scheduled_event.get('event_memberships', [])]
+        if event.get('created_by'):
+            user_uris.append(event['created_by'])
+        return Tutor.objects.filter(calendly_user_uri__in=user_uris).first()
+
+    def _upsert_session(self, event, status=None):
+        """
+        Creates or updates the session of the webhook's invitee. The
+        invitee and its scheduled event are stored as Calendly resources.
+
+        Returns:
+            HttpResponse: The response indicating the handling of the webhook
+            event.
+        """
+        invitee = event['payload']
+        scheduled_event = invitee['scheduled_event']
+        tutor = self._find_tutor(event)
+        store_resources([
+            scheduled_event,
+            {key: value for key, value in invitee.items()
+             if key != 'scheduled_event'},
+        ], tutor=tutor)
+        exists = TutoringSession.objects.filter(
+            invitee_uri=invitee['uri']).exists()
+        student = None
+        if not exists:
+            student = find_student(invitee)
+            if tutor is None or student is None:
+                return HttpResponse(
+                    content=f'Webhook received: {event["event"]} | SKIPPED: '
+                            f'Unknown tutor or student', status=200)
+
+        session, created = TutoringSession.objects.upsert_from_calendly(
+            scheduled_event, invitee, tutor, student, status)
+        return HttpResponse(
+            content=f'Webhook received: {event["event"]} | SUCCESS: '
+                    f'{"Created" if created else "Updated"} session '
+                    f'{session.pk}', status=200)
+
+    def handle_event(self, event):
+        """
+        Handle a generic/unknown/unexpected webhook event.
+
+        Args:
+            event (dict): The webhook event received from Calendly.
+
+        Returns:
+            HttpResponse: The response indicating the handling of the webhook
+            event.
+        """
+        return HttpResponse(
+            content=f'Unhandled webhook received: {event["event"]}',
+            status=200)
+
+    def handle_invitee_created(self, event):
+        """
+        Handle the invitee.created webhook from Calendly.
+
+        Creates the session, or refreshes its Calendly data if it exists.
+        The status of an existing session is kept.
+
+        Args:
+            event (dict): The invitee.created webhook event received from
+                Calendly.
+
+        Returns:
+            HttpResponse: The response indicating the handling of the webhook
+            event.
+        """
+        return self._upsert_session(event)
+
+    def handle_invitee_canceled(self, event):
+        """
+        Handle the invitee.canceled webhook from Calendly.
+
+        Marks the session as cancelled, or as rescheduled if the invitee
+        picked a new time (which arrives as a separate invitee.created).
+
+        Args:
+            event (dict): The invitee.canceled webhook event received from
+                Calendly.
+
+        Returns:
+            HttpResponse: The response indicating the handling of the webhook
+            event.
+        """
+        status = ('rescheduled' if event['payload'].get('rescheduled')
+                  else 'cancelled')
+        return self._upsert_session(event, status)
+
+    def dispatch(self, event):
+        """
+        Hands a webhook event to its handler.
+
+        Args:
+            event (dict): The webhook event received from Calendly.
+
+        Returns:
+            HttpResponse: The response of the handler.
+        """
+        event_map = {
+            'invitee.created': self.handle_invitee_created,
+            'invitee.canceled': self.handle_invitee_canceled,
+        }
+        event_handler = event_map.get(event.get('event'), self.handle_event)
+        return event_handler(event)
@@ -0,0 +1,78 @@
+import hashlib
+import hmac
+import json
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from calendly.webhook_handler import CalendlyWH_Handler
+
+# -> Credit for the signature scheme: https://developer.calendly.com/api-docs/4c305798a61d3-webhook-signatures  # noqa
+
+# Seconds a signed webhook stays valid, against replayed requests.
+SIGNATURE_TOLERANCE = 3 * 60
+
+
+def verify_signature(body: bytes, header: str, signing_key: str,
+                     now: float = None) -> bool:
+    """
+    Verifies the Calendly-Webhook-Signature header of a webhook.
+
+    The header has the form `t=<timestamp>,v1=<signature>`, where the
+    signature is the hex HMAC-SHA256 of `<timestamp>.<body>` keyed with the
+    webhook subscription's signing key.
+
+    Args:
+        body (bytes): The raw request body.
+        header (str): The signature header.
+        signing_key (str): The signing key of the webhook subscription.
+        now (float): The current UNIX time, defaults to time.time().
+
+    Returns:
+        bool: Whether the signature is valid and recent.
+    """
+    parts = dict(
+        part.strip().split('=', 1) for part in (header or '').split(',')
+        if '=' in part)
+    timestamp = parts.get('t', '')
+    if not timestamp.isdigit() or 'v1' not in parts:
+        return False
+    now = time.time() if now is None else now
+    if abs(now - int(timestamp)) > SIGNATURE_TOLERANCE:
+        return False
+    expected = hmac.new(signing_key.encode(), f'{timestamp}.'.encode() + body,
+                        hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, parts['v1'])
+
+
+@csrf_exempt
+@require_POST
+def webhook(request):
+    """
+    Handle incoming webhook events from Calendly.
+
+    Only signed webhooks are accepted, so the CALENDLY_WEBHOOK_SIGNING_KEY
+    setting has to be configured.
+
+    Args:
+        request (HttpRequest): The incoming HTTP request object.
+
+    Returns:
+        HttpResponse: The response indicating the success or failure of the
+            webhook event handling.
+    """
+    signing_key = settings.CALENDLY_WEBHOOK_SIGNING_KEY
+    if not signing_key or not verify_signature(
+            request.body, request.headers.get('Calendly-Webhook-Signature'),
+            signing_key):
+        return JsonResponse({'success': False}, status=400)
+
+    try:
+        event = json.loads(request.body)
+    except json.decoder.JSONDecodeError:
+        return JsonResponse({'success': False}, status=400)
+
+    return CalendlyWH_Handler(request).dispatch(event)
@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # "django.contrib.sites",
     "allauth",
     "allauth.account",
@@ -112,6 +113,12 @@ ACCOUNT_SESSION_REMEMBER = True
 CALENDLY_CLIENT_ID = os.environ.get("CALENDLY_DEV_CLIENT_ID", "s3Inn4DKEVBbosK79rZCBZ6XrWGd8adljopDQNpw5PA")
 CALENDLY_CLIENT_SECRET = os.environ.get("CALENDLY_DEV_CLIENT_SECRET", "nZP6IerDsSbP_o2AQYKIn391D38ampzrZdYGS7Allkk")
 CALENDLY_REDIRECT_URI = os.environ.get("CALENDLY_DEV_REDIRECT_URI", "http://localhost:8000/calendly/auth")
+# Base URL of Calendly's OAuth server, overridable for local fakes
+CALENDLY_AUTH_URL = os.environ.get("CALENDLY_AUTH_URL", "https://auth.calendly.com")
+# Base URL of Calendly's API, overridable for local fakes
+CALENDLY_API_URL = os.environ.get("CALENDLY_API_URL", "https://api.calendly.com")
+# Signing key of the Calendly webhook subscription, see calendly/webhooks.py
+CALENDLY_WEBHOOK_SIGNING_KEY = os.environ.get("CALENDLY_WEBHOOK_SIGNING_KEY", "")
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "gipfeltutor@example.com"
@@ -189,6 +196,35 @@ else:
     }
     }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/ref/settings/#caches
+# The tutor list and profile caches, the in-process tutor index and the
+# Calendly response cache and rate limiter coordinate all workers through the
+# default cache, so it has to be shared between processes: Redis if REDIS_URL
+# is set, else a database table created by `python manage.py
+# createcachetable`. Tests use a local memory cache.
+
+if 'test' in sys.argv:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+elif "REDIS_URL" in os.environ:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "gipfel_tutor_cache",
+        }
+    }
+
 
 
 # Password validation
@@ -267,6 +303,20 @@ else:  # Production with AWS S3
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Lifetime of the tutor list pages cached for anonymous users in seconds.
+# Pages go stale earlier when tutors, ratings, subjects or values change,
+# see tutor_market/caching.py. Disabled in tests.
+TUTOR_LIST_CACHE_TIMEOUT = 0 if 'test' in sys.argv else 60 * 60
+
+# Lifetime of the tutor detail pages cached for anonymous users in seconds.
+# Pages go stale earlier when the tutor, their ratings, subjects or values
+# change, see tutor_market/caching.py. Disabled in tests.
+TUTOR_PROFILE_CACHE_TIMEOUT = 0 if 'test' in sys.argv else 60 * 60
+
+# Answer subject/value filters and sortings of the tutor list from an
+# in-process bitset index, see tutor_market/memory_index.py
+TUTOR_MEMORY_INDEX = os.environ.get("TUTOR_MEMORY_INDEX", "") == "True"
+
 STRIPE_CURRENCY = "eur"
 STRIPE_PUBLIC_KEY = os.environ.get("STRIPE_PUBLIC_KEY", "pk_test_51QZQgKP0fgoIcLs3916GnUdTKYzrvqSgH4L8yPGmIEmN8XYikzhjxPI5zcbggwhwQYBmf0IMpj8ZaojbkegoKwHe00CuEBqIe7")
 STRIPE_SECRET_KEY = os.environ.get("STRIPE_SECRET_KEY", "sk_test_51QZQgKP0fgoIcLs3LUXel20tDn1dj5WBD156ucaykZGpecUjCO477wIkoMjnlIJpRJ3dNApAGhQPr9xnUjWxVA7e00UgLTIi1z")
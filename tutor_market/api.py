@@ -0,0 +1,216 @@
+"""
+JSON API of the tutor marketplace.
+
+`/tutor-market/api/tutors/` answers the same filters and sort modes as the
+tutor list page (see tutor_market/listing.py) with keyset paginated JSON, or
+with `format=ndjson` streams every matching tutor as one JSON object per line.
+`/tutor-market/api/tutors/<pk>/reviews/` pages through a tutor's reviews.
+"""
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import prefetch_related_objects
+from django.http import (
+    HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+)
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import parse_etags, quote_etag
+from django.views.decorators.http import require_GET
+
+from tutor_market.caching import (
+    LIST_PAGE_TAGS, canonical_list_params, get_versions
+)
+from tutor_market.listing import TutorListing
+from tutor_market.models import Tutor
+from tutor_market.pagination import InvalidCursor
+from tutor_market.reviews import (
+    get_review_page, next_page_url, serialize_review
+)
+
+# Fields of a tutor in the API mapped to the model columns they need.
+API_FIELDS = {
+    'id': ('pk',),
+    'display_name': ('display_name',),
+    'url': ('pk',),
+    'hourly_rate': ('hourly_rate',),
+    'catch_phrase': ('catch_phrase',),
+    'description': ('description',),
+    'profile_image': ('profile_image',),
+    'rating_average': ('rating_average',),
+    'rating_count': ('rating_count',),
+    'subjects': (),
+    'values': (),
+}
+DEFAULT_FIELDS = ('id', 'display_name', 'url', 'hourly_rate', 'catch_phrase',
+                  'rating_average', 'rating_count', 'subjects', 'values')
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+EXPORT_CHUNK_SIZE = 500
+
+
+def _parse_fields(value):
+    """
+    Parses the comma separated `fields` parameter.
+
+    Returns:
+        tuple: The requested fields in the order of API_FIELDS, or None if
+        an unknown field was requested.
+    """
+    if not value:
+        return DEFAULT_FIELDS
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    if not requested or requested - API_FIELDS.keys():
+        return None
+    return tuple(field for field in API_FIELDS if field in requested)
+
+
+def serialize_tutor(tutor, fields) -> dict:
+    """
+    Serializes the requested fields of a tutor.
+
+    Args:
+        tutor (Tutor): The tutor, with subjects and values prefetched if
+            requested.
+        fields (tuple): The fields to include.
+
+    Returns:
+        dict: The JSON serializable tutor.
+    """
+    getters = {
+        'id': lambda: tutor.pk,
+        'display_name': lambda: tutor.display_name,
+        'url': lambda: reverse('tutor_detail', args=[tutor.pk]),
+        'hourly_rate': lambda: tutor.hourly_rate,
+        'catch_phrase': lambda: tutor.catch_phrase,
+        'description': lambda: tutor.description,
+        'profile_image': lambda: (
+            tutor.profile_image.url if tutor.profile_image else None),
+        'rating_average': lambda: (
+            round(tutor.rating_average, 2) if tutor.rating_count else None),
+        'rating_count': lambda: tutor.rating_count,
+        'subjects': lambda: [
+            subject.name for subject in tutor.subjects.all()],
+        'values': lambda: [value.name for value in tutor.values.all()],
+    }
+    return {field: getters[field]() for field in fields}
+
+
+def _etag(params, fields, limit, export) -> str:
+    """
+    Returns the strong ETag of a response. The response only changes when a
+    tutor, rating, subject or value changes, which bumps the versions of
+    their cache tags.
+    """
+    state = (canonical_list_params(params), fields, limit, export,
+             get_versions(*LIST_PAGE_TAGS))
+    return quote_etag(hashlib.sha1(repr(state).encode('utf-8')).hexdigest())
+
+
+def _export_lines(listing, fields):
+    """
+    Yields the matching tutors as NDJSON lines, loading them in chunks.
+    """
+    columns = {'pk'} | {
+        field.lstrip('-') for field in listing.ordering
+        if field.lstrip('-') != 'search_rank'}
+    for field in fields:
+        columns.update(API_FIELDS[field])
+    tutors = listing.tutors.only(*columns)
+    relations = [field for field in ('subjects', 'values') if field in fields]
+    if relations:
+        tutors = tutors.prefetch_related(*relations)
+
+    for tutor in tutors.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield json.dumps(
+            serialize_tutor(tutor, fields), cls=DjangoJSONEncoder) + '\n'
+
+
+@require_GET
+def tutor_api_view(request):
+    """
+    Lists the active tutors as JSON.
+
+    Besides the filters and sort modes of the tutor list it understands
+    `fields` (comma separated, see API_FIELDS), `limit` (tutors per page, at
+    most MAX_LIMIT), `cursor` and `format=ndjson` for a streamed export of
+    all matching tutors. Responses carry a strong ETag; requests with a
+    matching If-None-Match get a 304 without running any tutor query.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        HttpResponse: The JSON, NDJSON or 304 response.
+    """
+    fields = _parse_fields(request.GET.get('fields'))
+    if fields is None:
+        return JsonResponse({
+            'error': 'Unknown field.',
+            'fields': list(API_FIELDS),
+        }, status=400)
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit.'}, status=400)
+    limit = min(max(limit, 1), MAX_LIMIT)
+    export = request.GET.get('format') == 'ndjson'
+
+    etag = _etag(request.GET, fields, limit, export)
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    listing = TutorListing(request.GET)
+    if export:
+        response = StreamingHttpResponse(
+            _export_lines(listing, fields),
+            content_type='application/x-ndjson')
+    else:
+        try:
+            page = listing.get_page(
+                request.GET.get('cursor'), limit, strict=True)
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+        tutors = list(page)
+        relations = [
+            field for field in ('subjects', 'values') if field in fields]
+        if relations:
+            prefetch_related_objects(tutors, *relations)
+        response = JsonResponse({
+            'results': [serialize_tutor(tutor, fields) for tutor in tutors],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+    response['ETag'] = etag
+    return response
+
+
+@require_GET
+def tutor_reviews_api_view(request, pk):
+    """
+    Lists the reviews of an active tutor as JSON.
+
+    Understands `sorting` (see REVIEW_SORTINGS) and `cursor`. The tutor
+    detail page renders the first page and fetches the following ones from
+    the `next` URL.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        pk (int): The primary key of the tutor.
+
+    Returns:
+        JsonResponse: The reviews and the URL of the next page or None.
+    """
+    tutor = get_object_or_404(
+        Tutor.objects.only('pk'), pk=pk, profile_status=True)
+    sorting = request.GET.get('sorting', 'newest')
+    page = get_review_page(tutor.pk, sorting, request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [serialize_review(review, request.user)
+                    for review in page],
+        'next': next_page_url(tutor.pk, page, sorting),
+    })
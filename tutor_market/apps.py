@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class TutorMarketConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tutor_market'
+
+    def ready(self):
+        """Connects the signal handlers and registers the checks of the
+        app."""
+        from tutor_market import checks, signals  # noqa: F401
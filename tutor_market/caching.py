@@ -0,0 +1,280 @@
+"""
+Versioned caching helpers for the tutor marketplace.
+
+Cached data is keyed on the versions of the tags it depends on ('tutor',
+'rating', 'subject', 'value'). The signal handlers in tutor_market/signals.py
+bump a tag's version whenever a row of that kind changes, which makes every
+entry depending on it unreachable instead of waiting for a TTL to expire.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date, quote_etag
+
+from tutor_market.listing import requested_sorting
+from tutor_market.search import normalize_query
+
+VERSION_KEY_PREFIX = 'tutor_market:version:'
+# Backends that keep their entries in the memory of each process.
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared_cache(alias: str = 'default') -> bool:
+    """
+    Returns whether a cache is shared between processes. Versions bumped
+    in one worker or management command only reach the others through a
+    shared cache, see the CACHES setting.
+    """
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
+
+
+def _version_key(tag: str) -> str:
+    return f'{VERSION_KEY_PREFIX}{tag}'
+
+
+def _initial_version() -> int:
+    """
+    Returns the version a tag starts with. Starting from the current time
+    keeps versions from repeating when a version key was evicted.
+    """
+    return time.time_ns()
+
+
+def get_versions(*tags) -> tuple:
+    """
+    Returns the current versions of tags, initializing missing ones.
+
+    Args:
+        *tags (str): The tags to look up.
+
+    Returns:
+        tuple: The versions in the order of the tags.
+    """
+    keys = [_version_key(tag) for tag in tags]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_version(), timeout=None)
+            found[key] = cache.get(key)
+        versions.append(found[key])
+    return tuple(versions)
+
+
+def bump_versions(*tags):
+    """
+    Advances the versions of tags.
+
+    Args:
+        *tags (str): The tags to bump.
+    """
+    for tag in tags:
+        try:
+            cache.incr(_version_key(tag))
+        except ValueError:
+            cache.set(_version_key(tag), _initial_version(), timeout=None)
+
+
+def invalidate(*tags):
+    """
+    Bumps the versions of tags now and again after the current transaction
+    commits, so no other request can cache data read before the commit
+    under the new versions.
+
+    Args:
+        *tags (str): The tags whose cached data is stale.
+    """
+    bump_versions(*tags)
+    transaction.on_commit(lambda: bump_versions(*tags))
+
+
+def card_tag(tutor_id) -> str:
+    """
+    Returns the cache tag of a tutor's card. It changes whenever anything
+    shown about the tutor changes, so it also versions the tutor's page.
+    """
+    return f'card:{tutor_id}'
+
+
+def make_key(namespace: str, *parts) -> str:
+    """
+    Builds a cache key from a namespace and hashable parts.
+
+    Args:
+        namespace (str): The kind of cached data.
+        *parts: Values identifying the entry, e.g. normalized filters and tag
+            versions.
+
+    Returns:
+        str: The cache key.
+    """
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return f'tutor_market:{namespace}:{digest}'
+
+
+# Query parameters the tutor list understands. Requests with other
+# parameters are not cached, their pagination links would leak into the
+# cached page.
+LIST_PAGE_PARAMS = (
+    'q', 'subject', 'teachingvalue', 'match', 'sorting', 'cursor', 'page')
+LIST_PAGE_TAGS = ('tutor', 'rating', 'subject', 'value')
+
+
+def canonical_list_params(params) -> tuple:
+    """
+    Returns a canonical form of the tutor listing query parameters.
+    Parameters selecting the same tutors are equal: the search query is
+    stripped, the subject and value selections are sorted and deduplicated
+    and a missing sorting is the listing's default.
+
+    Args:
+        params (QueryDict): The query parameters of the request.
+
+    Returns:
+        tuple: The canonical parameters.
+    """
+    def selection(name):
+        return tuple(sorted({
+            token.strip().lower() for token in params.getlist(name)
+            if token.strip()
+        }))
+
+    return (
+        normalize_query(params.get('q')),
+        selection('subject'),
+        selection('teachingvalue'),
+        params.get('match', ''),
+        requested_sorting(params),
+        params.get('cursor', ''),
+    )
+
+
+def list_page_key(params):
+    """
+    Builds the cache key of a tutor list page from its query parameters.
+
+    Args:
+        params (QueryDict): The query parameters of the request.
+
+    Returns:
+        str: The cache key or None if the page should not be cached.
+    """
+    if any(param not in LIST_PAGE_PARAMS for param in params):
+        return None
+    return make_key('tutor_list', canonical_list_params(params),
+                    get_versions(*LIST_PAGE_TAGS))
+
+
+def cache_list_page(view_func):
+    """
+    Caches the tutor list pages rendered for anonymous users.
+
+    Entries live for `settings.TUTOR_LIST_CACHE_TIMEOUT` seconds at most and
+    go stale as soon as a tutor, rating, subject or value changes. Requests
+    of logged in users and requests with pending messages always render the
+    page.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        timeout = getattr(settings, 'TUTOR_LIST_CACHE_TIMEOUT', 0)
+        if (not timeout or request.method != 'GET'
+                or request.user.is_authenticated
+                or len(get_messages(request))):
+            return view_func(request, *args, **kwargs)
+
+        key = list_page_key(request.GET)
+        if key is None:
+            return view_func(request, *args, **kwargs)
+
+        content = cache.get(key)
+        if content is not None:
+            return HttpResponse(content)
+
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.content, timeout)
+        return response
+
+    return wrapper
+
+
+# Query parameters of the tutor detail page that are cached, see
+# tutor_market/reviews.py
+PROFILE_PAGE_PARAMS = ('reviews',)
+
+
+def _vary_on_cookie(response):
+    """
+    Marks a response as depending on the cookies, which carry the session
+    with the user and the pending messages.
+    """
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def cache_profile_page(view_func):
+    """
+    Caches the tutor detail pages rendered for anonymous users and answers
+    their conditional requests.
+
+    The page of a tutor depends on the tutor, their ratings, subjects and
+    values, which all bump the tutor's card tag (see tutor_market/signals.py).
+    Its version is the page's ETag, so a request with a matching
+    If-None-Match gets a 304 before any query runs. Last-Modified is when
+    the cached page was rendered. Entries live for
+    `settings.TUTOR_PROFILE_CACHE_TIMEOUT` seconds at most. Requests of
+    logged in users and requests with pending messages always render the
+    page.
+    """
+    @wraps(view_func)
+    def wrapper(request, pk, *args, **kwargs):
+        timeout = getattr(settings, 'TUTOR_PROFILE_CACHE_TIMEOUT', 0)
+        if (not timeout or request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+                or len(get_messages(request))
+                or any(param not in PROFILE_PAGE_PARAMS
+                       for param in request.GET)):
+            return _vary_on_cookie(view_func(request, pk, *args, **kwargs))
+
+        key = make_key('tutor_profile', pk, sorted(request.GET.items()),
+                       get_versions(card_tag(pk)))
+        etag = quote_etag(key.rsplit(':', 1)[1])
+        not_modified = get_conditional_response(request, etag=etag)
+        entry = None
+        if not_modified is None:
+            entry = cache.get(key)
+            if entry is None:
+                response = view_func(request, pk, *args, **kwargs)
+                if response.status_code != 200:
+                    return _vary_on_cookie(response)
+                entry = {'content': response.content,
+                         'last_modified': int(time.time())}
+                cache.set(key, entry, timeout)
+            else:
+                response = HttpResponse(entry['content'])
+            response = get_conditional_response(
+                request, etag=etag, last_modified=entry['last_modified'],
+                response=response)
+        else:
+            response = not_modified
+
+        response['ETag'] = etag
+        if entry is not None:
+            response['Last-Modified'] = http_date(entry['last_modified'])
+        # Shared caches may keep the page, but have to revalidate it
+        patch_cache_control(response, public=True, max_age=0,
+                            must_revalidate=True)
+        return _vary_on_cookie(response)
+
+    return wrapper
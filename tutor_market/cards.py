@@ -0,0 +1,57 @@
+"""
+Cached rendering of tutor cards.
+
+The HTML of every card is cached under the version of the tutor's card tag
+(see tutor_market/caching.py). The signal handlers in tutor_market/signals.py
+bump it when the tutor, its subjects or values or its ratings change, so
+unchanged cards are never rendered twice.
+"""
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from tutor_market.caching import card_tag, get_versions, make_key
+
+CARD_TEMPLATE = 'tutor_market/includes/tutor_card.html'
+CARD_TIMEOUT = 60 * 60 * 24
+
+
+def render_tutor_cards(tutors, page=None) -> list:
+    """
+    Renders tutor cards, reusing the cached HTML of unchanged cards.
+
+    The card versions and the cached cards are each fetched with one
+    multi-get. Only the cards missing from the cache load their subjects and
+    values and are rendered.
+
+    Args:
+        tutors (list): The tutors to render.
+        page (str): The page the cards are shown on, e.g. 'tutor_detail'.
+
+    Returns:
+        list: The rendered cards in the order of the tutors.
+    """
+    tutors = list(tutors)
+    if not tutors:
+        return []
+
+    versions = get_versions(*[card_tag(tutor.pk) for tutor in tutors])
+    keys = [make_key('tutor_card', tutor.pk, version, page)
+            for tutor, version in zip(tutors, versions)]
+    cards = cache.get_many(keys)
+
+    missing = [(tutor, key) for tutor, key in zip(tutors, keys)
+               if key not in cards]
+    if missing:
+        prefetch_related_objects(
+            [tutor for tutor, _ in missing], 'subjects', 'values')
+        rendered = {
+            key: render_to_string(CARD_TEMPLATE,
+                                  {'tutor': tutor, 'page': page})
+            for tutor, key in missing
+        }
+        cache.set_many(rendered, CARD_TIMEOUT)
+        cards.update(rendered)
+
+    return [mark_safe(cards[key]) for key in keys]
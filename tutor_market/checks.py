@@ -0,0 +1,29 @@
+"""
+System checks of the tutor marketplace.
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from tutor_market.caching import is_shared_cache
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Warns when the tutor caches or the in-process tutor index are enabled
+    with a cache that is not shared between processes.
+    """
+    enabled = (getattr(settings, 'TUTOR_LIST_CACHE_TIMEOUT', 0)
+               or getattr(settings, 'TUTOR_PROFILE_CACHE_TIMEOUT', 0)
+               or getattr(settings, 'TUTOR_MEMORY_INDEX', False))
+    if not enabled or is_shared_cache():
+        return []
+    return [Warning(
+        'The default cache is local to each process.',
+        hint='Every worker keeps its own cache versions, tutor index change '
+             'log and Calendly rate limits, so changes made by one worker '
+             'or a management command do not reach the others. Configure a '
+             'shared backend such as Redis or the database cache in '
+             'CACHES.',
+        id='tutor_market.W001',
+    )]
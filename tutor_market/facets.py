@@ -0,0 +1,94 @@
+"""
+Subject and teaching value facet counts for the tutor list.
+
+The counts of all subjects and values are computed in one grouped UNION
+query over the M2M through tables and cached per normalized filter set.
+"""
+from django.core.cache import cache
+from django.db.models import CharField, Count, Q, Value as V
+
+from tutor_market.caching import get_versions, make_key
+from tutor_market.filters import MATCH_ANY, TutorFilter
+from tutor_market.models import Subject, Value
+
+FACETS_TIMEOUT = 60 * 60
+
+
+def _count_facets(base_queryset, tutor_filter) -> list:
+    """
+    Counts the matching tutors per subject and value in one query.
+
+    With the default 'any' matching a selection widens the results of its
+    own filter, so subject counts ignore the selected subjects and value
+    counts ignore the selected values. With 'all' matching every selection
+    narrows the results and the counts are taken from the current results.
+
+    Returns:
+        list: (kind, id, name, count) rows.
+    """
+    if tutor_filter.match == MATCH_ANY:
+        subject_filter = TutorFilter(
+            value_groups=tutor_filter.value_groups, match=tutor_filter.match)
+        value_filter = TutorFilter(
+            subject_groups=tutor_filter.subject_groups,
+            match=tutor_filter.match)
+    else:
+        subject_filter = value_filter = tutor_filter
+
+    def tutor_ids(facet_filter):
+        return facet_filter.apply(base_queryset).order_by().values('pk')
+
+    subjects = Subject.objects.order_by().annotate(
+        kind=V('subject', output_field=CharField()),
+        tutor_count=Count(
+            'tutors', filter=Q(tutors__in=tutor_ids(subject_filter))),
+    ).values_list('pk', 'name', 'kind', 'tutor_count')
+    values = Value.objects.order_by().annotate(
+        kind=V('value', output_field=CharField()),
+        tutor_count=Count(
+            'tutors', filter=Q(tutors__in=tutor_ids(value_filter))),
+    ).values_list('pk', 'name', 'kind', 'tutor_count')
+
+    return [(kind, pk, name, count)
+            for pk, name, kind, count in subjects.union(values, all=True)]
+
+
+def get_facets(base_queryset, tutor_filter, query_key='') -> dict:
+    """
+    Returns the subject and value facets of a tutor listing.
+
+    Args:
+        base_queryset (QuerySet): The active tutors, with any search applied
+            but without the subject and value filters.
+        tutor_filter (TutorFilter): The current subject and value filters.
+        query_key (str): The search query the base queryset was built
+            from, see search.normalize_query; part of the cache key.
+
+    Returns:
+        dict: 'subjects' and 'values', each a list of dicts with `id`,
+        `name`, `count` and `selected`, sorted by name.
+    """
+    key = make_key(
+        'facets', tutor_filter.normalized(), query_key,
+        get_versions('tutor', 'subject', 'value'))
+    rows = cache.get(key)
+    if rows is None:
+        rows = _count_facets(base_queryset, tutor_filter)
+        cache.set(key, rows, FACETS_TIMEOUT)
+
+    selected = {
+        'subject': tutor_filter.subject_ids,
+        'value': tutor_filter.value_ids,
+    }
+    facets = {'subject': [], 'value': []}
+    for kind, pk, name, count in rows:
+        facets[kind].append({
+            'id': pk,
+            'name': name,
+            'count': count,
+            'selected': pk in selected[kind],
+        })
+    return {
+        'subjects': sorted(facets['subject'], key=lambda f: f['name']),
+        'values': sorted(facets['value'], key=lambda f: f['name']),
+    }
@@ -0,0 +1,144 @@
+"""
+Subject and teaching value filters for tutor listings.
+
+Filter parameters are resolved to primary keys once and applied as EXISTS
+subqueries on the M2M through tables. The through tables carry a unique
+(tutor_id, subject_id) / (tutor_id, value_id) index, so every subquery is an
+index lookup and the result never needs a DISTINCT.
+"""
+from django.db.models import Exists, OuterRef
+from django.utils.text import slugify
+
+from tutor_market.models import Subject, Tutor, Value
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+
+
+def _resolve(model, tokens) -> list:
+    """
+    Resolves filter tokens to groups of primary keys.
+
+    A token is either a primary key, a slug of the name ('self-learning') or,
+    for backwards compatibility, part of the name ('learn'). The name based
+    tokens are resolved with a single query.
+
+    Args:
+        model (Model): Subject or Value.
+        tokens (list): The raw query parameter values.
+
+    Returns:
+        list: One frozenset of primary keys per token. Unknown tokens resolve
+        to an empty set.
+    """
+    tokens = [token.strip() for token in tokens if token.strip()]
+    names = None
+    groups = []
+    for token in tokens:
+        if token.isdigit():
+            groups.append(frozenset([int(token)]))
+            continue
+
+        if names is None:
+            names = list(model.objects.values_list('pk', 'name'))
+        slug = slugify(token)
+        lowered = token.lower()
+        groups.append(frozenset(
+            pk for pk, name in names
+            if slugify(name) == slug or lowered in name.lower()
+        ))
+    return groups
+
+
+class TutorFilter:
+    """
+    The subject and teaching value filters of a tutor listing.
+
+    Tutors have to match the subject filter and the value filter. Within one
+    filter any of the selected subjects (values) is enough by default, with
+    `match=all` every one of them is required.
+
+    Attributes:
+        subject_groups (list): Frozensets of subject ids, one per selection.
+        value_groups (list): Frozensets of value ids, one per selection.
+        match (str): 'any' or 'all'.
+    """
+
+    def __init__(self, subject_groups=(), value_groups=(), match=MATCH_ANY):
+        self.subject_groups = list(subject_groups)
+        self.value_groups = list(value_groups)
+        self.match = match if match in (MATCH_ANY, MATCH_ALL) else MATCH_ANY
+
+    @classmethod
+    def from_query_params(cls, params) -> 'TutorFilter':
+        """
+        Builds the filter from the `subject`, `teachingvalue` and `match`
+        query parameters.
+
+        Args:
+            params (QueryDict): The query parameters of the request.
+
+        Returns:
+            TutorFilter: The resolved filter.
+        """
+        return cls(
+            subject_groups=_resolve(Subject, params.getlist('subject')),
+            value_groups=_resolve(Value, params.getlist('teachingvalue')),
+            match=params.get('match', MATCH_ANY),
+        )
+
+    @property
+    def subject_ids(self) -> set:
+        """All selected subject ids."""
+        return set().union(*self.subject_groups)
+
+    @property
+    def value_ids(self) -> set:
+        """All selected value ids."""
+        return set().union(*self.value_groups)
+
+    def is_empty(self) -> bool:
+        """Returns whether no subject or value is selected."""
+        return not self.subject_groups and not self.value_groups
+
+    def normalized(self) -> tuple:
+        """
+        Returns a canonical, hashable form of the filter. Filters selecting
+        the same tutors in a different parameter order are equal.
+        """
+        def canonical(groups):
+            if self.match == MATCH_ANY:
+                return tuple(sorted(set().union(*groups))) if groups else ()
+            return tuple(sorted({tuple(sorted(group)) for group in groups}))
+
+        return (self.match, canonical(self.subject_groups),
+                canonical(self.value_groups))
+
+    def _conditions(self, groups, through, column) -> list:
+        if not groups:
+            return []
+        if self.match == MATCH_ANY:
+            groups = [set().union(*groups)]
+        return [
+            Exists(through.objects.filter(
+                tutor_id=OuterRef('pk'), **{f'{column}__in': group}))
+            for group in groups
+        ]
+
+    def apply(self, queryset):
+        """
+        Filters a tutor queryset.
+
+        Args:
+            queryset (QuerySet): The tutors to filter.
+
+        Returns:
+            QuerySet: The tutors matching the filter.
+        """
+        conditions = self._conditions(
+            self.subject_groups, Tutor.subjects.through, 'subject_id')
+        conditions += self._conditions(
+            self.value_groups, Tutor.values.through, 'value_id')
+        if conditions:
+            queryset = queryset.filter(*conditions)
+        return queryset
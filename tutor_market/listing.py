@@ -0,0 +1,89 @@
+"""
+The tutor selection shared by the tutor list page and the tutor API.
+"""
+from tutor_market import memory_index
+from tutor_market.filters import TutorFilter
+from tutor_market.models import Tutor
+from tutor_market.pagination import KeysetPaginator, TUTOR_SORTINGS
+from tutor_market.search import is_search_query, search_tutors
+
+
+def requested_sorting(params) -> str:
+    """
+    Returns the sort mode a tutor listing applies for its query parameters.
+    Search results are ranked by relevance unless a sorting is requested.
+    """
+    sorting = params.get('sorting', 'name')
+    if is_search_query(params.get('q')):
+        if 'sorting' not in params:
+            sorting = 'relevance'
+    elif sorting == 'relevance':
+        sorting = 'name'
+    return sorting
+
+
+class TutorListing:
+    """
+    The active tutors selected by the query parameters of a tutor listing.
+
+    Understands the `q`, `subject`, `teachingvalue`, `match` and `sorting`
+    parameters.
+
+    Attributes:
+        query (str): The search query or None.
+        tutor_filter (TutorFilter): The subject and value filters.
+        sorting (str): The applied sort mode of TUTOR_SORTINGS.
+        ordering (tuple): The keyset ordering of the sort mode.
+        active_tutors (QuerySet): The active tutors matching the search,
+            without the subject and value filters.
+        tutors (QuerySet): The matching tutors in the sort order.
+    """
+
+    def __init__(self, params):
+        self.query = params.get('q')
+        self.active_tutors = Tutor.objects.filter(profile_status=True)
+        if self.query is not None:
+            self.active_tutors = search_tutors(self.active_tutors, self.query)
+
+        # Subjects and values are resolved to ids and filtered with EXISTS
+        # subqueries, see tutor_market/filters.py
+        self.tutor_filter = TutorFilter.from_query_params(params)
+
+        self.sorting = requested_sorting(params)
+        self.ordering = TUTOR_SORTINGS.get(
+            self.sorting, TUTOR_SORTINGS['name'])
+
+        self.tutors = self.tutor_filter.apply(
+            self.active_tutors).order_by(*self.ordering)
+
+    def uses_memory_index(self) -> bool:
+        """
+        Returns whether the page can be answered from the in-process index,
+        see tutor_market/memory_index.py
+        """
+        return (memory_index.is_enabled()
+                and not is_search_query(self.query)
+                and self.sorting in memory_index.INDEX_SORTINGS)
+
+    def get_page(self, cursor=None, per_page=6, strict=False):
+        """
+        Returns a keyset paginated page of the tutors.
+
+        Args:
+            cursor (str): A cursor of a previous page or None.
+            per_page (int): The number of tutors per page.
+            strict (bool): Whether to raise for invalid cursors instead of
+                returning the first page.
+
+        Returns:
+            KeysetPage: The page.
+
+        Raises:
+            InvalidCursor: If the cursor is invalid and `strict` is set.
+        """
+        if self.uses_memory_index():
+            return memory_index.tutor_index.get_page(
+                self.tutor_filter, self.ordering, cursor, per_page,
+                strict=strict)
+        paginator = KeysetPaginator(self.tutors, self.ordering, per_page)
+        return paginator.get_page(cursor, strict=strict)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from tutor_market.models import Tutor
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the denormalized rating statistics of every tutor from the
+    stored ratings.
+    """
+    help = 'Rebuilds the rating average, count and histogram of all tutors.'
+
+    def handle(self, *args, **options):
+        tutor_ids = list(
+            Tutor.objects.order_by('pk').values_list('pk', flat=True))
+        count = 0
+        # One aggregate query and one bulk update per batch of tutors
+        for start in range(0, len(tutor_ids), BATCH_SIZE):
+            count += Tutor.objects.filter(
+                pk__in=tutor_ids[start:start + BATCH_SIZE]
+            ).refresh_rating_stats()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt rating statistics for {count} tutors.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tutor_market import search
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the full-text search documents of every tutor.
+    """
+    help = 'Rebuilds the tutor search index.'
+
+    def handle(self, *args, **options):
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} tutors for search.'))
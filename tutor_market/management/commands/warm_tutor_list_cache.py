@@ -0,0 +1,43 @@
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from tutor_market.caching import canonical_list_params, is_shared_cache
+from tutor_market.pagination import TUTOR_SORTINGS
+from tutor_market.views import tutor_list_view
+
+
+class Command(BaseCommand):
+    """
+    Pre-renders the first tutor list page of every sort mode into the cache
+    of anonymous list pages, e.g. after a deployment or a bulk import.
+    """
+    help = 'Renders the first tutor list page of every sort mode into the ' \
+           'cache.'
+
+    def handle(self, *args, **options):
+        if not is_shared_cache():
+            raise CommandError(
+                'The default cache is local to this process, the warmed '
+                'pages would be lost when the command exits. Configure a '
+                'shared cache in CACHES.')
+        factory = RequestFactory()
+        url = reverse('tutor_list')
+        # The default page and every sort mode that works without a search,
+        # rendering pages cached under the same key once
+        variants = {}
+        for params in [{}] + [{'sorting': sorting}
+                              for sorting in TUTOR_SORTINGS]:
+            request = factory.get(url, params)
+            variants.setdefault(canonical_list_params(request.GET), request)
+        for request in variants.values():
+            # The navigation is highlighted by the resolved view
+            request.resolver_match = resolve(request.path_info)
+            request.user = AnonymousUser()
+            request.session = SessionBase()
+            tutor_list_view(request)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed {len(variants)} tutor list pages.'))
@@ -0,0 +1,407 @@
+"""
+Optional in-process index of the active tutors for filtering and sorting.
+
+Enabled with `settings.TUTOR_MEMORY_INDEX`. Every worker keeps the ids,
+names, hourly rates and rating statistics of the active tutors in compact
+arrays, plus one bitset (a Python int, bit n for slot n) per subject and
+value. Subject and value filters become bitwise AND/OR, every sort order is
+sorted once per change, and only the tutors of the requested page are loaded
+from the database.
+
+The index is built on first use in each worker. Changes are published by the
+signal handlers in tutor_market/signals.py to a change log in the shared
+cache after their transaction commits; every worker replays the log before
+answering a query and rebuilds from scratch when entries are missing. The log
+only reaches other workers through a cache shared between processes (see the
+CACHES setting), and writes that bypass the signals are never logged, so
+every index is also rebuilt once it is MAX_AGE seconds old.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from tutor_market.filters import MATCH_ANY
+from tutor_market.models import Tutor
+from tutor_market.pagination import (
+    InvalidCursor, KeysetPage, encode_cursor, parse_cursor, sort_fields
+)
+
+SEQUENCE_KEY = 'tutor_market:memory_index:sequence'
+CHANGE_KEY = 'tutor_market:memory_index:change:{}'
+CHANGE_TIMEOUT = 60 * 60 * 24
+# Replaying more changes than this is slower than a rebuild.
+MAX_REPLAYED_CHANGES = 500
+# Seconds after which an index is rebuilt even without logged changes.
+MAX_AGE = 60 * 5
+# Attempts to claim a sequence number when publishers race.
+PUBLISH_ATTEMPTS = 3
+
+# Fields of Tutor kept in the index.
+INDEXED_FIELDS = frozenset({'profile_status', 'display_name', 'hourly_rate',
+                            'rating_average', 'rating_count'})
+
+# Marks the index's cursors. Names are sorted in code point order here but by
+# the database's collation in SQL, so cursors don't carry over between them.
+CURSOR_SOURCE = 'memory'
+
+# Sortings the index can answer, see TUTOR_SORTINGS. The relevance of
+# search results is only known to the database.
+INDEX_SORTINGS = ('name', 'cheapest', 'most-expensive', 'highest-rated',
+                  'most-reviews')
+
+
+def is_enabled() -> bool:
+    """Returns whether the in-process index is enabled."""
+    return getattr(settings, 'TUTOR_MEMORY_INDEX', False)
+
+
+def publish_changes(tutor_ids):
+    """
+    Publishes changed tutors to the change log once the current transaction
+    commits.
+
+    Args:
+        tutor_ids (list): The ids of tutors whose indexed data changed.
+    """
+    tutor_ids = sorted(set(tutor_ids))
+    if not tutor_ids or not is_enabled():
+        return
+
+    def publish():
+        cache.add(SEQUENCE_KEY, 0, timeout=None)
+        # incr is not atomic on every backend, e.g. the database cache. A
+        # publisher that lost the race finds its entry taken and moves on.
+        for _ in range(PUBLISH_ATTEMPTS):
+            try:
+                sequence = cache.incr(SEQUENCE_KEY)
+            except ValueError:
+                return
+            if cache.add(CHANGE_KEY.format(sequence), tutor_ids,
+                         CHANGE_TIMEOUT):
+                return
+
+    transaction.on_commit(publish)
+
+
+def _slots_of(mask: int) -> set:
+    """Returns the positions of the set bits of a bitset."""
+    bits = bin(mask)[:1:-1]
+    return {slot for slot, bit in enumerate(bits) if bit == '1'}
+
+
+class TutorIndex:
+    """
+    Bitset index of the active tutors of one worker.
+
+    All public methods are thread safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._built_at = None
+        self._sequence = None
+
+    def _reset(self):
+        self._slots = {}
+        self._free = []
+        self._ids = array('q')
+        self._names = []
+        self._rates = array('q')
+        self._averages = array('d')
+        self._counts = array('q')
+        self._active = 0
+        self._subjects = {}
+        self._values = {}
+        self._sorted = {}
+
+    def _load(self, tutor_ids=None):
+        """
+        Loads tutors and their subjects and values into the arrays and
+        bitsets, with three queries. Without ids all tutors are loaded.
+        """
+        tutors = Tutor.objects.filter(profile_status=True).values_list(
+            'pk', 'display_name', 'hourly_rate', 'rating_average',
+            'rating_count')
+        subject_rows = Tutor.subjects.through.objects.filter(
+            tutor__profile_status=True).values_list('tutor_id', 'subject_id')
+        value_rows = Tutor.values.through.objects.filter(
+            tutor__profile_status=True).values_list('tutor_id', 'value_id')
+        if tutor_ids is not None:
+            tutors = tutors.filter(pk__in=tutor_ids)
+            subject_rows = subject_rows.filter(tutor_id__in=tutor_ids)
+            value_rows = value_rows.filter(tutor_id__in=tutor_ids)
+
+        for pk, name, rate, average, count in tutors:
+            slot = self._slots.get(pk)
+            if slot is None:
+                slot = self._free.pop() if self._free else len(self._ids)
+                self._slots[pk] = slot
+                if slot == len(self._ids):
+                    self._ids.append(0)
+                    self._names.append('')
+                    self._rates.append(0)
+                    self._averages.append(0)
+                    self._counts.append(0)
+            self._ids[slot] = pk
+            self._names[slot] = name
+            self._rates[slot] = int(rate * 100)
+            self._averages[slot] = average
+            self._counts[slot] = count
+            self._active |= 1 << slot
+
+        for bitsets, rows in ((self._subjects, subject_rows),
+                              (self._values, value_rows)):
+            for tutor_id, tag_id in rows:
+                slot = self._slots.get(tutor_id)
+                if slot is not None:
+                    bitsets[tag_id] = bitsets.get(tag_id, 0) | 1 << slot
+        self._sorted = {}
+
+    def _remove(self, tutor_ids):
+        """Frees the slots of tutors and clears their bits."""
+        mask = 0
+        for tutor_id in tutor_ids:
+            slot = self._slots.pop(tutor_id, None)
+            if slot is not None:
+                mask |= 1 << slot
+                self._free.append(slot)
+        if not mask:
+            return
+        self._active &= ~mask
+        for bitsets in (self._subjects, self._values):
+            for tag_id in list(bitsets):
+                bitsets[tag_id] &= ~mask
+                if not bitsets[tag_id]:
+                    del bitsets[tag_id]
+        self._sorted = {}
+
+    def _rebuild(self, sequence):
+        self._reset()
+        self._load()
+        self._sequence = sequence
+        self._built = True
+        self._built_at = time.monotonic()
+
+    def _sync(self):
+        """
+        Brings the index up to date with the change log, rebuilding it when
+        the log cannot be replayed or the index is older than MAX_AGE.
+        """
+        sequence = cache.get(SEQUENCE_KEY)
+        if sequence is None:
+            cache.add(SEQUENCE_KEY, 0, timeout=None)
+            sequence = cache.get(SEQUENCE_KEY, 0)
+        if (not self._built or self._sequence is None
+                or time.monotonic() - self._built_at > MAX_AGE):
+            self._rebuild(sequence)
+            return
+        if sequence == self._sequence:
+            return
+        if (sequence < self._sequence
+                or sequence - self._sequence > MAX_REPLAYED_CHANGES):
+            self._rebuild(sequence)
+            return
+
+        keys = [CHANGE_KEY.format(number)
+                for number in range(self._sequence + 1, sequence + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            self._rebuild(sequence)
+            return
+        tutor_ids = set().union(*changes.values())
+        self._remove(tutor_ids)
+        self._load(tutor_ids)
+        self._sequence = sequence
+
+    def rebuild(self) -> int:
+        """
+        Rebuilds the index from the database.
+
+        Returns:
+            int: The number of indexed tutors.
+        """
+        with self._lock:
+            cache.add(SEQUENCE_KEY, 0, timeout=None)
+            self._rebuild(cache.get(SEQUENCE_KEY, 0))
+            return len(self._slots)
+
+    def _mask(self, tutor_filter) -> int:
+        mask = self._active
+        for groups, bitsets in ((tutor_filter.subject_groups, self._subjects),
+                                (tutor_filter.value_groups, self._values)):
+            if not groups:
+                continue
+            if tutor_filter.match == MATCH_ANY:
+                groups = [set().union(*groups)]
+            for group in groups:
+                group_mask = 0
+                for tag_id in group:
+                    group_mask |= bitsets.get(tag_id, 0)
+                mask &= group_mask
+        return mask
+
+    def _field(self, field):
+        return {
+            'display_name': self._names,
+            'hourly_rate': self._rates,
+            'rating_average': self._averages,
+            'rating_count': self._counts,
+            'pk': self._ids,
+        }[field]
+
+    def _sorted_keys(self, fields) -> tuple:
+        """
+        Returns the sort keys of all active tutors in ascending order and
+        their slots, computed once per change.
+        """
+        if fields not in self._sorted:
+            columns = [self._field(field) for field in fields]
+            rows = sorted(
+                (tuple(column[slot] for column in columns), slot)
+                for slot in self._slots.values())
+            self._sorted[fields] = (
+                [key for key, _ in rows], [slot for _, slot in rows])
+        return self._sorted[fields]
+
+    @staticmethod
+    def _to_key(fields, values) -> tuple:
+        """Converts validated cursor values to index keys."""
+        return tuple(
+            int(Decimal(value) * 100) if field == 'hourly_rate' else value
+            for field, value in zip(fields, values))
+
+    @staticmethod
+    def _to_cursor(fields, key) -> list:
+        """Converts index keys to the cursor values of the database."""
+        return [
+            Decimal(value).scaleb(-2) if field == 'hourly_rate' else value
+            for field, value in zip(fields, key)]
+
+    def get_page(self, tutor_filter, ordering, cursor=None, per_page=6,
+                 window=2, strict=False) -> KeysetPage:
+        """
+        Returns a page of active tutors matching a filter.
+
+        Pages list the same tutors as KeysetPaginator for the same ordering,
+        except that names sort in code point order. Cursors are not
+        interchangeable: each paginator rejects the other's cursors.
+
+        Args:
+            tutor_filter (TutorFilter): The subject and value filters.
+            ordering (tuple): A keyset ordering of TUTOR_SORTINGS.
+            cursor (str): A cursor of a previous page or None.
+            per_page (int): The number of tutors per page.
+            window (int): The number of following pages to link to.
+            strict (bool): Whether to raise for invalid cursors instead of
+                returning the first page.
+
+        Returns:
+            KeysetPage: The page with the tutors loaded from the database.
+
+        Raises:
+            InvalidCursor: If the cursor is invalid and `strict` is set.
+        """
+        fields = tuple(field.lstrip('-') for field in ordering)
+        descending = ordering[0].startswith('-')
+        try:
+            data = parse_cursor(
+                cursor, sort_fields(Tutor.objects.all(), fields),
+                CURSOR_SOURCE)
+        except InvalidCursor:
+            if strict:
+                raise
+            data = None
+
+        with self._lock:
+            self._sync()
+            mask = self._mask(tutor_filter)
+            all_keys, all_slots = self._sorted_keys(fields)
+            if mask == self._active:
+                pairs = list(zip(all_keys, all_slots))
+            else:
+                matches = _slots_of(mask)
+                pairs = [(key, slot) for key, slot in zip(all_keys, all_slots)
+                         if slot in matches]
+            ids = self._ids
+
+            keys = [key for key, _ in pairs]
+            rows = [(key, ids[slot]) for key, slot in pairs]
+            if descending:
+                rows.reverse()
+
+            cursor_key = self._to_key(fields, data['k']) if data else None
+
+            # Positions in `rows` are found by bisecting the ascending keys
+            if data and data['d'] == 'prev':
+                if descending:
+                    end = len(keys) - bisect_right(keys, cursor_key)
+                else:
+                    end = bisect_left(keys, cursor_key)
+                start = max(end - per_page, 0)
+            else:
+                start = 0
+                if data:
+                    if descending:
+                        start = len(keys) - bisect_left(keys, cursor_key)
+                    else:
+                        start = bisect_right(keys, cursor_key)
+                end = start + per_page
+
+        page_rows = rows[start:end]
+
+        def page_cursor(row, direction, number):
+            return encode_cursor(
+                self._to_cursor(fields, row[0]), direction, number,
+                CURSOR_SOURCE)
+
+        previous_cursor = None
+        next_cursor = None
+        if data and data['d'] == 'prev':
+            number = max(data['n'], 2) if start > 0 else 1
+            page_window = [{'number': number, 'cursor': None}]
+            if start > 0:
+                previous_cursor = page_cursor(
+                    page_rows[0], 'prev', number - 1)
+                page_window.insert(
+                    0, {'number': number - 1, 'cursor': previous_cursor})
+            if page_rows:
+                next_cursor = page_cursor(page_rows[-1], 'next', number + 1)
+                page_window.append(
+                    {'number': number + 1, 'cursor': next_cursor})
+        else:
+            number = max(data['n'], 2) if data else 1
+            page_window = [{'number': number, 'cursor': None}]
+            if len(page_rows) == per_page:
+                for offset in range(1, window + 1):
+                    last = start + per_page * offset - 1
+                    if last + 1 >= len(rows):
+                        break
+                    page_window.append({
+                        'number': number + offset,
+                        'cursor': page_cursor(
+                            rows[last], 'next', number + offset),
+                    })
+                if len(page_window) > 1:
+                    next_cursor = page_window[1]['cursor']
+            if data and page_rows:
+                previous_cursor = page_cursor(
+                    page_rows[0], 'prev', number - 1)
+                page_window.insert(
+                    0, {'number': number - 1, 'cursor': previous_cursor})
+
+        # The index may lag behind a deactivation by one change
+        tutors = Tutor.objects.filter(profile_status=True).in_bulk(
+            [pk for _, pk in page_rows])
+        object_list = [tutors[pk] for _, pk in page_rows if pk in tutors]
+        return KeysetPage(
+            object_list, number, next_cursor, previous_cursor, page_window)
+
+
+tutor_index = TutorIndex()
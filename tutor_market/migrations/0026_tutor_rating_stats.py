@@ -0,0 +1,66 @@
+# Generated by Django 5.0.6 on 2026-10-18 07:45
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Q
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Tutor = apps.get_model('tutor_market', 'Tutor')
+    Rating = apps.get_model('tutor_market', 'Rating')
+    for tutor in Tutor.objects.only('pk').iterator():
+        stats = Rating.objects.filter(tutor_id=tutor.pk).aggregate(
+            rating_average=Avg('score', default=0),
+            rating_count=Count('pk'),
+            **{
+                f'rating_count_{score}': Count('pk', filter=Q(score=score))
+                for score in range(1, 6)
+            }
+        )
+        Tutor.objects.filter(pk=tutor.pk).update(**stats)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutor_market', '0025_remove_message_conversation_message_recipient_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tutor',
+            name='rating_average',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='tutor',
+            name='rating_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='tutor',
+            name='rating_count_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tutor',
+            name='rating_count_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tutor',
+            name='rating_count_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tutor',
+            name='rating_count_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tutor',
+            name='rating_count_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(
+            backfill_rating_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.0.6 on 2026-10-18 07:47
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+FTS_TABLE = 'tutor_market_tutorsearch_fts'
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    Creates the vendor specific search indexes and fills them with the
+    existing tutors.
+
+    PostgreSQL gets GIN indexes on the search vector and on the keywords
+    (pg_trgm), SQLite gets an FTS5 virtual table keyed by the tutor id.
+    """
+    Tutor = apps.get_model('tutor_market', 'Tutor')
+    TutorSearchDocument = apps.get_model('tutor_market', 'TutorSearchDocument')
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX tutor_search_vector_gin ON '
+            'tutor_market_tutorsearchdocument USING gin (vector)')
+        schema_editor.execute(
+            'CREATE INDEX tutor_search_keywords_trgm ON '
+            'tutor_market_tutorsearchdocument '
+            'USING gin (keywords gin_trgm_ops)')
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} USING '
+            f"fts5(title, keywords, body, tokenize='porter unicode61')")
+
+    for tutor in Tutor.objects.prefetch_related('subjects', 'values'):
+        names = [subject.name for subject in tutor.subjects.all()]
+        names += [value.name for value in tutor.values.all()]
+        document = {
+            'title': tutor.display_name,
+            'keywords': ' '.join(names),
+            'body': f'{tutor.catch_phrase} {tutor.description}',
+        }
+        TutorSearchDocument.objects.create(tutor_id=tutor.pk, **document)
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, keywords, body) '
+                f'VALUES (%s, %s, %s, %s)',
+                [tutor.pk, document['title'], document['keywords'],
+                 document['body']]
+            )
+
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE tutor_market_tutorsearchdocument SET vector = "
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(keywords, '')), 'B') "
+            "|| setweight(to_tsvector('english', coalesce(body, '')), 'C')")
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS tutor_search_vector_gin')
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS tutor_search_keywords_trgm')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutor_market', '0026_tutor_rating_stats'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='TutorSearchDocument',
+            fields=[
+                ('tutor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='tutor_market.tutor')),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('keywords', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+                ('vector', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
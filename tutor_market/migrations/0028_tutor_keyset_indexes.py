@@ -0,0 +1,41 @@
+# Generated by Django 5.0.6 on 2026-10-18 07:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutor_market', '0027_tutorsearchdocument'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tutor',
+            name='rating_average',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='tutor',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='tutor',
+            index=models.Index(fields=['profile_status', 'display_name', 'id'], name='tutor_name_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutor',
+            index=models.Index(fields=['profile_status', 'hourly_rate', 'id'], name='tutor_rate_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutor',
+            index=models.Index(fields=['profile_status', 'rating_average', 'rating_count', 'id'], name='tutor_rating_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutor',
+            index=models.Index(fields=['profile_status', 'rating_count', 'id'], name='tutor_reviews_keyset_idx'),
+        ),
+    ]
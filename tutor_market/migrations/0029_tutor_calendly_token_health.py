@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutor_market', '0028_tutor_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tutor',
+            name='calendly_token_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tutor',
+            name='calendly_token_error',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='tutor',
+            name='calendly_token_status',
+            field=models.CharField(choices=[('unknown', 'Unknown'), ('active', 'Active'), ('error', 'Error')], default='unknown', max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutor_market', '0029_tutor_calendly_token_health'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tutor',
+            name='calendly_refresh_failures',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tutor',
+            name='calendly_refresh_retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutor_market', '0030_tutor_calendly_refresh_backoff'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tutor',
+            name='calendly_user_uri',
+            field=models.CharField(blank=True, db_index=True, max_length=200, null=True),
+        ),
+    ]
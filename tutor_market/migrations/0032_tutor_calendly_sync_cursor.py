@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutor_market', '0031_tutor_calendly_user_uri'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tutor',
+            name='calendly_sync_cursor',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, Count, Q
+
+
+def remove_duplicate_ratings(apps, schema_editor):
+    """
+    Keeps the latest rating of every student per tutor and refreshes the
+    rating statistics of the affected tutors.
+    """
+    Rating = apps.get_model('tutor_market', 'Rating')
+    Tutor = apps.get_model('tutor_market', 'Tutor')
+    duplicated = Rating.objects.values('tutor_id', 'user_id').annotate(
+        ratings=Count('pk')).filter(ratings__gt=1)
+    tutor_ids = set()
+    for row in duplicated:
+        ratings = Rating.objects.filter(
+            tutor_id=row['tutor_id'], user_id=row['user_id'])
+        ratings.exclude(pk=ratings.order_by('-pk')[0].pk).delete()
+        tutor_ids.add(row['tutor_id'])
+
+    for tutor_id in tutor_ids:
+        stats = Rating.objects.filter(tutor_id=tutor_id).aggregate(
+            rating_average=Avg('score', default=0),
+            rating_count=Count('pk'),
+            **{
+                f'rating_count_{score}': Count('pk', filter=Q(score=score))
+                for score in range(1, 6)
+            }
+        )
+        Tutor.objects.filter(pk=tutor_id).update(**stats)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutor_market', '0032_tutor_calendly_sync_cursor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'recipient', 'timestamp'], name='message_conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['recipient', 'timestamp'], name='message_inbox'),
+        ),
+        migrations.RunPython(
+            remove_duplicate_ratings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('tutor', 'user'), name='unique_rating_tutor_user'),
+        ),
+    ]
@@ -1,6 +1,70 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import Avg
+from django.db.models import Avg, Count, Q
+
+
+def rating_stats_aggregates() -> dict:
+    """
+    Returns the aggregates of a tutor's denormalized rating statistics by
+    field name.
+    """
+    return {
+        'rating_average': Avg('score', default=0),
+        'rating_count': Count('pk'),
+        **{
+            f'rating_count_{score}': Count('pk', filter=Q(score=score))
+            for score in range(1, 6)
+        },
+    }
+
+
+class TutorQuerySet(models.QuerySet):
+    """
+    Custom queryset for the Tutor model.
+    """
+
+    def for_cards(self):
+        """
+        Prepares the queryset for rendering tutor cards.
+
+        The subjects and values of all tutors are loaded with one query each.
+        Rating statistics are stored on the tutor row itself, so
+        tutor_market/includes/tutor_card.html does not run any further
+        queries per tutor.
+
+        Returns:
+            QuerySet: The queryset with the card relations prefetched.
+        """
+        return self.prefetch_related('subjects', 'values')
+
+    def refresh_rating_stats(self) -> int:
+        """
+        Recomputes the denormalized rating statistics of the tutors in the
+        queryset with one grouped aggregate query and writes them in bulk.
+
+        The tutor rows are locked in primary key order for the duration of
+        the update, like in Tutor.refresh_rating_stats.
+
+        Returns:
+            int: The number of updated tutors.
+        """
+        aggregates = rating_stats_aggregates()
+        with transaction.atomic():
+            tutor_ids = list(self.select_for_update().order_by(
+                'pk').values_list('pk', flat=True))
+            stats = {
+                row.pop('tutor_id'): row
+                for row in Rating.objects.filter(
+                    tutor_id__in=tutor_ids
+                ).values('tutor_id').annotate(**aggregates).order_by()
+            }
+            empty = dict.fromkeys(aggregates, 0)
+            self.model.objects.bulk_update(
+                [self.model(pk=pk, **stats.get(pk, empty))
+                 for pk in tutor_ids],
+                list(aggregates), batch_size=500)
+        return len(tutor_ids)
 
 
 class Tutor(models.Model):
@@ -27,18 +91,100 @@ class Tutor(models.Model):
     calendly_refresh_token = models.CharField(
         max_length=600, null=True, blank=True)
     calendly_token_expires_at = models.DateTimeField(null=True, blank=True)
+    # The tutor's Calendly user, matched against webhook payloads, see
+    # calendly/webhooks.py
+    calendly_user_uri = models.CharField(
+        max_length=200, null=True, blank=True, db_index=True)
+    # Start of the last session sync, see calendly/sync.py. Tutors without
+    # a cursor get their history backfilled.
+    calendly_sync_cursor = models.DateTimeField(null=True, blank=True)
+
+    # Result of the last Calendly token check, see calendly/tokens.py.
+    # Pages read this state instead of calling Calendly.
+    TOKEN_STATUS_CHOICES = [
+        ("unknown", "Unknown"),
+        ("active", "Active"),
+        ("error", "Error"),
+    ]
+    calendly_token_status = models.CharField(
+        max_length=20, choices=TOKEN_STATUS_CHOICES, default="unknown")
+    calendly_token_checked_at = models.DateTimeField(null=True, blank=True)
+    calendly_token_error = models.CharField(
+        max_length=255, blank=True, default='')
+    # Backoff of the scheduled token refresh, see calendly/tokens.py
+    calendly_refresh_failures = models.PositiveSmallIntegerField(default=0)
+    calendly_refresh_retry_at = models.DateTimeField(null=True, blank=True)
     profile_status = models.BooleanField(default=False)
     testing_profile = models.BooleanField(default=False)
 
+    objects = TutorQuerySet.as_manager()
+
+    # Denormalized rating statistics, kept current by Rating writes.
+    # Rebuild them with `python manage.py rebuild_rating_stats`.
+    rating_average = models.FloatField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_count_1 = models.PositiveIntegerField(default=0)
+    rating_count_2 = models.PositiveIntegerField(default=0)
+    rating_count_3 = models.PositiveIntegerField(default=0)
+    rating_count_4 = models.PositiveIntegerField(default=0)
+    rating_count_5 = models.PositiveIntegerField(default=0)
+
     def average_rating(self):
 
         return Rating.objects.filter(tutor=self).aggregate(Avg('score'))
 
+    def rating_histogram(self) -> dict:
+        """
+        Returns the stored number of ratings per score.
+
+        Returns:
+            dict: A mapping of each score (1-5) to its number of ratings.
+        """
+        return {
+            score: getattr(self, f'rating_count_{score}')
+            for score in range(1, 6)
+        }
+
+    def refresh_rating_stats(self):
+        """
+        Recomputes the denormalized rating statistics from the tutor's ratings
+        and writes them to the database.
+
+        The tutor row is locked for the duration of the update so concurrent
+        rating writes are applied one after another.
+        """
+        with transaction.atomic():
+            list(Tutor.objects.select_for_update().filter(
+                pk=self.pk).values_list('pk', flat=True))
+            stats = Rating.objects.filter(tutor_id=self.pk).aggregate(
+                **rating_stats_aggregates())
+            Tutor.objects.filter(pk=self.pk).update(**stats)
+
+        for field, value in stats.items():
+            setattr(self, field, value)
+
     def __str__(self):
         return self.display_name
 
     class Meta:
         ordering = ['display_name']
+        # Keyset pagination indexes for the sort modes of the tutor list,
+        # see TUTOR_SORTINGS in tutor_market/pagination.py
+        indexes = [
+            models.Index(
+                fields=['profile_status', 'display_name', 'id'],
+                name='tutor_name_keyset_idx'),
+            models.Index(
+                fields=['profile_status', 'hourly_rate', 'id'],
+                name='tutor_rate_keyset_idx'),
+            models.Index(
+                fields=['profile_status', 'rating_average', 'rating_count',
+                        'id'],
+                name='tutor_rating_keyset_idx'),
+            models.Index(
+                fields=['profile_status', 'rating_count', 'id'],
+                name='tutor_reviews_keyset_idx'),
+        ]
 
 
 class Student(models.Model):
@@ -58,6 +204,17 @@ class Message(models.Model):
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name="received_messages", null=True)  # Added null=True
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # A conversation between two users and a user's inbox, see
+            # start_conversation and tutor_messages
+            models.Index(fields=['sender', 'recipient', 'timestamp'],
+                         name='message_conversation'),
+            models.Index(fields=['recipient', 'timestamp'],
+                         name='message_inbox'),
+        ]
+
     def __str__(self):
         return f" From {self.sender} to {self.recipient}"
 
@@ -88,9 +245,69 @@ class Rating(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField()
 
+    class Meta:
+        constraints = [
+            # One review per student and tutor, also indexes the tutor's
+            # reviews
+            models.UniqueConstraint(
+                fields=['tutor', 'user'], name='unique_rating_tutor_user'),
+        ]
+
     def __str__(self):
         return f'{self.score} - {self.comment}'
 
+    def save(self, *args, **kwargs):
+        """
+        Saves the rating and refreshes the rating statistics of the affected
+        tutors in the same transaction.
+
+        Deletions are handled by the delete signals in
+        tutor_market/signals.py so queryset and cascading deletes are covered
+        as well, in the deleting transaction and once per tutor and delete.
+        """
+        with transaction.atomic():
+            previous_tutor_id = None
+            if self.pk:
+                previous_tutor_id = Rating.objects.filter(
+                    pk=self.pk).values_list('tutor_id', flat=True).first()
+
+            super().save(*args, **kwargs)
+
+            self.tutor.refresh_rating_stats()
+            if previous_tutor_id and previous_tutor_id != self.tutor_id:
+                Tutor(pk=previous_tutor_id).refresh_rating_stats()
+
+
+class TutorSearchDocument(models.Model):
+    """
+    The denormalized full-text search document of a tutor.
+
+    Kept current by the signal handlers in tutor_market/signals.py and
+    queried through tutor_market/search.py.
+
+    Attributes:
+        tutor (Tutor): The tutor the document describes.
+        title (str): The tutor's display name.
+        keywords (str): The names of the tutor's subjects and values.
+        body (str): The tutor's catch phrase and description.
+        vector (SearchVectorField): The weighted search vector of the
+            document (PostgreSQL only).
+    """
+
+    tutor = models.OneToOneField(
+        Tutor,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    title = models.CharField(max_length=200, blank=True)
+    keywords = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+    vector = SearchVectorField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Search document of {self.title}'
+
 
 class Subject(models.Model):
     """
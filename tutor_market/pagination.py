@@ -0,0 +1,401 @@
+"""
+Keyset (cursor) pagination for tutor listings.
+
+Instead of `COUNT(*)` and a growing `OFFSET`, every page continues from the
+sort key of the last row of the previous page, so deep pages cost the same as
+the first one. Cursors are opaque url-safe strings.
+"""
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import models
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Sort modes of the tutor list mapped to their keyset ordering. Every
+# ordering ends with the primary key as a tiebreaker. The column orderings
+# use a single direction, so the composite indexes on Tutor can be scanned
+# in either direction. Relevance mixes directions: its rank is computed per
+# query and sorted in SQL without an index, with ties listed by name.
+TUTOR_SORTINGS = {
+    'name': ('display_name', 'pk'),
+    'cheapest': ('hourly_rate', 'pk'),
+    'most-expensive': ('-hourly_rate', '-pk'),
+    'highest-rated': ('-rating_average', '-rating_count', '-pk'),
+    'most-reviews': ('-rating_count', '-pk'),
+    # Only available for search results, see tutor_market/search.py
+    'relevance': ('-search_rank', 'display_name', 'pk'),
+}
+# The range of the integer columns of the supported databases.
+MAX_INTEGER = 2 ** 63 - 1
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised for cursors that were not created for the paginated ordering,
+    e.g. tampered ones.
+    """
+
+
+def encode_cursor(values, direction: str, number: int,
+                  source: str = None) -> str:
+    """
+    Encodes a position in a keyset ordering as an opaque cursor.
+
+    Args:
+        values (list): The sort key values of the row next to the page.
+        direction (str): 'next' for rows after the key, 'prev' for rows
+            before it.
+        number (int): The number of the page the cursor leads to.
+        source (str): The paginator the cursor belongs to if it sorts
+            differently than the database, see parse_cursor.
+
+    Returns:
+        str: The url-safe cursor.
+    """
+    data = {
+        'k': [str(value) if isinstance(value, Decimal)
+              else value.isoformat() if isinstance(value, datetime)
+              else value
+              for value in values],
+        'd': direction,
+        'n': number,
+    }
+    if source:
+        data['s'] = source
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """
+    Decodes a cursor created by encode_cursor.
+
+    Returns:
+        dict: The decoded cursor or None if the cursor is invalid.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeError):
+        return None
+    if (not isinstance(data, dict)
+            or not isinstance(data.get('k'), list)
+            or data.get('d') not in ('next', 'prev')
+            or not isinstance(data.get('n'), int)
+            or not isinstance(data.get('s', ''), str)):
+        return None
+    return data
+
+
+def sort_fields(queryset, names) -> list:
+    """
+    Returns the model fields, or the output fields of annotations, that a
+    queryset is sorted by.
+
+    Args:
+        queryset (QuerySet): The sorted queryset.
+        names (list): The names of the sort fields, without direction.
+
+    Returns:
+        list: The fields.
+    """
+    opts = queryset.model._meta
+    fields = []
+    for name in names:
+        if name in queryset.query.annotations:
+            fields.append(queryset.query.annotations[name].output_field)
+        else:
+            fields.append(opts.pk if name == 'pk' else opts.get_field(name))
+    return fields
+
+
+def to_sort_value(field, value):
+    """
+    Converts a value of a decoded cursor to the type of its sort field.
+
+    Cursors come from the query string, so nothing but the values the
+    paginator encodes is accepted.
+
+    Args:
+        field (Field): The sort field.
+        value: The JSON value of the cursor.
+
+    Returns:
+        The value as Decimal, int, float, str or datetime.
+
+    Raises:
+        InvalidCursor: If the value does not fit the field.
+    """
+    if isinstance(field, models.DecimalField):
+        if isinstance(value, (str, int)) and not isinstance(value, bool):
+            try:
+                value = Decimal(value)
+            except InvalidOperation:
+                value = None
+            integer_digits = field.max_digits - field.decimal_places
+            if (value is not None and value.is_finite()
+                    and abs(value) < 10 ** integer_digits):
+                return value
+    elif isinstance(field, models.IntegerField):
+        if (isinstance(value, int) and not isinstance(value, bool)
+                and abs(value) <= MAX_INTEGER):
+            return value
+    elif isinstance(field, models.FloatField):
+        if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                and math.isfinite(value)):
+            return float(value)
+    elif isinstance(field, models.DateTimeField):
+        if isinstance(value, str):
+            try:
+                value = parse_datetime(value)
+            except ValueError:
+                value = None
+            if value is not None:
+                return value
+    elif isinstance(field, (models.CharField, models.TextField)):
+        if isinstance(value, str):
+            return value
+    raise InvalidCursor(f'Invalid cursor value for {field}.')
+
+
+def parse_cursor(cursor: str, fields, source: str = None) -> dict:
+    """
+    Decodes a cursor and converts its sort key to the types of the sort
+    fields.
+
+    Args:
+        cursor (str): A cursor created by encode_cursor or None.
+        fields (list): The sort fields, see sort_fields.
+        source (str): The paginator the cursor must belong to. Cursors of
+            other sources are rejected, since their order may differ.
+
+    Returns:
+        dict: The decoded cursor or None if no cursor is given.
+
+    Raises:
+        InvalidCursor: If the cursor is broken or of a different ordering.
+    """
+    if not cursor:
+        return None
+    data = decode_cursor(cursor)
+    if (data is None or len(data['k']) != len(fields)
+            or data.pop('s', None) != source):
+        raise InvalidCursor('Invalid cursor.')
+    data['k'] = [to_sort_value(field, value)
+                 for field, value in zip(fields, data['k'])]
+    return data
+
+
+def _parse_ordering(ordering) -> list:
+    """
+    Splits an ordering like ('-hourly_rate', '-pk') into (field, descending)
+    pairs.
+    """
+    return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+
+def keyset_filter(ordering, values, after: bool = True) -> Q:
+    """
+    Builds the filter for the rows after (or before) a sort key.
+
+    For the ordering (a, b, pk) and the key (x, y, z) the rows after the key
+    are `a > x OR (a = x AND b > y) OR (a = x AND b = y AND pk > z)`, with the
+    comparisons flipped for descending fields. The redundant `a >= x` lets
+    the database range-scan the leading index column.
+
+    Args:
+        ordering (tuple): The keyset ordering.
+        values (list): The sort key values.
+        after (bool): Whether to select the rows after or before the key.
+
+    Returns:
+        Q: The filter.
+    """
+    fields = _parse_ordering(ordering)
+    condition = Q()
+    for i, (field, descending) in enumerate(fields):
+        lookup = 'lt' if descending == after else 'gt'
+        term = Q(**{f'{field}__{lookup}': values[i]})
+        for j in range(i):
+            term &= Q(**{fields[j][0]: values[j]})
+        condition |= term
+
+    leading_field, leading_descending = fields[0]
+    leading_lookup = 'lte' if leading_descending == after else 'gte'
+    return Q(**{f'{leading_field}__{leading_lookup}': values[0]}) & condition
+
+
+def _reverse_ordering(ordering) -> list:
+    """Flips the direction of every field of an ordering."""
+    return [field[1:] if field.startswith('-') else f'-{field}'
+            for field in ordering]
+
+
+class KeysetPage:
+    """
+    One page of a keyset paginated queryset.
+
+    Attributes:
+        object_list (list): The rows of the page.
+        number (int): The page number, counted from the first page.
+        next_cursor (str): The cursor of the next page or None.
+        previous_cursor (str): The cursor of the previous page or None.
+        page_window (list): The pages to link to around the current one as
+            dicts with `number` and `cursor` (None for the current page).
+    """
+
+    def __init__(self, object_list, number, next_cursor, previous_cursor,
+                 page_window):
+        self.object_list = object_list
+        self.number = number
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.page_window = page_window
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by a keyset ordering.
+
+    Every page costs two bounded queries: one for the rows of the page and
+    one for the sort keys of the following `window` pages, which are used to
+    link to them.
+
+    Args:
+        queryset (QuerySet): The queryset to paginate.
+        ordering (tuple): The keyset ordering, ending with a unique field.
+        per_page (int): The number of rows per page.
+        window (int): The number of following pages to link to.
+    """
+
+    def __init__(self, queryset, ordering, per_page, window=2):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.window = window
+        self.fields = [field for field, _ in _parse_ordering(self.ordering)]
+        self.sort_fields = sort_fields(queryset, self.fields)
+
+    def _key(self, obj) -> list:
+        return [getattr(obj, field) for field in self.fields]
+
+    def get_page(self, cursor: str = None,
+                 strict: bool = False) -> KeysetPage:
+        """
+        Returns the page a cursor leads to.
+
+        Invalid cursors and cursors of a different ordering return the first
+        page, unless `strict` is set.
+
+        Args:
+            cursor (str): A cursor of a previous page or None.
+            strict (bool): Whether to raise for invalid cursors.
+
+        Returns:
+            KeysetPage: The page.
+
+        Raises:
+            InvalidCursor: If the cursor is invalid and `strict` is set.
+        """
+        try:
+            data = parse_cursor(cursor, self.sort_fields)
+        except InvalidCursor:
+            if strict:
+                raise
+            data = None
+
+        if data and data['d'] == 'prev':
+            return self._get_previous_page(data)
+        return self._get_next_page(data)
+
+    def _get_next_page(self, data) -> KeysetPage:
+        queryset = self.queryset
+        number = 1
+        if data:
+            queryset = queryset.filter(
+                keyset_filter(self.ordering, data['k'], after=True))
+            number = max(data['n'], 2)
+        queryset = queryset.order_by(*self.ordering)
+
+        object_list = list(queryset[:self.per_page])
+
+        page_window = [{'number': number, 'cursor': None}]
+        next_cursor = None
+        if len(object_list) == self.per_page:
+            # Sort keys from the last row of this page to the first row of
+            # the page after the window.
+            keys = list(queryset.prefetch_related(None).values_list(
+                *self.fields)[self.per_page - 1:
+                              self.per_page * self.window + 1])
+            for offset in range(1, self.window + 1):
+                if (offset - 1) * self.per_page + 1 >= len(keys):
+                    break
+                page_cursor = encode_cursor(
+                    keys[(offset - 1) * self.per_page], 'next',
+                    number + offset)
+                page_window.append(
+                    {'number': number + offset, 'cursor': page_cursor})
+            if len(page_window) > 1:
+                next_cursor = page_window[1]['cursor']
+
+        previous_cursor = None
+        if data and object_list:
+            previous_cursor = encode_cursor(
+                self._key(object_list[0]), 'prev', number - 1)
+            page_window.insert(
+                0, {'number': number - 1, 'cursor': previous_cursor})
+
+        return KeysetPage(
+            object_list, number, next_cursor, previous_cursor, page_window)
+
+    def _get_previous_page(self, data) -> KeysetPage:
+        queryset = self.queryset.filter(
+            keyset_filter(self.ordering, data['k'], after=False)).order_by(
+                *_reverse_ordering(self.ordering))
+
+        object_list = list(queryset[:self.per_page + 1])
+        has_previous = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page][::-1]
+        number = max(data['n'], 2) if has_previous else 1
+
+        page_window = [{'number': number, 'cursor': None}]
+        previous_cursor = None
+        if has_previous:
+            previous_cursor = encode_cursor(
+                self._key(object_list[0]), 'prev', number - 1)
+            page_window.insert(
+                0, {'number': number - 1, 'cursor': previous_cursor})
+
+        next_cursor = None
+        if object_list:
+            next_cursor = encode_cursor(
+                self._key(object_list[-1]), 'next', number + 1)
+            page_window.append({'number': number + 1, 'cursor': next_cursor})
+
+        return KeysetPage(
+            object_list, number, next_cursor, previous_cursor, page_window)
@@ -0,0 +1,71 @@
+"""
+Cached fragments of the tutor detail page.
+
+The detail page is the same for every visitor except for the review form,
+the booking widget and the visitor's upcoming lessons. The shared parts, the
+profile with the rating histogram and the first page of reviews, are
+rendered once per version of the tutor's card tag (see
+tutor_market/caching.py) and cached, so logged in visitors only render their
+own parts around them.
+"""
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from tutor_market.caching import card_tag, get_versions, make_key
+from tutor_market.reviews import get_review_page, next_page_url
+
+PROFILE_TEMPLATE = 'tutor_market/includes/tutor_profile.html'
+REVIEWS_TEMPLATE = 'tutor_market/includes/tutor_reviews.html'
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def review_histogram(tutor) -> OrderedDict:
+    """
+    Returns the number and percentage of a tutor's ratings per score, from
+    the highest score to the lowest.
+    """
+    total_reviews = tutor.rating_count
+    review_counts = {}
+    for score, count in tutor.rating_histogram().items():
+        percentage = (count / total_reviews * 100) if total_reviews > 0 else 0
+        review_counts[score] = {'count': count, 'percentage': percentage}
+
+    # -> Credit for reversing the order of a dictionary: https://www.geeksforgeeks.org/ordereddict-in-python/  # noqa
+    return OrderedDict(reversed(list(review_counts.items())))
+
+
+def render_profile_fragments(tutor, review_sorting: str) -> dict:
+    """
+    Renders the shared fragments of a tutor's detail page, reusing the
+    cached ones while the tutor is unchanged.
+
+    Args:
+        tutor (Tutor): The tutor.
+        review_sorting (str): The sort mode of the reviews, see
+            tutor_market/reviews.py.
+
+    Returns:
+        dict: The `profile` and `reviews` HTML.
+    """
+    key = make_key('tutor_profile_fragments', tutor.pk, review_sorting,
+                   get_versions(card_tag(tutor.pk)))
+    fragments = cache.get(key)
+    if fragments is None:
+        reviews = get_review_page(tutor.pk, review_sorting)
+        context = {
+            'tutor': tutor,
+            'review_counts': review_histogram(tutor),
+            'reviews': reviews,
+            'reviews_next_url': next_page_url(
+                tutor.pk, reviews, review_sorting),
+            'review_sorting': review_sorting,
+        }
+        fragments = {
+            'profile': render_to_string(PROFILE_TEMPLATE, context),
+            'reviews': render_to_string(REVIEWS_TEMPLATE, context),
+        }
+        cache.set(key, fragments, FRAGMENT_TIMEOUT)
+    return {name: mark_safe(html) for name, html in fragments.items()}
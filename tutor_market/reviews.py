@@ -0,0 +1,76 @@
+"""
+The reviews of a tutor, shared by the tutor detail page and the reviews API.
+
+Reviews are keyset paginated (see tutor_market/pagination.py) with their
+reviewers joined in, so a page costs the same bounded queries however many
+reviews a tutor has. The detail page renders the first page and loads the
+following ones from `/tutor-market/api/tutors/<pk>/reviews/`.
+"""
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from tutor_market.models import Rating
+from tutor_market.pagination import KeysetPaginator
+
+# Sort modes of the reviews mapped to their keyset ordering. Ratings have no
+# timestamp, the primary key orders them by creation.
+REVIEW_SORTINGS = {
+    'newest': ('-pk',),
+    'highest-score': ('-score', '-pk'),
+    'lowest-score': ('score', 'pk'),
+}
+REVIEWS_PER_PAGE = 10
+
+
+def get_review_page(tutor_pk: int, sorting: str = 'newest',
+                    cursor: str = None, per_page: int = REVIEWS_PER_PAGE):
+    """
+    Returns a page of a tutor's reviews with their reviewers.
+
+    Args:
+        tutor_pk (int): The primary key of the tutor.
+        sorting (str): A sort mode of REVIEW_SORTINGS, unknown ones sort by
+            newest.
+        cursor (str): A cursor of a previous page or None.
+        per_page (int): The number of reviews per page.
+
+    Returns:
+        KeysetPage: The page.
+    """
+    ordering = REVIEW_SORTINGS.get(sorting, REVIEW_SORTINGS['newest'])
+    reviews = Rating.objects.filter(tutor_id=tutor_pk).select_related(
+        'user').only('score', 'comment', 'tutor_id', 'user__username')
+    # A window of one page only looks up whether a next page exists
+    return KeysetPaginator(reviews, ordering, per_page, window=1).get_page(
+        cursor)
+
+
+def next_page_url(tutor_pk: int, page, sorting: str = 'newest'):
+    """
+    Returns the API URL of the page after a review page, or None.
+    """
+    if not page.has_next():
+        return None
+    return '{}?{}'.format(
+        reverse('tutor_reviews_api', args=[tutor_pk]),
+        urlencode({'sorting': sorting, 'cursor': page.next_cursor}))
+
+
+def serialize_review(review, user) -> dict:
+    """
+    Serializes a review for the reviews API.
+
+    Args:
+        review (Rating): The review, with its user loaded.
+        user (User): The requesting user.
+
+    Returns:
+        dict: The JSON serializable review.
+    """
+    return {
+        'id': review.pk,
+        'user': str(review.user),
+        'own': review.user_id == user.pk,
+        'score': review.score,
+        'comment': review.comment,
+    }
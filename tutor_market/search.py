@@ -0,0 +1,227 @@
+"""
+Full-text search for the tutor marketplace.
+
+Every tutor has one denormalized TutorSearchDocument that is kept current by
+the signal handlers in tutor_market/signals.py. How the documents are queried
+depends on the database:
+
+- PostgreSQL: a weighted SearchVector stored on the document with a GIN
+  index, plus a pg_trgm GIN index on the keywords for typo tolerance.
+- SQLite (tests and local development): an FTS5 virtual table ranked with
+  bm25. Typo tolerance is limited to prefix matching.
+
+The indexes are created by migration 0027_tutorsearchdocument.
+"""
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+)
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+from tutor_market.models import Tutor, TutorSearchDocument
+from tutor_market.pagination import TUTOR_SORTINGS
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'tutor_market_tutorsearch_fts'
+# Relative weights of the title, keywords and body columns in FTS5's bm25.
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+# Upper bound of ranked matches considered on SQLite.
+FTS_RESULT_LIMIT = 1000
+
+
+def _tokenize(query: str) -> list:
+    """
+    Splits a search query into lower case word tokens.
+    """
+    return re.findall(r'\w+', query.lower())
+
+
+def normalize_query(query) -> str:
+    """
+    Returns the canonical form of a search query, e.g. for cache keys.
+
+    Only surrounding whitespace is removed. Case, quotes and operators
+    change the results of PostgreSQL's websearch syntax or the search box
+    of the rendered page.
+    """
+    return query.strip() if query else ''
+
+
+def is_search_query(query) -> bool:
+    """
+    Returns whether a search query contains any searchable words.
+    """
+    return bool(query) and bool(_tokenize(query))
+
+
+def _search_vector():
+    """
+    Returns the weighted search vector expression of a search document.
+    """
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('keywords', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('body', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+# Fields of Tutor the search document is built from, besides the subjects
+# and values.
+DOCUMENT_FIELDS = frozenset({'display_name', 'catch_phrase', 'description'})
+
+
+def build_document(tutor) -> dict:
+    """
+    Builds the search document fields of a tutor.
+
+    Args:
+        tutor (Tutor): The tutor to build the document for.
+
+    Returns:
+        dict: The title, keywords and body of the document.
+    """
+    names = [subject.name for subject in tutor.subjects.all()]
+    names += [value.name for value in tutor.values.all()]
+    return {
+        'title': tutor.display_name,
+        'keywords': ' '.join(names),
+        'body': f'{tutor.catch_phrase} {tutor.description}',
+    }
+
+
+def index_tutor(tutor_id: int):
+    """
+    Creates or updates the search document of a tutor.
+
+    Args:
+        tutor_id (int): The primary key of the tutor.
+    """
+    tutor = Tutor.objects.prefetch_related('subjects', 'values').filter(
+        pk=tutor_id).first()
+    if tutor is None:
+        remove_tutor(tutor_id)
+        return
+
+    document = build_document(tutor)
+    TutorSearchDocument.objects.update_or_create(
+        tutor_id=tutor_id, defaults=document)
+
+    if connection.vendor == 'postgresql':
+        TutorSearchDocument.objects.filter(tutor_id=tutor_id).update(
+            vector=_search_vector())
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [tutor_id])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, keywords, body) '
+                f'VALUES (%s, %s, %s, %s)',
+                [tutor_id, document['title'], document['keywords'],
+                 document['body']]
+            )
+
+
+def remove_tutor(tutor_id: int):
+    """
+    Removes the search document of a tutor.
+
+    Args:
+        tutor_id (int): The primary key of the tutor.
+    """
+    TutorSearchDocument.objects.filter(tutor_id=tutor_id).delete()
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [tutor_id])
+
+
+def rebuild_index() -> int:
+    """
+    Rebuilds the search documents of all tutors.
+
+    Returns:
+        int: The number of indexed tutors.
+    """
+    tutor_ids = list(Tutor.objects.values_list('pk', flat=True))
+    TutorSearchDocument.objects.exclude(tutor_id__in=tutor_ids).delete()
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    for tutor_id in tutor_ids:
+        index_tutor(tutor_id)
+    return len(tutor_ids)
+
+
+def _fts_ranks(tokens: list) -> dict:
+    """
+    Looks up matching tutors in the SQLite FTS5 table.
+
+    Every token has to match the start of a word in the document.
+
+    Returns:
+        dict: A mapping of tutor ids to their relevance (higher is better).
+    """
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s ORDER BY 2 LIMIT %s',
+            [match, FTS_RESULT_LIMIT]
+        )
+        # bm25 scores are negative, the best match has the lowest score.
+        return {tutor_id: -score for tutor_id, score in cursor.fetchall()}
+
+
+def search_tutors(queryset, query: str):
+    """
+    Filters a tutor queryset by a search query and ranks it by relevance.
+
+    Args:
+        queryset (QuerySet): The tutors to search.
+        query (str): The user's search query.
+
+    Returns:
+        QuerySet: The matching tutors annotated with `search_rank` and ordered
+        by it, best match first. Blank queries return the queryset unchanged.
+    """
+    tokens = _tokenize(query)
+    if not tokens:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(
+            query, search_type='websearch', config=SEARCH_CONFIG)
+        return queryset.annotate(
+            search_rank=SearchRank(F('search_document__vector'), search_query)
+            + TrigramWordSimilarity(query, 'search_document__keywords')
+        ).filter(
+            Q(search_document__vector=search_query)
+            | Q(search_document__keywords__trigram_word_similar=query)
+        ).order_by(*TUTOR_SORTINGS['relevance'])
+
+    if connection.vendor == 'sqlite':
+        ranks = _fts_ranks(tokens)
+        if not ranks:
+            return queryset.none().annotate(
+                search_rank=Value(0.0, output_field=FloatField()))
+        return queryset.filter(pk__in=ranks).annotate(
+            search_rank=Case(
+                *[When(pk=tutor_id, then=Value(rank))
+                  for tutor_id, rank in ranks.items()],
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        ).order_by(*TUTOR_SORTINGS['relevance'])
+
+    matches = Q()
+    for token in tokens:
+        matches &= (
+            Q(search_document__title__icontains=token)
+            | Q(search_document__keywords__icontains=token)
+            | Q(search_document__body__icontains=token)
+        )
+    return queryset.filter(matches).annotate(
+        search_rank=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,229 @@
+import threading
+
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from tutor_market import memory_index, search
+from tutor_market.caching import invalidate
+from tutor_market.cards import card_tag
+from tutor_market.models import Rating, Subject, Tutor, Value
+
+# Fields of Tutor that no page, card or API response shows. Saves that only
+# write these keep the cached data.
+UNDISPLAYED_FIELDS = frozenset({
+    'iban', 'calendly_personal_token', 'calendly_access_token',
+    'calendly_refresh_token', 'calendly_token_expires_at',
+    'calendly_user_uri', 'calendly_sync_cursor', 'calendly_token_checked_at',
+    'calendly_refresh_failures', 'calendly_refresh_retry_at',
+})
+
+
+def _writes_any(update_fields, fields) -> bool:
+    """
+    Returns whether a save may have changed any of `fields`. Saves without
+    update_fields, deletes and relation changes write every field.
+    """
+    return update_fields is None or not fields.isdisjoint(update_fields)
+
+
+def _writes_displayed(update_fields) -> bool:
+    """Returns whether a save may have changed what pages show."""
+    return update_fields is None or not UNDISPLAYED_FIELDS.issuperset(
+        update_fields)
+
+
+# The rating deletion in progress in a thread: its origin, the ratings not
+# deleted yet and their tutors.
+_deletion = threading.local()
+
+
+@receiver(pre_delete, sender=Rating)
+def collect_deleted_rating(sender, instance, origin=None, **kwargs):
+    """
+    Collects the tutor of a rating about to be deleted.
+
+    A delete sends pre_delete for all its ratings before any post_delete,
+    so the statistics can be refreshed once the last rating is gone. A
+    delete with another origin starts over, e.g. after a failed delete.
+    """
+    if getattr(_deletion, 'origin', None) is not origin:
+        _deletion.origin = origin
+        _deletion.rating_ids = set()
+        _deletion.tutor_ids = set()
+    _deletion.rating_ids.add(instance.pk)
+    _deletion.tutor_ids.add(instance.tutor_id)
+
+
+@receiver(post_delete, sender=Rating)
+def refresh_rating_stats_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Refreshes the rating statistics of the tutors whose ratings were
+    deleted, inside the deleting transaction.
+
+    Queryset and cascading deletes send the signal for every rating, so
+    the tutors are refreshed together after the delete's last rating, with
+    one grouped aggregate however many ratings were deleted.
+    """
+    if getattr(_deletion, 'origin', None) is not origin:
+        # Not collected, e.g. interleaved with another delete
+        tutor_ids = {instance.tutor_id}
+    else:
+        _deletion.rating_ids.discard(instance.pk)
+        if _deletion.rating_ids:
+            return
+        tutor_ids = _deletion.tutor_ids
+        del _deletion.origin
+    # Tutors deleted along with their ratings are not found
+    Tutor.objects.filter(pk__in=tutor_ids).refresh_rating_stats()
+
+
+def _tutors_changed(tutor_ids):
+    """Updates the search documents, the cached cards and the in-process
+    indexes of tutors."""
+    tutor_ids = list(tutor_ids)
+    for tutor_id in tutor_ids:
+        search.index_tutor(tutor_id)
+    if tutor_ids:
+        invalidate(*[card_tag(tutor_id) for tutor_id in tutor_ids])
+    memory_index.publish_changes(tutor_ids)
+
+
+@receiver(post_save, sender=Tutor)
+def index_tutor_on_save(sender, instance, raw=False, update_fields=None,
+                        **kwargs):
+    """Updates the search document of a saved tutor."""
+    if raw or not _writes_any(update_fields, search.DOCUMENT_FIELDS):
+        return
+    search.index_tutor(instance.pk)
+
+
+@receiver(post_delete, sender=Tutor)
+def remove_tutor_from_index(sender, instance, **kwargs):
+    """Removes the search document of a deleted tutor."""
+    search.remove_tutor(instance.pk)
+
+
+@receiver(m2m_changed, sender=Tutor.subjects.through)
+@receiver(m2m_changed, sender=Tutor.values.through)
+def index_tutors_on_m2m_change(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    """
+    Updates the search documents and expires the cached cards of tutors
+    whose subjects or values changed.
+
+    Handles both directions of the relation: `tutor.subjects.add(...)` and
+    `subject.tutors.add(...)`. For a reverse clear the affected tutors are
+    collected before the clear and re-indexed after it.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _tutors_changed([instance.pk])
+        return
+
+    if action == 'pre_clear':
+        instance._search_cleared_tutor_ids = list(
+            instance.tutors.values_list('pk', flat=True))
+        return
+
+    if action in ('post_add', 'post_remove'):
+        tutor_ids = pk_set or []
+    elif action == 'post_clear':
+        tutor_ids = getattr(instance, '_search_cleared_tutor_ids', [])
+    else:
+        return
+
+    _tutors_changed(tutor_ids)
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=Value)
+def index_tutors_on_tag_rename(sender, instance, created, raw=False,
+                               **kwargs):
+    """Updates the search documents and cards of tutors when a subject or
+    value is renamed."""
+    if created or raw:
+        return
+    _tutors_changed(instance.tutors.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Subject)
+@receiver(pre_delete, sender=Value)
+def collect_tutors_on_tag_delete(sender, instance, **kwargs):
+    """Remembers the tutors of a subject or value that is being deleted."""
+    instance._search_deleted_tutor_ids = list(
+        instance.tutors.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=Value)
+def index_tutors_on_tag_delete(sender, instance, **kwargs):
+    """Updates the search documents and cards of tutors of a deleted subject
+    or value."""
+    _tutors_changed(getattr(instance, '_search_deleted_tutor_ids', []))
+
+
+@receiver(post_save, sender=Tutor)
+@receiver(post_delete, sender=Tutor)
+@receiver(m2m_changed, sender=Tutor.subjects.through)
+@receiver(m2m_changed, sender=Tutor.values.through)
+def invalidate_tutor_cache(sender, **kwargs):
+    """Expires cached data depending on tutors, e.g. the facet counts."""
+    if (kwargs.get('action', 'post_').startswith('post_')
+            and _writes_displayed(kwargs.get('update_fields'))):
+        invalidate('tutor')
+
+
+@receiver(post_save, sender=Tutor)
+@receiver(post_delete, sender=Tutor)
+def invalidate_tutor_card(sender, instance, update_fields=None, **kwargs):
+    """Expires the cached card of a saved or deleted tutor."""
+    if _writes_displayed(update_fields):
+        invalidate(card_tag(instance.pk))
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def invalidate_rated_tutor_card(sender, instance, **kwargs):
+    """Expires the cached card of a tutor whose ratings changed, e.g. to
+    show the new average."""
+    invalidate(card_tag(instance.tutor_id))
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def invalidate_rating_cache(sender, **kwargs):
+    """Expires cached data depending on ratings, e.g. tutor list pages."""
+    invalidate('rating')
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_subject_cache(sender, **kwargs):
+    """Expires cached data depending on subjects."""
+    invalidate('subject')
+
+
+@receiver(post_save, sender=Value)
+@receiver(post_delete, sender=Value)
+def invalidate_value_cache(sender, **kwargs):
+    """Expires cached data depending on teaching values."""
+    invalidate('value')
+
+
+@receiver(post_save, sender=Tutor)
+@receiver(post_delete, sender=Tutor)
+def publish_tutor_index_change(sender, instance, update_fields=None,
+                               **kwargs):
+    """Updates a saved or deleted tutor in the in-process indexes."""
+    if _writes_any(update_fields, memory_index.INDEXED_FIELDS):
+        memory_index.publish_changes([instance.pk])
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def publish_rating_index_change(sender, instance, **kwargs):
+    """Updates the rating statistics of a tutor in the in-process
+    indexes."""
+    memory_index.publish_changes([instance.tutor_id])
@@ -29,6 +29,7 @@ $('document').ready(function () {
     const calendlyEventUrl = tutorDetailData.calendly_event_url;
     const user = tutorDetailData.user;
     const email = tutorDetailData.email;
+    const userPk = tutorDetailData.user_pk;
 
     const calendlyDiv = document.getElementById('calendly');
 
@@ -43,7 +44,73 @@ $('document').ready(function () {
             name: user,
             email: email,
         },
-        utm: {},
+        // Identifies the student in the Calendly webhooks
+        utm: {
+            utmContent: userPk,
+        },
         resize: true,
     });
-});
\ No newline at end of file
+});
+/**
+ * Appends a review from the reviews API to the review list.
+ * @param {Object} review - The serialized review.
+ */
+function appendReview(review) {
+    const item = document.createElement('li');
+    item.className = 'list-group-item ps-0';
+    item.innerHTML = `
+        <div class="d-flex align-items-center gap-3">
+            <div>
+                <span class="badge bg-secondary text-dark">
+                    <i class="fa-regular fa-user"></i> <span class="review-user"></span>
+                </span>
+                <i class="fas fa-star"></i> <span class="review-score"></span>
+                <p class="review-comment"></p>
+            </div>
+        </div>`;
+    // Text from users is only ever set as text
+    item.querySelector('.review-user').textContent = review.own ? `${review.user} (you)` : review.user;
+    item.querySelector('.review-score').textContent = review.score;
+    item.querySelector('.review-comment').textContent = review.comment;
+    document.getElementById('review-list').appendChild(item);
+}
+
+// Loads the following pages of reviews on demand
+$('document').ready(function () {
+    const moreButton = document.getElementById('more-reviews');
+
+    if (!moreButton) {
+        return;
+    }
+
+    moreButton.addEventListener('click', function () {
+        moreButton.disabled = true;
+        fetch(moreButton.dataset.url, {headers: {Accept: 'application/json'}})
+            .then((response) => response.json())
+            .then((data) => {
+                data.results.forEach(appendReview);
+                if (data.next) {
+                    moreButton.dataset.url = data.next;
+                    moreButton.disabled = false;
+                } else {
+                    moreButton.remove();
+                }
+            })
+            .catch(() => {
+                moreButton.disabled = false;
+            });
+    });
+});
+
+// The review list is shared by all visitors, mark the visitor's own review
+$('document').ready(function () {
+    const userPk = JSON.parse(document.getElementById('tutor-detail-data').textContent).user_pk;
+
+    if (!userPk) {
+        return;
+    }
+
+    document.querySelectorAll(`[data-review-user="${userPk}"] .badge`).forEach((badge) => {
+        badge.append(' (you)');
+    });
+});
@@ -1,8 +1,16 @@
 const radio_btns = document.querySelectorAll('.btn-check');
 const form = document.querySelector('form');
+const searchInput = document.querySelector('input[name="q"]');
 
 radio_btns.forEach((btn) => {
     btn.addEventListener('click', () => {
         form.submit();
     });
-});
\ No newline at end of file
+});
+
+// A new search is ranked by relevance, so drop the previous sorting.
+searchInput.addEventListener('input', () => {
+    document.querySelectorAll('.sorting-badge').forEach((badge) => {
+        badge.checked = false;
+    });
+});
@@ -0,0 +1,21 @@
+from django import template
+
+from tutor_market.cards import render_tutor_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def tutor_card(tutor, page=None):
+    """
+    Renders the card of a tutor from the card cache, see
+    tutor_market/cards.py.
+
+    Args:
+        tutor (Tutor): The tutor to render.
+        page (str): The page the card is shown on, e.g. 'tutor_detail'.
+
+    Returns:
+        str: The rendered card.
+    """
+    return render_tutor_cards([tutor], page)[0]
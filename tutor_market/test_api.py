@@ -0,0 +1,144 @@
+import json
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from tutor_market.models import Rating, Subject, Tutor
+from tutor_market.pagination import encode_cursor
+from tutor_market.testing import create_tutor
+
+
+class TutorApiTestCases(TestCase):
+    """Test cases for the JSON tutor API."""
+
+    def setUp(self):
+        """Create active tutors with subjects and an inactive tutor."""
+        cache.clear()
+        self.url = reverse('tutor_api')
+        self.math = Subject.objects.create(name='Math')
+        self.science = Subject.objects.create(name='Science')
+        self.reviewer = User.objects.create_user(
+            username='reviewer', password='test_password')
+        self.tutors = [
+            create_tutor(f'tutor_{i}',
+                         [self.math] if i % 2 else [self.science],
+                         display_name=f'Tutor {i}',
+                         hourly_rate=Decimal(40 - i))
+            for i in range(5)
+        ]
+        create_tutor('tutor_5', [self.math], display_name='Tutor 5',
+                     hourly_rate=Decimal(35), profile_status=False)
+
+    def test_filters_sorting_and_cursor_pagination(self):
+        response = self.client.get(self.url, {
+            'subject': self.math.pk, 'sorting': 'cheapest', 'limit': 1,
+            'fields': 'id,hourly_rate,subjects'})
+        data = response.json()
+        self.assertEqual(data['results'], [{
+            'id': self.tutors[3].pk, 'hourly_rate': '37.00',
+            'subjects': ['Math']}])
+        self.assertIsNone(data['previous'])
+
+        data = self.client.get(self.url, {
+            'subject': self.math.pk, 'sorting': 'cheapest', 'limit': 1,
+            'fields': 'id', 'cursor': data['next']}).json()
+        self.assertEqual(data['results'], [{'id': self.tutors[1].pk}])
+        self.assertIsNone(data['next'])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(self.url, {'fields': 'id,iban'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursors_are_rejected(self):
+        for cursor in ('garbage', encode_cursor(['abc', 1], 'next', 2)):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    self.url, {'sorting': 'cheapest', 'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'Invalid cursor.'})
+
+    def test_etag_skips_unchanged_responses(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Rating.objects.create(
+            tutor=self.tutors[0], user=self.reviewer, score=5,
+            comment='Good.')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['rating_average'], 5)
+
+    def test_etag_depends_on_the_search_syntax(self):
+        etags = {self.client.get(self.url, {'q': query})['ETag']
+                 for query in ('math physics', 'math -physics',
+                               '"math physics"')}
+        self.assertEqual(len(etags), 3)
+
+    def test_ndjson_export_streams_all_matches(self):
+        response = self.client.get(
+            self.url, {'format': 'ndjson', 'fields': 'id,subjects',
+                       'sorting': 'most-expensive'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)['id'] for line in lines],
+            [tutor.pk for tutor in self.tutors])
+
+
+class TutorReviewsApiTestCases(TestCase):
+    """Test cases for the paginated reviews API."""
+
+    def setUp(self):
+        """Create a tutor with 25 reviews by different users."""
+        self.tutor = create_tutor('tutor', display_name='Tutor')
+        self.reviews = [
+            Rating.objects.create(
+                tutor=self.tutor,
+                user=User.objects.create_user(
+                    username=f'reviewer_{i}', password='test_password'),
+                score=i % 5 + 1, comment=f'Review {i}')
+            for i in range(25)
+        ]
+        self.url = reverse('tutor_reviews_api', args=[self.tutor.pk])
+
+    def test_pages_preload_their_reviewers(self):
+        # tutor, reviews with their users, and the next page's first key
+        with self.assertNumQueries(3):
+            data = self.client.get(self.url).json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual(data['results'][0], {
+            'id': self.reviews[-1].pk, 'user': 'reviewer_24', 'own': False,
+            'score': 5, 'comment': 'Review 24'})
+
+        seen = [review['id'] for review in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            seen += [review['id'] for review in data['results']]
+        self.assertEqual(seen, [review.pk for review in self.reviews][::-1])
+
+    def test_sorting_by_score(self):
+        data = self.client.get(self.url, {'sorting': 'lowest-score'}).json()
+        self.assertEqual({review['score'] for review in data['results']},
+                         {1, 2})
+        self.assertIn('sorting=lowest-score', data['next'])
+        data = self.client.get(self.url, {'sorting': 'highest-score'}).json()
+        self.assertEqual(data['results'][0]['score'], 5)
+
+    def test_own_reviews_are_marked(self):
+        self.client.force_login(self.reviews[-1].user)
+        data = self.client.get(self.url).json()
+        self.assertTrue(data['results'][0]['own'])
+        self.assertFalse(data['results'][1]['own'])
+
+    def test_inactive_tutors_are_not_found(self):
+        Tutor.objects.filter(pk=self.tutor.pk).update(profile_status=False)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
@@ -0,0 +1,288 @@
+import tempfile
+from io import StringIO
+from urllib.parse import urlencode
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from tutor_market.caching import get_versions, list_page_key
+from tutor_market.cards import render_tutor_cards
+from tutor_market.checks import check_shared_cache
+from tutor_market.models import Rating, Subject, Tutor
+from tutor_market.testing import create_tutor
+
+
+@override_settings(TUTOR_LIST_CACHE_TIMEOUT=60)
+class TutorListCacheTestCases(TestCase):
+    """Test cases for the cache of anonymous tutor list pages."""
+
+    def setUp(self):
+        """Create a tutor with a subject."""
+        cache.clear()
+        self.math = Subject.objects.create(name='Math')
+        self.tutor = create_tutor('tutor', [self.math], display_name='Tutor')
+        self.user = self.tutor.user
+        self.url = reverse('tutor_list')
+
+    def test_equivalent_parameters_share_a_key(self):
+        first = list_page_key(QueryDict('subject=Math&subject=2&q=tutor+'))
+        second = list_page_key(QueryDict('q=tutor&subject=2&subject=math'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(
+            first, list_page_key(QueryDict('subject=2&q=tutor')))
+        self.assertIsNone(list_page_key(QueryDict('utm_source=mail')))
+
+    def test_search_syntax_is_part_of_the_key(self):
+        queries = ['math physics', 'math -physics', '"math physics"',
+                   'Math physics']
+        keys = {list_page_key(QueryDict(urlencode({'q': query})))
+                for query in queries}
+        self.assertEqual(len(keys), len(queries))
+
+    def test_anonymous_pages_are_cached(self):
+        self.client.get(self.url, {'sorting': 'cheapest'})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'sorting': 'cheapest'})
+        self.assertContains(response, 'Tutor')
+
+    def test_logged_in_users_bypass_the_cache(self):
+        self.client.get(self.url)
+        self.client.login(username='tutor', password='test_password')
+        response = self.client.get(self.url)
+        self.assertIsNotNone(response.context)
+
+    def test_writes_invalidate_pages(self):
+        for tag, change in (
+            ('tutor', lambda: Tutor.objects.get().save()),
+            ('subject', lambda: self.math.save()),
+            ('rating', lambda: Rating.objects.create(
+                tutor=self.tutor, user=self.user, score=5, comment='Good.')),
+        ):
+            before = get_versions(tag)
+            change()
+            self.assertNotEqual(before, get_versions(tag), tag)
+
+        self.client.get(self.url)
+        self.tutor.display_name = 'Renamed Tutor'
+        self.tutor.save()
+        self.assertContains(self.client.get(self.url), 'Renamed Tutor')
+
+    def test_unchanged_dashboard_visits_keep_the_cache(self):
+        self.client.login(username='tutor', password='test_password')
+        url = reverse('dashboard', kwargs={'pk': self.user.pk})
+        # Without Calendly the first visit deactivates the profile
+        before = get_versions('tutor')
+        self.client.get(url)
+        self.assertNotEqual(before, get_versions('tutor'))
+        self.tutor.refresh_from_db()
+        self.assertFalse(self.tutor.profile_status)
+
+        tags = ('tutor', f'card:{self.tutor.pk}')
+        before = get_versions(*tags)
+        self.client.get(url)
+        self.assertEqual(before, get_versions(*tags))
+
+    def test_undisplayed_fields_keep_the_cache(self):
+        tags = ('tutor', f'card:{self.tutor.pk}')
+        before = get_versions(*tags)
+        self.tutor.calendly_access_token = 'access'
+        self.tutor.save(update_fields=['calendly_access_token'])
+        self.assertEqual(before, get_versions(*tags))
+        self.tutor.hourly_rate = Decimal('45.00')
+        self.tutor.save(update_fields=['hourly_rate'])
+        self.assertNotEqual(before, get_versions(*tags))
+
+    def test_warmer_renders_first_pages(self):
+        # The file based cache is shared between processes
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(CACHES={'default': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }}):
+                out = StringIO()
+                call_command('warm_tutor_list_cache', stdout=out)
+                with self.assertNumQueries(0):
+                    response = self.client.get(self.url)
+                with self.assertNumQueries(0):
+                    self.client.get(self.url, {'sorting': 'name'})
+                with self.assertNumQueries(0):
+                    self.client.get(self.url, {'sorting': 'highest-rated'})
+        # The default sorting is rendered once
+        self.assertIn('Warmed 5 tutor list pages.', out.getvalue())
+        self.assertContains(response, 'cta-tutor-list-active')
+
+    def test_process_local_caches_are_refused(self):
+        with self.assertRaises(CommandError):
+            call_command('warm_tutor_list_cache', stdout=StringIO())
+        self.assertEqual(
+            [warning.id for warning in check_shared_cache(None)],
+            ['tutor_market.W001'])
+        with override_settings(TUTOR_LIST_CACHE_TIMEOUT=0):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class TutorCardCacheTestCases(TestCase):
+    """Test cases for the cached tutor cards."""
+
+    def setUp(self):
+        """Create a tutor with a subject and a reviewer."""
+        cache.clear()
+        self.math = Subject.objects.create(name='Math')
+        self.reviewer = User.objects.create_user(
+            username='reviewer', password='test_password')
+        self.tutor = create_tutor('tutor', [self.math], display_name='Tutor')
+
+    def _card(self):
+        return render_tutor_cards([Tutor.objects.get()])[0]
+
+    def test_unchanged_cards_are_not_rendered_again(self):
+        tutors = list(Tutor.objects.all())
+        with self.assertNumQueries(2):
+            first = render_tutor_cards(tutors)
+        with self.assertNumQueries(0):
+            second = render_tutor_cards(tutors)
+        self.assertEqual(first, second)
+        self.assertIn('Math', first[0])
+
+    def test_changes_render_the_card_again(self):
+        self.assertIn('Math', self._card())
+        self.math.name = 'Algebra'
+        self.math.save()
+        self.assertIn('Algebra', self._card())
+
+        Rating.objects.create(
+            tutor=self.tutor, user=self.reviewer, score=4, comment='Good.')
+        self.assertIn('4.0', self._card())
+
+        self.tutor.values.create(name='Patience')
+        self.assertIn('Patience', self._card())
+
+    def test_list_reuses_cached_cards(self):
+        self.client.get(reverse('tutor_list'))
+        # The tutors of the page; subjects, values and facets are cached
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tutor_list'))
+        self.assertContains(response, 'Math')
+
+
+@override_settings(TUTOR_PROFILE_CACHE_TIMEOUT=60)
+class TutorProfileCacheTestCases(TestCase):
+    """Test cases for the cache and conditional GETs of tutor pages."""
+
+    def setUp(self):
+        """Create a tutor with a subject and a reviewer."""
+        cache.clear()
+        self.math = Subject.objects.create(name='Math')
+        self.reviewer = User.objects.create_user(
+            username='reviewer', password='test_password')
+        self.tutor = create_tutor('tutor', [self.math], display_name='Tutor',
+                                  testing_profile=True)
+        self.url = reverse('tutor_detail', args=[self.tutor.pk])
+
+    def test_anonymous_pages_are_cached(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.content, first.content)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response['Last-Modified'], first['Last-Modified'])
+        self.assertIn('Cookie', response['Vary'])
+        self.assertIn('must-revalidate', response['Cache-Control'])
+
+    def test_conditional_requests_get_304(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_the_page(self):
+        for change in (
+            lambda: Tutor.objects.get().save(),
+            lambda: self.tutor.subjects.add(
+                Subject.objects.create(name='Physics')),
+            lambda: self.math.save(),
+            lambda: Rating.objects.create(
+                tutor=self.tutor, user=self.reviewer, score=5,
+                comment='Good.'),
+        ):
+            etag = self.client.get(self.url)['ETag']
+            change()
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Good.')
+
+    def test_logged_in_users_bypass_the_cache(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.login(username='reviewer', password='test_password')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.context)
+        self.assertNotIn('ETag', response)
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_pending_messages_bypass_the_cache(self):
+        self.client.get(self.url)
+        # Anonymous reviews are refused with a message
+        self.client.post(self.url, {'score': 5, 'comment': 'Good.'})
+        response = self.client.get(self.url)
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, 'You must be logged in')
+        self.assertNotIn('ETag', response)
+
+
+class TutorProfileFragmentTestCases(TestCase):
+    """Test cases for the shared fragments of tutor pages."""
+
+    def setUp(self):
+        """Create a tutor with a review and two logged in students."""
+        cache.clear()
+        self.tutor = create_tutor(
+            'tutor', [Subject.objects.create(name='Math')],
+            display_name='Tutor', testing_profile=True)
+        self.reviewer = User.objects.create_user(
+            username='reviewer', password='test_password')
+        self.student = User.objects.create_user(
+            username='student', password='test_password')
+        Rating.objects.create(tutor=self.tutor, user=self.reviewer, score=4,
+                              comment='Patient and clear.')
+        self.url = reverse('tutor_detail', args=[self.tutor.pk])
+
+    def test_logged_in_visitors_share_the_fragments(self):
+        self.client.force_login(self.reviewer)
+        response = self.client.get(self.url)
+        self.assertTrue(response.context['existing_review'])
+        self.assertContains(response, 'Change your review')
+
+        self.client.force_login(self.student)
+        # session, user, tutor with the student's review state and the
+        # student's upcoming sessions
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertTemplateNotUsed(
+            response, 'tutor_market/includes/tutor_reviews.html')
+        self.assertContains(response, 'Patient and clear.')
+        self.assertContains(response, 'Leave a review:')
+        self.assertFalse(response.context['existing_review'])
+        # The cached profile holds the rating histogram
+        self.assertContains(response, 'style="width: 100.0%"')
+
+    def test_changes_render_the_fragments_again(self):
+        self.client.force_login(self.student)
+        self.client.get(self.url)
+        Rating.objects.create(tutor=self.tutor, user=self.student, score=5,
+                              comment='Great lessons.')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Great lessons.')
+        self.assertContains(response, 'Change your review')
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+
+from tutor_market.facets import get_facets
+from tutor_market.filters import TutorFilter
+from tutor_market.models import Subject, Tutor, Value
+from tutor_market.search import normalize_query
+from tutor_market.testing import create_tutor
+
+
+class TutorFacetTestCases(TestCase):
+    """Test cases for the subject and teaching value facet counts."""
+
+    def setUp(self):
+        """Create active and inactive tutors with overlapping tags."""
+        cache.clear()
+        self.math = Subject.objects.create(name='Math')
+        self.science = Subject.objects.create(name='Science')
+        self.history = Subject.objects.create(name='History')
+        self.self_learning = Value.objects.create(name='Self-Learning')
+        self.urgency = Value.objects.create(name='Urgency')
+
+        create_tutor('both', [self.math, self.science], [self.self_learning])
+        create_tutor('math', [self.math], [self.urgency])
+        create_tutor('inactive', [self.history], [self.urgency],
+                     profile_status=False)
+
+    def _counts(self, query_string=''):
+        tutor_filter = TutorFilter.from_query_params(QueryDict(query_string))
+        facets = get_facets(
+            Tutor.objects.filter(profile_status=True), tutor_filter)
+        return {
+            facet['name']: facet['count']
+            for facet in facets['subjects'] + facets['values']
+        }
+
+    def test_counts_active_tutors(self):
+        self.assertEqual(self._counts(), {
+            'History': 0, 'Math': 2, 'Science': 1,
+            'Self-Learning': 1, 'Urgency': 1,
+        })
+
+    def test_selection_narrows_the_other_facet(self):
+        counts = self._counts(f'teachingvalue={self.urgency.pk}')
+        self.assertEqual(counts['Math'], 1)
+        self.assertEqual(counts['Science'], 0)
+        # Values are alternatives, so their counts ignore the own selection
+        self.assertEqual(counts['Self-Learning'], 1)
+
+    def test_match_all_counts_current_results(self):
+        counts = self._counts(f'subject={self.science.pk}&match=all')
+        self.assertEqual(counts['Math'], 1)
+        self.assertEqual(counts['Urgency'], 0)
+
+    def test_single_query_and_cached(self):
+        tutor_filter = TutorFilter()
+        base = Tutor.objects.filter(profile_status=True)
+        with self.assertNumQueries(1):
+            get_facets(base, tutor_filter)
+        with self.assertNumQueries(0):
+            get_facets(base, tutor_filter)
+
+    def test_search_syntax_has_its_own_entry(self):
+        tutor_filter = TutorFilter()
+        base = Tutor.objects.filter(profile_status=True)
+        get_facets(base, tutor_filter, normalize_query('math physics'))
+        with self.assertNumQueries(1):
+            get_facets(base, tutor_filter, normalize_query('math -physics'))
+
+    def test_changes_invalidate_the_cache(self):
+        self.assertEqual(self._counts()['History'], 0)
+        create_tutor('historian', [self.history], [])
+        self.assertEqual(self._counts()['History'], 1)
+        self.history.name = 'World History'
+        self.history.save()
+        self.assertIn('World History', self._counts())
+
+    def test_list_view_shows_counts(self):
+        response = self.client.get(reverse('tutor_list'))
+        self.assertContains(response, f'value="{self.math.pk}"')
+        self.assertContains(
+            response, '<span class="badge text-bg-light">2</span>', html=True)
+
+    def test_facets_follow_the_search(self):
+        response = self.client.get(reverse('tutor_list'), {'q': 'zzzz'})
+        counts = {facet['name']: facet['count']
+                  for facet in response.context['facets']['subjects']}
+        self.assertEqual(counts['Math'], 0)
+        response = self.client.get(reverse('tutor_list'), {'q': 'math'})
+        counts = {facet['name']: facet['count']
+                  for facet in response.context['facets']['subjects']}
+        self.assertEqual(counts['Math'], 2)
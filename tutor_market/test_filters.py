@@ -0,0 +1,85 @@
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from tutor_market.filters import TutorFilter
+from tutor_market.models import Subject, Tutor, Value
+from tutor_market.testing import create_tutor
+
+
+class TutorFilterTestCases(TestCase):
+    """Test cases for the subject and teaching value filters."""
+
+    def setUp(self):
+        """Create tutors with overlapping subjects and values."""
+        self.math = Subject.objects.create(name='Math')
+        self.science = Subject.objects.create(name='Science')
+        self.self_learning = Value.objects.create(name='Self-Learning')
+        self.urgency = Value.objects.create(name='Urgency')
+
+        self.both = create_tutor('both', [self.math, self.science],
+                                 [self.self_learning])
+        self.math_only = create_tutor('math', [self.math], [self.urgency])
+        self.none = create_tutor('none')
+
+    def _filter(self, query_string):
+        tutor_filter = TutorFilter.from_query_params(QueryDict(query_string))
+        return set(tutor_filter.apply(Tutor.objects.all()))
+
+    def test_filter_by_ids(self):
+        """Test filtering by subject and value ids."""
+        self.assertEqual(self._filter(f'subject={self.science.pk}'),
+                         {self.both})
+        self.assertEqual(self._filter(f'teachingvalue={self.urgency.pk}'),
+                         {self.math_only})
+
+    def test_names_and_slugs_are_aliases(self):
+        """Test that names, partial names and slugs still work."""
+        self.assertEqual(self._filter('subject=math'),
+                         {self.both, self.math_only})
+        self.assertEqual(self._filter('subject=Scien'), {self.both})
+        self.assertEqual(self._filter('teachingvalue=self-learning'),
+                         {self.both})
+
+    def test_any_and_all_semantics(self):
+        """Test OR semantics by default and AND semantics on request."""
+        query = f'subject={self.math.pk}&subject={self.science.pk}'
+        self.assertEqual(self._filter(query), {self.both, self.math_only})
+        self.assertEqual(self._filter(f'{query}&match=all'), {self.both})
+
+    def test_subjects_and_values_combine_with_and(self):
+        """Test that subject and value filters both have to match."""
+        self.assertEqual(
+            self._filter(f'subject={self.math.pk}'
+                         f'&teachingvalue={self.urgency.pk}'),
+            {self.math_only})
+
+    def test_unknown_names_match_nothing(self):
+        """Test that an unknown name does not widen the results."""
+        self.assertEqual(self._filter('subject=astrology'), set())
+        self.assertEqual(self._filter('subject=astrology&subject=science'),
+                         {self.both})
+
+    def test_normalized_ignores_parameter_order(self):
+        """Test that equivalent filters normalize to the same key."""
+        first = TutorFilter.from_query_params(QueryDict(
+            f'subject={self.math.pk}&subject={self.science.pk}'))
+        second = TutorFilter.from_query_params(QueryDict(
+            f'subject=science&subject={self.math.pk}'))
+        self.assertEqual(first.normalized(), second.normalized())
+
+    def test_no_joins_or_distinct(self):
+        """Test that the list view filters without DISTINCT or M2M joins."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('tutor_list'), {
+                'subject': [self.math.pk, self.science.pk],
+                'teachingvalue': self.self_learning.pk,
+            })
+        self.assertEqual(list(response.context['page_obj']), [self.both])
+        tutor_query = next(
+            query['sql'] for query in context.captured_queries
+            if 'EXISTS' in query['sql'] and 'UNION' not in query['sql'])
+        self.assertNotIn('DISTINCT', tutor_query)
+        self.assertNotIn('JOIN', tutor_query)
@@ -0,0 +1,50 @@
+from django.db import IntegrityError
+from django.db.models import Q
+from django.test import TestCase
+
+from tutor_market.models import Message, Rating
+from tutor_market.testing import IndexTestMixin
+
+MESSAGES_PER_DIRECTION = 3
+
+
+class MessagingIndexTestCases(IndexTestMixin, TestCase):
+    """
+    Test cases asserting that the hot message and rating queries use their
+    indexes on a seeded dataset of 6000 messages and 1000 ratings.
+    """
+
+    @classmethod
+    def seed(cls):
+        Message.objects.bulk_create(
+            Message(sender=sender, recipient=recipient, content='Hello')
+            for tutor in cls.tutors for student in cls.students
+            for sender, recipient in [(student, tutor.user),
+                                      (tutor.user, student)]
+            for _ in range(MESSAGES_PER_DIRECTION))
+        Rating.objects.bulk_create(
+            Rating(tutor=tutor, user=student, score=5, comment='Great.')
+            for tutor in cls.tutors for student in cls.students)
+
+    def test_conversation(self):
+        student, tutor_user = self.students[0], self.tutors[0].user
+        self.assertUsesIndex(Message.objects.filter(
+            (Q(sender=student) & Q(recipient=tutor_user))
+            | (Q(sender=tutor_user) & Q(recipient=student))
+        ).order_by('timestamp'), 'message_conversation')
+
+    def test_inbox(self):
+        self.assertUsesIndex(Message.objects.filter(
+            recipient=self.students[0]).order_by('-timestamp'),
+            'message_inbox')
+
+    def test_rating_of_a_student(self):
+        # SQLite names the index of a unique constraint itself
+        self.assertUsesIndex(
+            Rating.objects.filter(tutor=self.tutors[0], user=self.students[0]),
+            'unique_rating_tutor_user', 'sqlite_autoindex_tutor_market_rating')
+
+    def test_one_rating_per_student(self):
+        with self.assertRaises(IntegrityError):
+            Rating.objects.create(tutor=self.tutors[0], user=self.students[0],
+                                  score=1, comment='Again.')
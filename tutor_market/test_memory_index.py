@@ -0,0 +1,160 @@
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from tutor_market.filters import TutorFilter
+from tutor_market.memory_index import INDEX_SORTINGS, tutor_index
+from tutor_market.models import Rating, Subject, Tutor, Value
+from tutor_market.testing import create_tutor
+from tutor_market.pagination import (
+    InvalidCursor, KeysetPaginator, TUTOR_SORTINGS, encode_cursor
+)
+
+
+@override_settings(TUTOR_MEMORY_INDEX=True)
+class TutorIndexTestCases(TestCase):
+    """Test cases for the in-process tutor index."""
+
+    def setUp(self):
+        """Create tutors with tied rates and ratings and rebuild the
+        index."""
+        cache.clear()
+        self.math = Subject.objects.create(name='Math')
+        self.science = Subject.objects.create(name='Science')
+        self.patience = Value.objects.create(name='Patience')
+        reviewer = User.objects.create_user(
+            username='reviewer', password='test_password')
+
+        for i in range(15):
+            tutor = create_tutor(
+                f'tutor_{i}', [self.math] if i % 2 else [self.science],
+                display_name=f'Tutor {i % 7}',
+                hourly_rate=Decimal(30 + i % 4) + Decimal('0.50'),
+                profile_status=i != 3)
+            if i % 3:
+                tutor.values.add(self.patience)
+            if i % 5:
+                Rating.objects.create(
+                    tutor=tutor, user=reviewer, score=1 + i % 5,
+                    comment='Good.')
+        tutor_index.rebuild()
+
+    def _pages(self, get_page):
+        """Walks all pages forward and the first two back again."""
+        pages = []
+        page = get_page(None)
+        pages.append(page)
+        while page.has_next():
+            page = get_page(page.next_cursor)
+            pages.append(page)
+        while page.has_previous() and len(pages) < 8:
+            page = get_page(page.previous_cursor)
+            pages.append(page)
+        return [(page.number, list(page),
+                 [link['number'] for link in page.page_window])
+                for page in pages]
+
+    def test_pages_match_the_database(self):
+        for query_string in ('', f'subject={self.math.pk}',
+                             f'teachingvalue={self.patience.pk}'
+                             f'&subject={self.science.pk}&match=all'):
+            tutor_filter = TutorFilter.from_query_params(
+                QueryDict(query_string))
+            queryset = tutor_filter.apply(
+                Tutor.objects.filter(profile_status=True))
+            for sorting in INDEX_SORTINGS:
+                ordering = TUTOR_SORTINGS[sorting]
+                paginator = KeysetPaginator(queryset, ordering, 4)
+                expected = self._pages(paginator.get_page)
+                actual = self._pages(lambda cursor: tutor_index.get_page(
+                    tutor_filter, ordering, cursor, per_page=4))
+                self.assertEqual(actual, expected, (query_string, sorting))
+
+    def test_changes_are_replayed(self):
+        tutor = Tutor.objects.filter(profile_status=True).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            tutor.hourly_rate = Decimal('1.00')
+            tutor.save()
+        page = tutor_index.get_page(TutorFilter(), TUTOR_SORTINGS['cheapest'])
+        self.assertEqual(page[0], tutor)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tutor.subjects.clear()
+        page = tutor_index.get_page(
+            TutorFilter([{self.math.pk}, {self.science.pk}]),
+            TUTOR_SORTINGS['cheapest'])
+        self.assertNotIn(tutor, list(page))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tutor.profile_status = False
+            tutor.save()
+        page = tutor_index.get_page(
+            TutorFilter(), TUTOR_SORTINGS['cheapest'], per_page=20)
+        self.assertNotIn(tutor, list(page))
+
+    def test_cursors_of_the_database_are_rejected(self):
+        ordering = TUTOR_SORTINGS['name']
+        paginator = KeysetPaginator(
+            Tutor.objects.filter(profile_status=True), ordering, 4)
+        database_cursor = paginator.get_page(None).next_cursor
+        with self.assertRaises(InvalidCursor):
+            tutor_index.get_page(TutorFilter(), ordering, database_cursor,
+                                 per_page=4, strict=True)
+
+        index_cursor = tutor_index.get_page(
+            TutorFilter(), ordering, per_page=4).next_cursor
+        with self.assertRaises(InvalidCursor):
+            paginator.get_page(index_cursor, strict=True)
+        self.assertEqual(
+            tutor_index.get_page(TutorFilter(), ordering, index_cursor,
+                                 per_page=4).number, 2)
+
+    def test_tampered_cursor_returns_first_page(self):
+        first_page = tutor_index.get_page(
+            TutorFilter(), TUTOR_SORTINGS['cheapest'])
+        for values in (['abc', 1], [[1], {}], ['30.50', 'x']):
+            with self.subTest(values=values):
+                cursor = encode_cursor(values, 'next', 2)
+                page = tutor_index.get_page(
+                    TutorFilter(), TUTOR_SORTINGS['cheapest'], cursor)
+                self.assertEqual(list(page), list(first_page))
+                self.assertEqual(page.number, 1)
+                with self.assertRaises(InvalidCursor):
+                    tutor_index.get_page(
+                        TutorFilter(), TUTOR_SORTINGS['cheapest'], cursor,
+                        strict=True)
+
+    def test_stale_index_skips_inactive_tutors(self):
+        # Deactivated without publishing a change
+        tutor = Tutor.objects.filter(profile_status=True).first()
+        Tutor.objects.filter(pk=tutor.pk).update(profile_status=False)
+        page = tutor_index.get_page(
+            TutorFilter(), TUTOR_SORTINGS['cheapest'], per_page=20)
+        self.assertNotIn(tutor, list(page))
+
+    def test_old_indexes_are_rebuilt(self):
+        # Changed without publishing a change
+        tutor = Tutor.objects.filter(profile_status=True).order_by(
+            '-hourly_rate').first()
+        Tutor.objects.filter(pk=tutor.pk).update(hourly_rate=Decimal('1.00'))
+        page = tutor_index.get_page(TutorFilter(), TUTOR_SORTINGS['cheapest'])
+        self.assertNotEqual(page[0], tutor)
+        with mock.patch('tutor_market.memory_index.MAX_AGE', 0):
+            page = tutor_index.get_page(
+                TutorFilter(), TUTOR_SORTINGS['cheapest'])
+        self.assertEqual(page[0], tutor)
+
+    def test_list_view_loads_only_the_page(self):
+        params = {'subject': self.math.pk, 'sorting': 'cheapest'}
+        self.client.get(reverse('tutor_list'), params)
+        # Only the tutors of the page, the facets and cards are cached
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tutor_list'), params)
+        expected = list(Tutor.objects.filter(
+            profile_status=True, subjects=self.math).order_by(
+                *TUTOR_SORTINGS['cheapest'])[:6])
+        self.assertEqual(list(response.context['page_obj']), expected)
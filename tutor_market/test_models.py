@@ -0,0 +1,112 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+
+from tutor_market.models import Rating, Tutor
+from tutor_market.testing import create_tutor
+
+
+class TutorRatingStatsTestCases(TestCase):
+    """Test cases for the denormalized rating statistics on Tutor."""
+
+    def setUp(self):
+        """Create a tutor and two reviewers."""
+        self.user1 = User.objects.create_user(
+            username='user1', password='test_password')
+        self.user2 = User.objects.create_user(
+            username='user2', password='test_password')
+        self.tutor = create_tutor('tutor_user', display_name='Test Tutor')
+
+    def test_stats_updated_on_create(self):
+        """Test that creating ratings updates the stored statistics."""
+        Rating.objects.create(
+            tutor=self.tutor, user=self.user1, score=5, comment='Great!')
+        Rating.objects.create(
+            tutor=self.tutor, user=self.user2, score=2, comment='Meh.')
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.rating_count, 2)
+        self.assertEqual(self.tutor.rating_average, 3.5)
+        self.assertEqual(self.tutor.rating_histogram(),
+                         {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+
+    def test_stats_updated_on_update(self):
+        """Test that changing a score moves it in the histogram."""
+        rating = Rating.objects.create(
+            tutor=self.tutor, user=self.user1, score=5, comment='Great!')
+        rating.score = 3
+        rating.save()
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.rating_average, 3)
+        self.assertEqual(self.tutor.rating_count_5, 0)
+        self.assertEqual(self.tutor.rating_count_3, 1)
+
+    def test_stats_updated_on_delete(self):
+        """Test that deleting ratings, also in bulk, updates the stats."""
+        rating = Rating.objects.create(
+            tutor=self.tutor, user=self.user1, score=5, comment='Great!')
+        Rating.objects.create(
+            tutor=self.tutor, user=self.user2, score=1, comment='Bad.')
+        rating.delete()
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.rating_count, 1)
+        self.assertEqual(self.tutor.rating_average, 1)
+
+        Rating.objects.filter(tutor=self.tutor).delete()
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.rating_count, 0)
+        self.assertEqual(self.tutor.rating_average, 0)
+        self.assertEqual(self.tutor.rating_count_1, 0)
+
+    def test_bulk_deletes_refresh_each_tutor_once(self):
+        """Test that deleting many ratings refreshes a tutor's stats with a
+        constant number of queries."""
+        users = [User.objects.create_user(username=f'student_{i}')
+                 for i in range(10)]
+        for user in users:
+            Rating.objects.create(
+                tutor=self.tutor, user=user, score=4, comment='Good.')
+        Rating.objects.create(
+            tutor=self.tutor, user=self.user1, score=2, comment='Meh.')
+
+        # Collect, delete, and lock, aggregate and bulk update inside a
+        # savepoint
+        with self.assertNumQueries(7):
+            Rating.objects.filter(score=4).delete()
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.rating_count, 1)
+        self.assertEqual(self.tutor.rating_average, 2)
+        self.assertEqual(self.tutor.rating_count_4, 0)
+
+    def test_deletes_update_the_stats_in_their_transaction(self):
+        """Test that deleted ratings are reflected before the commit and
+        restored by a rollback."""
+        Rating.objects.create(
+            tutor=self.tutor, user=self.user1, score=5, comment='Great!')
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Rating.objects.all().delete()
+                self.tutor.refresh_from_db()
+                self.assertEqual(self.tutor.rating_count, 0)
+                raise RuntimeError
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.rating_count, 1)
+        self.assertEqual(self.tutor.rating_average, 5)
+
+    def test_rebuild_rating_stats_command(self):
+        """Test that the management command repairs drifted statistics."""
+        Rating.objects.create(
+            tutor=self.tutor, user=self.user1, score=4, comment='Good.')
+        Tutor.objects.filter(pk=self.tutor.pk).update(
+            rating_count=10, rating_average=1, rating_count_4=0)
+
+        out = StringIO()
+        call_command('rebuild_rating_stats', stdout=out)
+
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.rating_count, 1)
+        self.assertEqual(self.tutor.rating_average, 4)
+        self.assertEqual(self.tutor.rating_count_4, 1)
+        self.assertIn('Rebuilt rating statistics for 1 tutors.',
+                      out.getvalue())
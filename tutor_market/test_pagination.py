@@ -0,0 +1,143 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from tutor_market.models import Rating, Tutor
+from tutor_market.testing import create_tutor
+from tutor_market.pagination import (
+    InvalidCursor, KeysetPaginator, TUTOR_SORTINGS, decode_cursor,
+    encode_cursor
+)
+
+
+class KeysetPaginatorTestCases(TestCase):
+    """Test cases for the keyset pagination of the tutor list."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create tutors with duplicate rates and ratings to test the
+        tiebreaker."""
+        reviewer = User.objects.create_user(
+            username='reviewer', password='test_password')
+        for i in range(14):
+            tutor = create_tutor(f'tutor_{i}', display_name=f'Tutor {i:02d}',
+                                 hourly_rate=Decimal(20 + i % 4))
+            if i % 3:
+                Rating.objects.create(
+                    tutor=tutor, user=reviewer, score=1 + i % 5,
+                    comment='Review.')
+
+    def _walk(self, ordering, per_page=4):
+        """Follow the next cursors through all pages."""
+        queryset = Tutor.objects.all()
+        paginator = KeysetPaginator(queryset, ordering, per_page)
+        pages = [paginator.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return pages
+
+    def test_every_sorting_returns_each_tutor_once(self):
+        """Test that walking all pages matches the plain ordering."""
+        for sorting, ordering in TUTOR_SORTINGS.items():
+            if sorting == 'relevance':
+                continue
+            with self.subTest(sorting=sorting):
+                pages = self._walk(ordering)
+                walked = [tutor for page in pages for tutor in page]
+                expected = list(Tutor.objects.order_by(*ordering))
+                self.assertEqual(walked, expected)
+                self.assertEqual([page.number for page in pages],
+                                 [1, 2, 3, 4])
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Test that going back returns the same rows as going forward."""
+        ordering = TUTOR_SORTINGS['most-expensive']
+        pages = self._walk(ordering)
+        paginator = KeysetPaginator(Tutor.objects.all(), ordering, 4)
+        for i in range(len(pages) - 1, 0, -1):
+            previous_page = paginator.get_page(pages[i].previous_cursor)
+            self.assertEqual(list(previous_page), list(pages[i - 1]))
+            self.assertEqual(previous_page.number, pages[i - 1].number)
+        self.assertFalse(
+            paginator.get_page(pages[1].previous_cursor).has_previous())
+
+    def test_page_window(self):
+        """Test that the window links the previous and next two pages."""
+        pages = self._walk(TUTOR_SORTINGS['name'])
+        self.assertEqual(
+            [page['number'] for page in pages[0].page_window], [1, 2, 3])
+        self.assertEqual(
+            [page['number'] for page in pages[1].page_window], [1, 2, 3, 4])
+        self.assertEqual(
+            [page['number'] for page in pages[3].page_window], [3, 4])
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Test that broken and foreign cursors fall back to page one."""
+        paginator = KeysetPaginator(
+            Tutor.objects.all(), TUTOR_SORTINGS['name'], 4)
+        first_page = list(paginator.get_page(None))
+        for cursor in ('garbage', encode_cursor([1], 'next', 2)):
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(cursor)
+                self.assertEqual(list(page), first_page)
+                self.assertEqual(page.number, 1)
+
+    def test_tampered_cursor_returns_first_page(self):
+        """Test that cursors with values of the wrong type fall back to page
+        one instead of reaching the database."""
+        url = reverse('tutor_list')
+        cases = [
+            ('cheapest', ['abc', 1]),
+            ('cheapest', ['NaN', 1]),
+            ('cheapest', ['1e9999', 1]),
+            ('cheapest', [20, 2 ** 70]),
+            ('name', [[1], {}]),
+            ('name', ['Tutor 01', True]),
+            ('highest-rated', ['4.5', 1, 1]),
+            ('most-reviews', [None, 1]),
+        ]
+        for sorting, values in cases:
+            with self.subTest(sorting=sorting, values=values):
+                cursor = encode_cursor(values, 'next', 2)
+                response = self.client.get(
+                    url, {'sorting': sorting, 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['page_obj'].number, 1)
+
+                paginator = KeysetPaginator(
+                    Tutor.objects.all(), TUTOR_SORTINGS[sorting], 4)
+                with self.assertRaises(InvalidCursor):
+                    paginator.get_page(cursor, strict=True)
+
+    def test_cursor_round_trip(self):
+        """Test that decimals survive encoding a cursor."""
+        cursor = encode_cursor([Decimal('20.50'), 3], 'prev', 2)
+        self.assertEqual(decode_cursor(cursor),
+                         {'k': ['20.50', 3], 'd': 'prev', 'n': 2})
+
+    def test_deep_pages_cost_the_same_queries(self):
+        """Test that a later page runs the same queries as the first one."""
+        url = reverse('tutor_list')
+
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(url, {'sorting': 'cheapest'})
+        next_cursor = response.context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as deep:
+            response = self.client.get(
+                url, {'sorting': 'cheapest', 'cursor': next_cursor})
+
+        # The facet counts (a UNION query) are cached by the first request
+        def listing_queries(context):
+            return [query for query in context.captured_queries
+                    if 'UNION' not in query['sql']]
+
+        self.assertEqual(len(listing_queries(first)),
+                         len(listing_queries(deep)))
+        expected = list(Tutor.objects.order_by(
+            *TUTOR_SORTINGS['cheapest'])[6:12])
+        self.assertEqual(list(response.context['page_obj']), expected)
+        for query in listing_queries(deep):
+            self.assertNotIn('COUNT(', query['sql'])
@@ -0,0 +1,95 @@
+from django.test import TestCase
+
+from tutor_market.models import Subject, Tutor, TutorSearchDocument, Value
+from tutor_market.pagination import TUTOR_SORTINGS, KeysetPaginator
+from tutor_market.search import rebuild_index, search_tutors
+from tutor_market.testing import create_tutor
+
+
+class TutorSearchTestCases(TestCase):
+    """Test cases for the tutor full-text search."""
+
+    def setUp(self):
+        """Create tutors with different subjects and descriptions."""
+        self.math = Subject.objects.create(name='Math')
+        self.patience = Value.objects.create(name='Patience')
+        self.tutor1 = create_tutor(
+            'alice', display_name='Alice Algebra',
+            description='I love numbers and equations.')
+        self.tutor2 = create_tutor(
+            'bob', display_name='Bob Brown',
+            description='Algebra is one of the things I teach.')
+        self.tutor3 = create_tutor(
+            'carol', display_name='Carol Chemistry',
+            description='Molecules everywhere.')
+
+    def _search(self, query):
+        return list(search_tutors(Tutor.objects.all(), query))
+
+    def test_document_created_for_new_tutor(self):
+        """Test that saving a tutor creates its search document."""
+        document = TutorSearchDocument.objects.get(tutor=self.tutor1)
+        self.assertEqual(document.title, 'Alice Algebra')
+        self.assertIn('equations', document.body)
+
+    def test_results_ranked_by_relevance(self):
+        """Test that a name match ranks above a description match."""
+        self.assertEqual(self._search('algebra'), [self.tutor1, self.tutor2])
+
+    def test_paged_results_keep_the_search_order(self):
+        """Test that equally ranked results are paged by name."""
+        for name in ['Zoe', 'Dan', 'Eve']:
+            create_tutor(name.lower(), display_name=name,
+                         description='Origami every week.')
+        results = search_tutors(Tutor.objects.all(), 'origami')
+        paginator = KeysetPaginator(results, TUTOR_SORTINGS['relevance'], 2)
+        pages = [paginator.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        names = [tutor.display_name for page in pages for tutor in page]
+        self.assertEqual(names, ['Dan', 'Eve', 'Zoe'])
+        self.assertEqual(names, [tutor.display_name for tutor in results])
+
+    def test_prefix_and_stemmed_matches(self):
+        """Test that partial and inflected words still match."""
+        self.assertEqual(self._search('chem'), [self.tutor3])
+        self.assertEqual(self._search('molecule'), [self.tutor3])
+
+    def test_all_terms_must_match(self):
+        """Test that every search term has to match."""
+        self.assertEqual(self._search('algebra numbers'), [self.tutor1])
+        self.assertEqual(self._search('algebra molecules'), [])
+
+    def test_blank_query_returns_everything(self):
+        """Test that a blank query does not filter the queryset."""
+        self.assertEqual(len(self._search('  ')), 3)
+
+    def test_m2m_changes_update_document(self):
+        """Test that adding subjects and values in either direction updates
+        the document."""
+        self.tutor3.subjects.add(self.math)
+        self.patience.tutors.add(self.tutor2)
+        self.assertEqual(self._search('math'), [self.tutor3])
+        self.assertEqual(self._search('patience'), [self.tutor2])
+
+        self.math.tutors.clear()
+        self.assertEqual(self._search('math'), [])
+
+    def test_subject_rename_updates_document(self):
+        """Test that renaming a subject updates its tutors' documents."""
+        self.tutor1.subjects.add(self.math)
+        self.math.name = 'Geometry'
+        self.math.save()
+        self.assertEqual(self._search('geometry'), [self.tutor1])
+        self.assertEqual(self._search('math'), [])
+
+    def test_deleted_tutor_removed_from_index(self):
+        """Test that deleting a tutor removes it from the results."""
+        self.tutor1.delete()
+        self.assertEqual(self._search('algebra'), [self.tutor2])
+
+    def test_rebuild_index(self):
+        """Test that rebuilding the index restores missing documents."""
+        TutorSearchDocument.objects.all().delete()
+        self.assertEqual(rebuild_index(), 3)
+        self.assertEqual(self._search('carol'), [self.tutor3])
@@ -5,12 +5,14 @@ from django.test import TestCase, Client
 from decimal import Decimal
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.urls import reverse
 from django.contrib.messages import get_messages
 
 from booking.forms import CalendlyUriForm
 from tutor_market.forms import RatingForm
 from tutor_market.models import Rating, Subject, Tutor, Value
+from tutor_market.testing import create_tutor
 from tutor_market.views import TutorCreateView
 
 
@@ -132,6 +134,61 @@ class TutorListViewTestCases(TestCase):
         self.assertEqual(response.context['tutor_list'][1], self.tutor2)
 
 
+class TutorCardQueryCountTestCases(TestCase):
+    """
+    Test cases that lock the number of queries needed to render tutor cards.
+    """
+
+    def setUp(self):
+        """Create subjects and values shared by the tutors."""
+        cache.clear()
+        self.subjects = [
+            Subject.objects.create(name=name) for name in ('Math', 'Science')]
+        self.values = [
+            Value.objects.create(name=name) for name in ('Patience', 'Fun')]
+        self.reviewer = User.objects.create_user(
+            username='reviewer', password='test_password')
+
+    def _create_tutors(self, amount, offset=0):
+        """Create rated tutors with subjects and values."""
+        for i in range(offset, offset + amount):
+            tutor = create_tutor(f'tutor_{i}', self.subjects, self.values,
+                                 display_name=f'Tutor {i}')
+            Rating.objects.create(
+                tutor=tutor, user=self.reviewer, score=4, comment='Good.')
+
+    def test_tutor_list_query_count_constant(self):
+        """Test that the number of queries does not grow with the number of
+        tutors on a page."""
+        self._create_tutors(1)
+        # tutors, subjects and values of the page and the facet counts
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('tutor_list'))
+        self.assertEqual(len(response.context['page_obj']), 1)
+
+        self._create_tutors(4, offset=1)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('tutor_list'))
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+        # A full page additionally looks up the following pages.
+        self._create_tutors(3, offset=5)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('tutor_list'))
+        self.assertEqual(len(response.context['page_obj']), 6)
+
+    def test_tutor_detail_card_uses_preloaded_data(self):
+        """Test that the profile card does not query per subject or value."""
+        self._create_tutors(1)
+        tutor = Tutor.objects.get()
+        # tutor, subjects, values and the reviews with their reviewers
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                reverse('tutor_detail', args=[tutor.pk]))
+        self.assertContains(response, 'Patience')
+        self.assertContains(response, '1 review')
+
+
 class TutorDetailViewTestCases(TestCase):
     """Test cases for the TutorDetailView view."""
 
@@ -200,6 +257,26 @@ class TutorDetailViewTestCases(TestCase):
         self.assertFalse(response.context['existing_review'])
         self.assertIsNone(response.context['upcoming_sessions'])
 
+    def test_tutor_detail_view_renders_first_review_page(self):
+        """Test that only the first page of many reviews is rendered."""
+        for i in range(30):
+            Rating.objects.create(
+                tutor=self.tutor1,
+                user=User.objects.create_user(
+                    username=f'reviewer_{i}', password='test_password'),
+                score=4, comment=f'Review {i}')
+        response = self.client.get(
+            reverse('tutor_detail', args=[self.tutor1.id]))
+        self.assertEqual(len(response.context['reviews']), 10)
+        self.assertContains(response, 'Review 29')
+        self.assertNotContains(response, 'Great tutor!')
+        self.assertContains(response, 'Show more reviews')
+
+        response = self.client.get(
+            reverse('tutor_detail', args=[self.tutor1.id]),
+            {'reviews': 'highest-score'})
+        self.assertContains(response, 'Great tutor!')
+
     def test_tutor_detail_view_user_unauthenticated(self):
         """Test the TutorDetailView view with an unauthenticated user."""
         self.client.logout()
@@ -237,7 +314,7 @@ class TutorDetailViewTestCases(TestCase):
         # -> Credit for testing for django messages: https://stackoverflow.com/a/57998247  # noqa
         messages = list(get_messages(response.wsgi_request))
         self.assertEqual(
-            str(messages[2]), 'You cannot leave a review on your own profile.')
+            str(messages[0]), 'You cannot leave a review on your own profile.')
 
     def test_post_review_invalid_form(self):
         """Test that an invalid form submission shows a warning message."""
@@ -250,7 +327,7 @@ class TutorDetailViewTestCases(TestCase):
         self.assertRedirects(response, reverse(
             'tutor_detail', args=[self.tutor2.id]))
         messages = list(get_messages(response.wsgi_request))
-        self.assertEqual(str(messages[2]),
+        self.assertEqual(str(messages[0]),
                          'Form was not valid. Please try again.')
 
 
@@ -0,0 +1,85 @@
+"""
+Helpers shared by the tests of the tutor market and the apps built on it.
+"""
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+
+from tutor_market.models import Tutor
+
+PASSWORD = 'test_password'
+
+
+def create_tutor(username: str, subjects=(), values=(), **fields) -> Tutor:
+    """
+    Creates an active tutor along with its user.
+
+    Args:
+        username (str): The username of the tutor's user, also the default
+            display name.
+        subjects (iterable): The subjects the tutor teaches.
+        values (iterable): The values the tutor holds.
+        **fields: Tutor fields replacing the defaults.
+
+    Returns:
+        Tutor: The created tutor.
+    """
+    fields = {
+        'display_name': username,
+        'hourly_rate': Decimal('40.00'),
+        'description': 'Experienced tutor.',
+        'profile_status': True,
+        **fields,
+    }
+    user = User.objects.create_user(username=username, password=PASSWORD)
+    tutor = Tutor.objects.create(user=user, **fields)
+    if subjects:
+        tutor.subjects.set(subjects)
+    if values:
+        tutor.values.set(values)
+    return tutor
+
+
+class IndexTestMixin:
+    """
+    Seeds tutors and students in bulk for test cases asserting that hot
+    queries use their indexes. Test cases add their own rows in seed(),
+    after which the database statistics are refreshed so the query planner
+    sees the seeded data.
+    """
+    tutor_count = 20
+    student_count = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        users = User.objects.bulk_create(
+            User(username=f'user_{i}')
+            for i in range(cls.tutor_count + cls.student_count))
+        cls.tutors = Tutor.objects.bulk_create(
+            Tutor(user=user, display_name=user.username,
+                  hourly_rate=Decimal('40.00'), description='Tutor.')
+            for user in users[:cls.tutor_count])
+        cls.students = users[cls.tutor_count:]
+        cls.seed()
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    @classmethod
+    def seed(cls):
+        """
+        Creates the rows queried by the test case.
+        """
+
+    def assertUsesIndex(self, queryset, *names):
+        """
+        Asserts that the query plan of the queryset uses one of the indexes.
+
+        Args:
+            queryset (QuerySet): The queryset to explain.
+            *names (str): The accepted index names.
+        """
+        plan = queryset.explain()
+        self.assertTrue(any(name in plan for name in names), plan)
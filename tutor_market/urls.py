@@ -1,9 +1,12 @@
 from django.urls import path
-from tutor_market import views
+from tutor_market import api, views
 
 urlpatterns = [
     path('', views.tutor_list_view, name='tutor_list'),
     path('<int:pk>/', views.tutor_detail_view, name='tutor_detail'),
+    path('api/tutors/', api.tutor_api_view, name='tutor_api'),
+    path('api/tutors/<int:pk>/reviews/', api.tutor_reviews_api_view,
+         name='tutor_reviews_api'),
     path('add-tutor/', views.TutorCreateView.as_view(), name='add_tutor'),
     path('edit-tutor/<int:pk>/', views.TutorUpdateView.as_view(),
          name='edit_tutor'),
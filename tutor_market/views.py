@@ -1,4 +1,3 @@
-from collections import OrderedDict
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.views.generic import UpdateView, CreateView, DeleteView, TemplateView  # noqa
@@ -7,15 +6,18 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from django.contrib.auth.models import User
-from django.utils import timezone
-from django.core.paginator import Paginator
-from django.db.models import Q
-from django.db.models import Count, Avg
+from django.db.models import Exists, OuterRef, Q
 from booking.forms import CalendlyUriForm
 from booking.models import Payment, TutoringSession
-from calendly.views import introspect_access_token
+from tutor_market.caching import cache_list_page, cache_profile_page
+from tutor_market.cards import render_tutor_cards
+from tutor_market.facets import get_facets
 from tutor_market.forms import RatingForm, TutorForm
+from tutor_market.listing import TutorListing
 from tutor_market.models import Tutor, Rating
+from tutor_market.profile import render_profile_fragments
+from tutor_market.reviews import REVIEW_SORTINGS
+from tutor_market.search import normalize_query
 from django.urls import reverse_lazy
 from .models import Tutor, Student, Conversation
 from django.shortcuts import get_object_or_404
@@ -24,6 +26,9 @@ from django.contrib.auth.models import User
 from .models import Tutor, Message
 from .forms import MessageForm
 
+# Upcoming sessions listed on tutor profiles and the tutor dashboard.
+UPCOMING_SESSIONS_ON_PROFILE = 3
+
 
 
 # def start_conversation(request):
@@ -208,6 +213,7 @@ def chats_view(request, tutorID):
 
 
 
+@cache_list_page
 def tutor_list_view(request):
     """
     Function-based view for listing all tutors in the system.
@@ -222,75 +228,49 @@ def tutor_list_view(request):
     - A rendered HTML template with the list of tutors, filtered and sorted
     based on the request parameters.
     """
-    tutor_list = Tutor.objects.filter(profile_status=True)
+    listing = TutorListing(request.GET)
     subjects = None
     values = None
-    query = None
-    sorting = 'name'
-
-    if request.GET:
-        if 'subject' in request.GET:
-            subjects = request.GET.getlist('subject')
-            q_arguments = Q()
-            for subject in subjects:
-                q_arguments |= Q(subjects__name__icontains=subject)
-            tutor_list = tutor_list.filter(q_arguments).distinct()
-
-        if 'teachingvalue' in request.GET:
-            # -> Credit for getting values from a list of query parameters: https://docs.djangoproject.com/en/5.0/ref/request-response/#querydict-objects # noqa
-            values = request.GET.getlist('teachingvalue')
-            q_arguments = Q()
-            for value in values:
-                # -> Credit for special add operator: https://stackoverflow.com/questions/29399653/python-operator-meaning  # noqa
-                q_arguments |= Q(values__name__icontains=value)
-            tutor_list = tutor_list.filter(q_arguments).distinct()
-
-        if 'q' in request.GET:
-            query = request.GET['q']
-
-            queries = Q(
-                display_name__icontains=query) | Q(
-                description__icontains=query) | Q(
-                catch_phrase__icontains=query) | Q(
-                    subjects__name__icontains=query) | Q(
-                        values__name__icontains=query)
-            # -> Credit for returning distinct results: https://docs.djangoproject.com/en/5.0/ref/models/querysets/#distinct  # noqa
-            tutor_list = tutor_list.filter(queries).distinct()
-
-        if 'sorting' in request.GET:
-            sorting = request.GET['sorting']
-            if sorting == 'name':
-                tutor_list = tutor_list.order_by('display_name')
-            if sorting == 'cheapest':
-                tutor_list = tutor_list.order_by('hourly_rate')
-            if sorting == 'highest-rated':
-                # -> Credit for default value in Avg: https://docs.djangoproject.com/en/5.1/ref/models/database-functions/#coalesce  # noqa
-                tutor_list = tutor_list.annotate(avg_rating=Avg(
-                    'ratings__score', default=0)).order_by('-avg_rating')
-            if sorting == 'most-reviews':
-                # -> Credit for distinct results in annotations: https://docs.djangoproject.com/en/5.0/topics/db/aggregation/#combining-multiple-aggregations  # noqa
-                tutor_list = tutor_list.annotate(num_ratings=Count(
-                    "ratings", distinct=True)).order_by("-num_ratings")
-            if sorting == 'most-expensive':
-                tutor_list = tutor_list.order_by('-hourly_rate')
-
-    # Pagination
-    paginator = Paginator(tutor_list, 6)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+
+    # -> Credit for getting values from a list of query parameters: https://docs.djangoproject.com/en/5.0/ref/request-response/#querydict-objects # noqa
+    if 'subject' in request.GET:
+        subjects = request.GET.getlist('subject')
+    if 'teachingvalue' in request.GET:
+        values = request.GET.getlist('teachingvalue')
+
+    # Number of matching tutors per subject and value, see
+    # tutor_market/facets.py
+    facets = get_facets(listing.active_tutors, listing.tutor_filter,
+                        normalize_query(listing.query))
+
+    # Keyset pagination, see tutor_market/pagination.py. Subjects and values
+    # are only loaded for cards missing from the cache, see
+    # tutor_market/cards.py
+    page_obj = listing.get_page(request.GET.get('cursor'), 6)
+    tutor_cards = render_tutor_cards(page_obj)
+
+    # Query string of the current filters for the pagination links
+    query_params = request.GET.copy()
+    query_params.pop('cursor', None)
+    query_params.pop('page', None)
 
     context = {
+        'facets': facets,
+        'match': listing.tutor_filter.match,
         'page_obj': page_obj,
-        'search_term': query,
+        'query_string': query_params.urlencode(),
+        'search_term': listing.query,
         'subjects': subjects,
         'values': values,
-        'query': query,
-        'sorting': sorting,
-        'tutor_list': tutor_list,
+        'query': listing.query,
+        'sorting': listing.sorting,
+        'tutor_cards': tutor_cards,
+        'tutor_list': listing.tutors,
     }
     return render(request, 'tutor_market/tutor_list.html', context)
 
 
+@cache_profile_page
 def tutor_detail_view(request, pk):
     """
     View for displaying the details (Profile) of a tutor.
@@ -308,8 +288,12 @@ def tutor_detail_view(request, pk):
         None
 
     """
-    tutor = get_object_or_404(Tutor, pk=pk)
-    existing_rating = None
+    tutors = Tutor.objects.all()
+    if request.user.is_authenticated:
+        # Whether the visitor reviewed the tutor is loaded with the tutor
+        tutors = tutors.annotate(has_rated=Exists(Rating.objects.filter(
+            tutor=OuterRef('pk'), user=request.user)))
+    tutor = get_object_or_404(tutors, pk=pk)
     upcoming_sessions = None
 
     # Check if the tutor's profile is activated
@@ -321,16 +305,12 @@ def tutor_detail_view(request, pk):
         return redirect(reverse('tutor_list'))
 
     if request.user.is_authenticated:
-        existing_rating = Rating.objects.filter(
-            tutor=tutor, user=request.user).first()
-        upcoming_sessions = TutoringSession.objects.filter(
-            tutor__user=tutor.user, student=request.user)
+        upcoming_sessions = TutoringSession.objects.upcoming_for(
+            tutor, request.user, limit=UPCOMING_SESSIONS_ON_PROFILE)
 
-        response_data = introspect_access_token(tutor)
-        if 'error' in response_data:
-            messages.warning(
-                request, f"{response_data['error']}: "
-                f"{response_data['error_description']}")
+        # The token state is recorded out of band, see calendly/tokens.py
+        if tutor.calendly_token_status == 'error':
+            messages.warning(request, tutor.calendly_token_error)
             messages.warning(
                 request, ('There seems to be an issue with this Tutor\'s '
                           'Calendly connection. Please contact us for more '
@@ -345,7 +325,7 @@ def tutor_detail_view(request, pk):
                 request, 'You must be logged in to leave a review.')
             return redirect('tutor_detail', pk=pk)
 
-        if request.user == tutor.user:
+        if request.user.pk == tutor.user_id:
             messages.warning(
                 request, 'You cannot leave a review on your own profile.')
             return redirect('tutor_detail', pk=pk)
@@ -359,48 +339,37 @@ def tutor_detail_view(request, pk):
             messages.warning(request, 'Form was not valid. Please try again.')
             return redirect('tutor_detail', pk=pk)
 
-        # Update the existing review or add a new review
-        if existing_rating:
-            existing_rating.score = review_form.cleaned_data['score']
-            existing_rating.comment = review_form.cleaned_data['comment']
-            existing_rating.save()
+        # Update the existing review or add a new review, a student has one
+        # review per tutor (unique_rating_tutor_user)
+        _, created = Rating.objects.update_or_create(
+            tutor=tutor, user=request.user, defaults={
+                'score': review_form.cleaned_data['score'],
+                'comment': review_form.cleaned_data['comment'],
+            })
+        if created:
+            messages.success(request, 'Review added successfully.')
+        else:
             messages.success(request, 'Review updated successfully.')
-            return redirect('tutor_detail', pk=pk)
-
-        review = review_form.save(commit=False)
-        review.tutor = tutor
-        review.user = request.user
-        review.save()
-        messages.success(request, 'Review added successfully.')
         return redirect('tutor_detail', pk=pk)
 
-    review_counts = {}
-
     # Prepare data for rendering the template
     form = RatingForm()
     calendly_form = CalendlyUriForm()
     calendly_event_url = tutor.calendly_event_url
-    rating_exists = True if existing_rating else False
-    reviews = tutor.ratings.all()
-
-    total_reviews = reviews.count()
-    review_counts = {1: {}, 2: {}, 3: {}, 4: {}, 5: {}}
-    for score in range(1, 6):
-        count = reviews.filter(score=score).count()
-        percentage = (count / total_reviews * 100) if total_reviews > 0 else 0
-
-        review_counts[score] = {'count': count, 'percentage': percentage}
-
-    # -> Credit for reversing the order of a dictionary: https://www.geeksforgeeks.org/ordereddict-in-python/  # noqa
-    review_counts = OrderedDict(reversed(list(review_counts.items())))
+    rating_exists = getattr(tutor, 'has_rated', False)
+    # The parts shared by all visitors are cached, only the first page of
+    # reviews is shown and the following ones are loaded from the reviews
+    # API
+    review_sorting = request.GET.get('reviews', 'newest')
+    if review_sorting not in REVIEW_SORTINGS:
+        review_sorting = 'newest'
 
     context = {
         'tutor': tutor,
         'form': form,
         'calendly_form': calendly_form,
         'calendly_event_url': calendly_event_url,
-        'reviews': reviews,
-        'review_counts': review_counts,
+        'fragments': render_profile_fragments(tutor, review_sorting),
         'existing_review': rating_exists,
         'upcoming_sessions': upcoming_sessions,
     }
@@ -541,9 +510,7 @@ class TutorDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 def student_dashboard(request, user):
 
     booking_history = TutoringSession.objects.filter(student=user)
-    # -> Credit for greater or equal to lookup (gte): https://docs.djangoproject.com/en/5.0/ref/models/querysets/#gte  # noqa
-    upcoming_sessions = booking_history.filter(
-        start_time__gte=timezone.now()).filter(session_status='scheduled')
+    upcoming_sessions = TutoringSession.objects.upcoming_for(student=user)
     # add payment details (future feature)
     # add liked tutors (future feature)
     payment_history = Payment.objects.filter(user=user)
@@ -562,18 +529,18 @@ def student_dashboard(request, user):
 def tutor_dashboard(request, user):
     tutor = Tutor.objects.get(user=user)
 
-    # check if the tutor profile should be enabled or disabled
-    if (tutor.calendly_access_token and tutor.calendly_event_url):
-        tutor.profile_status = True
-        tutor.save()
-    else:
-        tutor.profile_status = False
-        tutor.save()
+    # check if the tutor profile should be enabled or disabled. Saved only
+    # on a change, every save expires the cached tutor listings.
+    profile_status = bool(
+        tutor.calendly_access_token and tutor.calendly_event_url)
+    if tutor.profile_status != profile_status:
+        tutor.profile_status = profile_status
+        tutor.save(update_fields=['profile_status'])
 
     booking_history = TutoringSession.objects.filter(
         tutor=tutor).order_by('start_time')
-    upcoming_sessions = booking_history.filter(
-        start_time__gte=timezone.now(), session_status='scheduled')[:3]
+    upcoming_sessions = TutoringSession.objects.upcoming_for(
+        tutor, limit=UPCOMING_SESSIONS_ON_PROFILE)
     pending_sessions = booking_history.filter(session_status='pending')
     users = User.objects.filter(sessions__tutor=tutor)
     users_and_sessions = {}